@@ -4,6 +4,7 @@ os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1' # ¡MANTENER ESTA LÍNEA POR AHO
 
 from flask import Flask, render_template, url_for, session, redirect, jsonify, request, flash
 from flask_session import Session
+import click
 import logging
 from datetime import timedelta
 from flask_cors import CORS
@@ -17,9 +18,13 @@ logger = logging.getLogger(__name__)
 from config import Config
 # Importar la clase de servicios
 from backend.services.external_product_service import ExternalProductService
+from backend.services.password_hashing_service import PasswordHashingService
+from backend.services.entitlement_service import EntitlementService
 
 # Importar las clases de repositorios y controladores
-from backend.repositories.json_storage import JSONStorage 
+from backend.repositories.storage_factory import create_storage, create_json_storage, import_json_into, rewrite_json_snapshots
+from backend.repositories.json_storage import SNAPSHOT_FORMATS, resolve_data_file
+from backend.repositories.sqlite_storage import SQLiteStorage
 from backend.repositories.user_repository import UserRepository
 from backend.repositories.product_repository import ProductRepository 
 
@@ -66,21 +71,38 @@ def create_app():
          ]) 
 
     # --- Inicialización de Repositorios y Controladores (Inyección de Dependencias) ---
-    json_storage = JSONStorage(data_file=Config.JSON_DATABASE_PATH) # <-- Usa Config aquí
-    logger.info("JSONStorage inicializado.")
+    storage = create_storage(Config) # <-- El motor (JSON o SQLite) se elige en Config.STORAGE_ENGINE
     
-    external_product_service = ExternalProductService(Config.EXTERNAL_PRODUCTS_API_BASE_URL) # <-- Usa Config aquí
+    external_product_service = ExternalProductService(
+        Config.EXTERNAL_PRODUCTS_API_BASE_URL, # <-- Usa Config aquí
+        max_page_workers=Config.EXTERNAL_PRODUCTS_PAGE_WORKERS,
+        pool_size=Config.EXTERNAL_PRODUCTS_POOL_SIZE,
+        max_retries=Config.EXTERNAL_PRODUCTS_MAX_RETRIES
+    )
     logger.info(f"ExternalProductService instanciado con base_url: {external_product_service.base_url}")
-    user_repository = UserRepository(storage=json_storage)
+    password_hasher = PasswordHashingService(
+        max_workers=Config.PASSWORD_HASH_WORKERS,
+        max_queue_depth=Config.PASSWORD_HASH_MAX_QUEUE
+    )
+    user_repository = UserRepository(
+        storage=storage,
+        password_hasher=password_hasher,
+        user_cache_size=Config.USER_CACHE_SIZE,
+        user_cache_ttl=Config.USER_CACHE_TTL_SECONDS
+    )
     # --- INICIALIZACIÓN DE IMPORTADORES ---
-    importer_repository = ImporterRepository(storage=json_storage)
+    importer_repository = ImporterRepository(storage=storage)
     importer_ranking_service = ImporterRankingService(importer_repository)
     logger.info("ImporterRepository e ImporterRankingService inicializados.")
     # --- FIN INICIALIZACIÓN IMPORTADORES ---
     
     auth_controller = AuthController(user_repository=user_repository, config=Config)
     # <-- CORRECCIÓN CLAVE: Pasa external_product_service, no product_repository
-    product_controller = ProductController(external_product_service=external_product_service) 
+    product_controller = ProductController(
+        external_product_service=external_product_service,
+        catalog_ttl_seconds=Config.PRODUCT_CATALOG_TTL_SECONDS,
+        catalog_snapshot_file=resolve_data_file(Config.PRODUCT_CATALOG_SNAPSHOT_PATH) if Config.PRODUCT_CATALOG_SNAPSHOT_PATH else None
+    ) 
     logger.info("AuthController y ProductController instanciados.")
 
     # --- Registro de Blueprints y Inyección de Controladores ---
@@ -93,11 +115,65 @@ def create_app():
     logger.info("Blueprint 'auth_bp' registrado con prefijo '/api'.")
 
     # --- REGISTRO DE BLUEPRINT DE IMPORTADORES ---
-    init_importer_routes(importer_ranking_service, user_repository) # Pasar el servicio y el repo de usuarios
+    entitlement_service = EntitlementService(user_repository, ttl_seconds=Config.ENTITLEMENT_TTL_SECONDS)
+    init_importer_routes(importer_ranking_service, user_repository, entitlement_service) # Pasar el servicio y el repo de usuarios
     app.register_blueprint(importer_bp, url_prefix='/api') # Usar /api para consistencia
     logger.info("Blueprint 'importer_bp' registrado con prefijo '/api'.")
     # --- FIN REGISTRO IMPORTADORES ---
 
+    if Config.METRICS_ENDPOINT_ENABLED:
+        @app.route('/api/metrics', methods=['GET'])
+        def metrics():
+            """Métricas de rendimiento del proceso (catálogo, API externa y hashing de contraseñas)."""
+            return jsonify({**product_controller.get_metrics(), "password_hashing": password_hasher.get_metrics()})
+        logger.info("Endpoint /api/metrics habilitado.")
+
+    # --- Comandos de mantenimiento (flask <comando>) ---
+    @app.cli.command('backfill-email-index')
+    def backfill_email_index_command():
+        """Calcula el índice ciego de email para los usuarios existentes (migración única)."""
+        updated = user_repository.backfill_email_index()
+        click.echo(f"Índice ciego de email calculado para {updated} usuarios.")
+
+    @app.cli.command('rotate-email-key')
+    @click.option('--batch-size', default=500, show_default=True, help='Usuarios por lote (una escritura por lote).')
+    @click.option('--after', 'after_id', default=None, help='Continuar después de este ID de usuario.')
+    @click.option('--pause', default=0.0, show_default=True, help='Segundos de pausa entre lotes.')
+    @click.option('--server-stopped', is_flag=True, help='Confirma que la aplicación no está atendiendo peticiones.')
+    def rotate_email_key_command(batch_size, after_id, pause, server_stopped):
+        """Re-cifra los emails con la primera clave de backend/email.key (rotación de claves)."""
+        if (Config.STORAGE_ENGINE or 'json').lower() == 'json' and not Config.JSON_STORAGE_PROCESS_SHARED and not server_stopped:
+            # Sin bloqueos de archivo, las escrituras de este proceso y las del servidor se pisarían.
+            raise click.ClickException(
+                "Con el almacenamiento JSON, rotar con el servidor en marcha requiere JSON_STORAGE_PROCESS_SHARED=true "
+                "(o STORAGE_ENGINE=sqlite). Detén el servidor y usa --server-stopped."
+            )
+        def report(progress):
+            click.echo(f"{progress['processed']} usuarios procesados, {progress['reencrypted']} re-cifrados "
+                       f"(último ID: {progress['last_id']}).")
+        progress = user_repository.reencrypt_emails(batch_size=batch_size, after_id=after_id,
+                                                    pause_seconds=pause, progress_callback=report)
+        click.echo(f"Rotación completada: {progress['reencrypted']} re-cifrados, {progress['skipped']} ya rotados, "
+                   f"{progress['failed']} con error.")
+        if not progress['failed']:
+            click.echo("Ya se pueden quitar las claves anteriores de backend/email.key.")
+
+    @app.cli.command('import-json-to-sqlite')
+    def import_json_to_sqlite_command():
+        """Copia los datos de JSON_DATABASE_PATH a SQLITE_DATABASE_PATH (se puede repetir sin duplicar)."""
+        counts = import_json_into(SQLiteStorage(data_file=Config.SQLITE_DATABASE_PATH), create_json_storage(Config))
+        for entity_type, count in counts.items():
+            click.echo(f"{entity_type}: {count} entidades importadas.")
+        click.echo("Migración completada. Use STORAGE_ENGINE=sqlite para activar el nuevo motor.")
+
+    @app.cli.command('convert-json-storage')
+    @click.argument('snapshot_format', type=click.Choice(SNAPSHOT_FORMATS))
+    def convert_json_storage_command(snapshot_format):
+        """Reescribe los archivos JSON de datos en el formato indicado (json, compact o marshal)."""
+        entity_types = rewrite_json_snapshots(create_json_storage(Config, snapshot_format=snapshot_format))
+        click.echo(f"Snapshot convertido a '{snapshot_format}' ({', '.join(entity_types) or 'sin datos'}).")
+        click.echo(f"Define JSON_STORAGE_SNAPSHOT_FORMAT={snapshot_format} para seguir escribiendo en ese formato.")
+
 
     # --- Rutas para renderizar las páginas HTML del Frontend ---
     
@@ -136,6 +212,7 @@ def create_app():
         session.pop('user_id', None)
         session.pop('user_name', None)
         session.pop('user_email', None)
+        EntitlementService.clear(session)
         return redirect(url_for('index'))
 
     @app.route('/test-session')
@@ -6,6 +6,8 @@ from flask import jsonify, session, request
 from typing import Optional, Dict, Any, Tuple 
 
 from backend.repositories.user_repository import UserRepository
+from backend.services.password_hashing_service import PasswordHashingOverloadedError
+from backend.services.entitlement_service import EntitlementService
 from backend.models.user import User 
 from config import Config 
 
@@ -69,6 +71,9 @@ class AuthController:
             else:
                 logger.warning(f"Fallo en el registro para el email: {email}. Posiblemente ya existe.")
                 return jsonify({"message": "El email ya está registrado o hubo un error."}), 409
+        except PasswordHashingOverloadedError:
+            logger.warning(f"Registro de {email} rechazado: servicio de hashing sobrecargado.")
+            return jsonify({"message": "El servicio está sobrecargado. Intenta nuevamente en unos segundos."}), 503
         except Exception as e:
             logger.error(f"Error inesperado durante el registro de {email}: {e}")
             return jsonify({"message": "Error interno del servidor durante el registro."}), 500
@@ -84,7 +89,11 @@ class AuthController:
             logger.warning("Faltan campos requeridos en el login (email o password).")
             return jsonify({"message": "Email y contraseña son obligatorios."}), 400
 
-        user = self.user_repo.find_user_by_email_and_password(email, password)
+        try:
+            user = self.user_repo.find_user_by_email_and_password(email, password)
+        except PasswordHashingOverloadedError:
+            logger.warning(f"Inicio de sesión de {email} rechazado: servicio de hashing sobrecargado.")
+            return jsonify({"message": "El servicio está sobrecargado. Intenta nuevamente en unos segundos."}), 503
 
         if user:
             session['user_id'] = user.id
@@ -160,6 +169,7 @@ class AuthController:
         session.pop('user_id', None)
         session.pop('user_name', None)
         session.pop('user_email', None)
+        EntitlementService.clear(session)
         logger.info("Usuario ha cerrado sesión.")
         return jsonify({"message": "Sesión cerrada exitosamente."}), 200
 
@@ -206,7 +216,11 @@ class AuthController:
             return jsonify({"message": "Datos de actualización no proporcionados."}), 400
 
         logger.info(f"Intentando actualizar perfil para usuario ID: {user_id} con datos: {data}")
-        updated_user = self.user_repo.update_user(user_id, data)
+        try:
+            updated_user = self.user_repo.update_user(user_id, data)
+        except PasswordHashingOverloadedError:
+            logger.warning(f"Actualización de perfil de {user_id} rechazada: servicio de hashing sobrecargado.")
+            return jsonify({"message": "El servicio está sobrecargado. Intenta nuevamente en unos segundos."}), 503
 
         if updated_user:
             session['user_name'] = updated_user.name
@@ -28,26 +28,43 @@ class ProductController:
     Controlador para gestionar la lógica de negocio relacionada con productos.
     Interactúa con el repositorio de productos para obtener datos.
     """
-    def __init__(self, external_product_service: ExternalProductService):
-        self.product_repository = ProductRepository(external_product_service)
+    def __init__(self, external_product_service: ExternalProductService,
+                 catalog_ttl_seconds: float = 600.0, catalog_snapshot_file: Optional[str] = None):
+        """
+        Args:
+            external_product_service (ExternalProductService): Servicio bloqueante de la API externa.
+            catalog_ttl_seconds (float): Antigüedad a partir de la cual el catálogo se refresca en segundo plano.
+            catalog_snapshot_file (str, optional): Archivo para guardar el catálogo y cargarlo al iniciar.
+        """
+        self.external_product_service = external_product_service
+        self.product_repository = ProductRepository(
+            external_product_service, catalog_ttl_seconds=catalog_ttl_seconds,
+            snapshot_file=catalog_snapshot_file
+        )
         logger.info("ProductController inicializado.")
 
     def get_products(self, query: Optional[str] = None, user_category: Optional[str] = None, 
                      page: int = 1, limit: int = 10) -> Tuple[List[Dict[str, Any]], int]:
         logger.info(f"Solicitando productos - Query: '{query}', Categoría de Usuario: '{user_category}', Página: {page}, Límite: {limit}")
         
+        # product_repository.get_all_products ahora devuelve la lista paginada y el total filtrado
+        products_list, total_filtered_products = self.product_repository.get_all_products(
+            query=query, category=self._map_category(user_category), page=page, limit=limit
+        )
+        return self._products_response(products_list, total_filtered_products, limit)
+
+    def _map_category(self, user_category: Optional[str]) -> Optional[str]:
+        """Traduce la categoría en español del frontend a la categoría de DummyJSON (None = sin filtro)."""
         api_category = None
         if user_category and user_category.lower() in USER_CATEGORY_MAPPING:
             api_category = USER_CATEGORY_MAPPING[user_category.lower()]
             logger.info(f"Mapeando categoría de usuario '{user_category}' a API category: '{api_category}'")
         elif user_category:
             logger.warning(f"Categoría de usuario '{user_category}' no reconocida en mapeo, no se aplicará filtro de categoría en API.")
+        return api_category
 
-        # product_repository.get_all_products ahora devuelve la lista paginada y el total filtrado
-        products_list, total_filtered_products = self.product_repository.get_all_products(
-            query=query, category=api_category, page=page, limit=limit
-        )
-
+    def _products_response(self, products_list: List[Product], total_filtered_products: int,
+                           limit: int) -> Tuple[List[Dict[str, Any]], int]:
         total_pages = 0
         if limit > 0:
             total_pages = math.ceil(total_filtered_products / limit)
@@ -61,32 +78,32 @@ class ProductController:
         # Devolvemos la lista paginada de productos y el total de productos filtrados (para la paginación del frontend)
         return [product.to_dict() for product in products_list], total_filtered_products
 
-    def get_product_details(self, product_id: str) -> Optional[Dict[str, Any]]:
+    def get_product_details(self, product_id) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un producto por su ID desde el catálogo del repositorio; si no está, el
+        repositorio lo pide a la API externa (una sola vez aunque lleguen varias peticiones).
+
+        Args:
+            product_id: ID del producto; la ruta lo entrega como int y el catálogo indexa por str.
+        Returns:
+            Optional[Dict[str, Any]]: El producto como diccionario, o None si no existe.
+        """
         logger.info(f"Solicitando detalle de producto para ID: {product_id}")
-        product = self.product_repository.get_product_by_id(product_id)
+        product = self.product_repository.get_product_by_id(str(product_id))
         if product:
             return product.to_dict()
         return None
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del catálogo en caché y del pool de conexiones con la API externa."""
+        return {
+            "catalog": self.product_repository.get_catalog_stats(),
+            "external_api": self.external_product_service.get_connection_stats(),
+        }
+
     def get_categories(self) -> List[str]:
         """
         Devuelve la lista de categorías personalizadas en español para el frontend.
         """
         logger.info("Solicitando categorías de productos personalizadas para el frontend.")
         return FRONTEND_DISPLAY_CATEGORIES
-    
-    def get_product_by_id(self, product_id):
-        """
-        Obtiene un producto específico por su ID.
-        Delega la búsqueda al servicio externo (o repositorio).
-        """
-        logger.info(f"ProductController: Buscando producto con ID: {product_id}")
-        product_data = self.external_product_service.get_product_by_id(product_id)
-        
-        if product_data:
-            # Puedes convertir el diccionario a un objeto Product si tienes esa lógica
-            # product_obj = Product.from_dict(product_data)
-            # return product_obj.to_dict() # Retornar un diccionario para jsonify
-            return product_data # Devuelve el diccionario directamente
-        return None
-
@@ -0,0 +1,81 @@
+# backend/repositories/change_feed.py
+import logging
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Firma de los suscriptores: callback(entity_type, version, ids). `ids` es la lista de IDs
+# modificados, o None si cambió todo el tipo (p. ej. al recargar el archivo completo).
+ChangeCallback = Callable[[str, int, Optional[List[str]]], None]
+
+class ChangeFeed:
+    """
+    Versiones monótonas por tipo de entidad y suscriptores a los que se avisa tras cada
+    mutación confirmada, para que las cachés construidas sobre el almacenamiento se
+    invaliden con precisión.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._versions: Dict[str, int] = {}
+        self._subscribers: List[Tuple[Optional[str], ChangeCallback]] = []
+
+    def subscribe(self, callback: ChangeCallback, entity_type: Optional[str] = None) -> Callable[[], None]:
+        """
+        Registra un callback para los cambios de un tipo (o de todos si `entity_type` es None).
+
+        Returns:
+            Callable[[], None]: Función que cancela la suscripción.
+        """
+        subscription = (entity_type, callback)
+        with self._lock:
+            self._subscribers.append(subscription)
+
+        def unsubscribe():
+            with self._lock:
+                if subscription in self._subscribers:
+                    self._subscribers.remove(subscription)
+        return unsubscribe
+
+    def version(self, entity_type: str) -> int:
+        """Devuelve la versión actual de un tipo (0 si nunca cambió en este proceso)."""
+        return self._versions.get(entity_type, 0)
+
+    def commit(self, changes: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, int, Optional[List[str]]]]:
+        """
+        Agrupa los cambios (tipo, id | None) por tipo y avanza la versión de cada tipo afectado.
+        Se llama con el lock de escritura del almacenamiento, así la versión avanza junto con los datos.
+
+        Returns:
+            list: Los eventos (tipo, versión, ids | None) a entregar con `publish`.
+        """
+        grouped: Dict[str, Optional[List[str]]] = {}
+        for entity_type, entity_id in changes:
+            if entity_id is None:
+                grouped[entity_type] = None
+            elif entity_type not in grouped:
+                grouped[entity_type] = [entity_id]
+            elif grouped[entity_type] is not None:
+                grouped[entity_type].append(entity_id)
+
+        events = []
+        with self._lock:
+            for entity_type, ids in grouped.items():
+                self._versions[entity_type] = self._versions.get(entity_type, 0) + 1
+                events.append((entity_type, self._versions[entity_type], ids))
+        return events
+
+    def publish(self, events: List[Tuple[str, int, Optional[List[str]]]]):
+        """Entrega los eventos a los suscriptores. Un callback que falla no afecta a los demás."""
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for entity_type, version, ids in events:
+            for subscribed_type, callback in subscribers:
+                if subscribed_type is not None and subscribed_type != entity_type:
+                    continue
+                try:
+                    callback(entity_type, version, ids)
+                except Exception as e:
+                    logger.error(f"Error en un suscriptor de cambios de '{entity_type}': {e}")
@@ -1,7 +1,8 @@
 # backend/repositories/importer_repository.py
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 import uuid # Asegúrate de importar uuid si lo usas para generar IDs aquí
+import dataclasses
 
 from backend.repositories.json_storage import JSONStorage # Importa JSONStorage
 from backend.models.importer import Importer
@@ -23,6 +24,9 @@ class ImporterRepository:
         # No se llama a super().__init__() porque no hereda de BaseRepository.
         self.storage = storage
         self.entity_type = "importers" # Define la clave bajo la cual se guardarán los importadores en el JSON
+        self.storage.register_schema(self.entity_type, [field.name for field in dataclasses.fields(Importer)])
+        # Índice sin distinción de mayúsculas: "china" y "China" son el mismo país.
+        self.storage.register_index(self.entity_type, "country_of_origin", case_insensitive=True)
         logger.info("ImporterRepository inicializado.")
 
     def add_importer(self, importer: Importer) -> Optional[Importer]:
@@ -37,7 +41,7 @@ class ImporterRepository:
         # JSONStorage.save_entity generará el ID si importer.id es None o vacío.
         importer_data = importer.to_dict()
         try:
-            saved_data = self.storage.save_entity(entity_type=self.entity_type, item_data=importer_data)
+            saved_data = self.storage.save_entity(entity_type=self.entity_type, entity_data=importer_data)
             if saved_data:
                 logger.info(f"Importador con ID {saved_data.get('id')} guardado exitosamente.")
                 return Importer.from_dict(saved_data)
@@ -46,6 +50,27 @@ class ImporterRepository:
             logger.error(f"Error al guardar importador: {e}")
             return None
 
+    def add_importers(self, importers: List[Importer]) -> List[Optional[Importer]]:
+        """
+        Añade o actualiza muchos importadores con una única escritura en el almacenamiento.
+        
+        Args:
+            importers (List[Importer]): Los importadores a guardar.
+        Returns:
+            List[Optional[Importer]]: Un resultado por importador, en el mismo orden:
+            el Importer guardado con su ID, o None si ese importador no se pudo guardar.
+        """
+        results = self.storage.save_entities(self.entity_type, [importer.to_dict() for importer in importers])
+        saved = []
+        for result in results:
+            if result["ok"]:
+                saved.append(Importer.from_dict(result["entity"]))
+            else:
+                logger.error(f"Error al guardar importador en carga masiva: {result['error']}")
+                saved.append(None)
+        logger.info(f"Carga masiva de importadores: {sum(i is not None for i in saved)} de {len(importers)} guardados.")
+        return saved
+
     def get_importer_by_id(self, importer_id: str) -> Optional[Importer]:
         """
         Busca un importador por su ID.
@@ -55,7 +80,7 @@ class ImporterRepository:
         Returns:
             Importer | None: El objeto Importer si se encuentra, o None si no.
         """
-        importer_data = self.storage.get_by_id(entity_type=self.entity_type, item_id=importer_id)
+        importer_data = self.storage.get_by_id(entity_type=self.entity_type, entity_id=importer_id)
         if importer_data:
             return Importer.from_dict(importer_data)
         return None
@@ -70,9 +95,33 @@ class ImporterRepository:
         all_importers_data = self.storage.get_all(entity_type=self.entity_type)
         return [Importer.from_dict(data) for data in all_importers_data]
 
+    def get_importers_page(self, after_id: Optional[str] = None, limit: int = 50,
+                           fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Recupera una página de importadores ordenados por ID, sin copiar la colección completa.
+        
+        Args:
+            after_id (str | None): Cursor devuelto por la página anterior.
+            limit (int): Cantidad máxima de importadores.
+            fields (List[str] | None): Atributos a incluir (el 'id' siempre se incluye).
+        Returns:
+            Tuple[List[dict], Optional[str]]: Los importadores como diccionarios y el cursor
+            de la página siguiente (None si no hay más).
+        """
+        return self.storage.get_page(self.entity_type, after_id=after_id, limit=limit, fields=fields)
+
+    def iter_importers(self, fields: Optional[List[str]] = None) -> Iterator[dict]:
+        """
+        Recorre todos los importadores por lotes (para exportaciones), sin materializarlos todos a la vez.
+        
+        Yields:
+            dict: Cada importador (proyectado a `fields` si se indica).
+        """
+        return self.storage.iter_entities(self.entity_type, fields=fields)
+
     def find_importers_by_country(self, country: str) -> List[Importer]:
         """
-        Encuentra importadores por su país de origen.
+        Encuentra importadores por su país de origen (sin distinguir mayúsculas).
         
         Args:
             country (str): El país de origen a buscar.
@@ -92,7 +141,7 @@ class ImporterRepository:
         Returns:
             Importer | None: El objeto Importer actualizado, o None si falla.
         """
-        existing_importer_data = self.storage.get_by_id(entity_type=self.entity_type, item_id=importer_id)
+        existing_importer_data = self.storage.get_by_id(entity_type=self.entity_type, entity_id=importer_id)
         if not existing_importer_data:
             logger.warning(f"No se encontró el importador con ID {importer_id} para actualizar.")
             return None
@@ -100,7 +149,7 @@ class ImporterRepository:
         existing_importer_data.update(new_data) # Actualiza el diccionario existente
         
         try:
-            saved_data = self.storage.save_entity(entity_type=self.entity_type, item_data=existing_importer_data)
+            saved_data = self.storage.save_entity(entity_type=self.entity_type, entity_data=existing_importer_data)
             if saved_data:
                 logger.info(f"Importador con ID {importer_id} actualizado.")
                 return Importer.from_dict(saved_data)
@@ -119,7 +168,7 @@ class ImporterRepository:
             bool: True si el importador fue eliminado, False si no se encontró.
         """
         try:
-            return self.storage.delete_entity(entity_type=self.entity_type, item_id=importer_id)
+            return self.storage.delete_entity(entity_type=self.entity_type, entity_id=importer_id)
         except Exception as e:
             logger.error(f"Error al eliminar importador con ID {importer_id}: {e}")
             return False
\ No newline at end of file
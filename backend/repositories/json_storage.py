@@ -1,39 +1,463 @@
 # backend/repositories/json_storage.py
 import os
 import json
+import time
 import uuid # Necesario para generar IDs si no se proporcionan
+import marshal
 import logging
-from threading import Lock # Para asegurar la seguridad de hilos al acceder al archivo
-from typing import Any, Optional
+import bisect
+import tempfile
+from contextlib import contextmanager, nullcontext
+from threading import Condition, Lock # Para asegurar la seguridad de hilos al acceder al archivo
+from typing import Any, Callable, Dict, Optional
+
+from backend.repositories.change_feed import ChangeCallback, ChangeFeed
+
+try:
+    import fcntl # Bloqueos de archivo entre procesos (solo disponible en sistemas POSIX)
+except ImportError:
+    fcntl = None
 
 logger = logging.getLogger(__name__) # Instancia de logger para este módulo
 
+
+# Formatos del snapshot. 'json' es el histórico (legible, indentado); los compactos
+# llevan una cabecera que permite detectarlos al cargar, sea cual sea la configuración.
+SNAPSHOT_FORMATS = ('json', 'compact', 'marshal')
+_COMPACT_HEADER = b'#JSONSTORAGE compact 1\n' # JSON minificado
+_MARSHAL_HEADER = b'#JSONSTORAGE marshal 1\n' # marshal de Python: la carga más rápida, no legible
+
+
+def serialize_snapshot(data: dict, snapshot_format: str = 'json') -> bytes:
+    """
+    Serializa los datos en el formato de snapshot indicado.
+
+    Raises:
+        ValueError: Si el formato no existe.
+    """
+    if snapshot_format == 'json':
+        return json.dumps(data, indent=4, ensure_ascii=False, default=_copy_entity).encode('utf-8')
+    if snapshot_format == 'compact':
+        return _COMPACT_HEADER + json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=_copy_entity).encode('utf-8')
+    if snapshot_format == 'marshal':
+        return _MARSHAL_HEADER + marshal.dumps(_plain_data(data))
+    raise ValueError(f"Formato de snapshot desconocido: '{snapshot_format}'. Use uno de {SNAPSHOT_FORMATS}.")
+
+
+def parse_snapshot(raw: bytes) -> Any:
+    """
+    Interpreta el contenido de un snapshot detectando su formato por la cabecera.
+
+    Raises:
+        json.JSONDecodeError: Si un snapshot JSON está corrupto.
+        ValueError | EOFError: Si un snapshot marshal está corrupto.
+    """
+    if raw.startswith(_MARSHAL_HEADER):
+        return marshal.loads(raw[len(_MARSHAL_HEADER):])
+    if raw.startswith(_COMPACT_HEADER):
+        raw = raw[len(_COMPACT_HEADER):]
+    return json.loads(raw)
+
+
+def resolve_data_file(data_file: str) -> str:
+    """
+    Devuelve la ruta completa de un archivo de datos: los nombres relativos se
+    ubican en la carpeta 'database' del proyecto; una ruta absoluta se respeta.
+    """
+    current_dir = os.path.dirname(__file__)
+    project_root = os.path.abspath(os.path.join(current_dir, '..', '..'))
+    return os.path.join(project_root, 'database', data_file)
+
+
+def _put_entity(entities: list, id_index: Dict[str, int], entity: dict) -> bool:
+    """
+    Inserta o reemplaza `entity` en la lista manteniendo sincronizado el índice id -> posición.
+
+    Returns:
+        bool: True si la entidad ya existía y fue reemplazada, False si se añadió.
+    """
+    position = id_index.get(entity['id'])
+    if position is not None:
+        entities[position] = entity
+        return True
+    id_index[entity['id']] = len(entities)
+    entities.append(entity)
+    return False
+
+
+def _remove_entity(entities: list, id_index: Dict[str, int], entity_id: str) -> bool:
+    """
+    Elimina en O(1) la entidad con `entity_id`: el último elemento de la lista ocupa
+    su lugar, por lo que el orden de inserción no se preserva tras un borrado.
+
+    Returns:
+        bool: True si la entidad existía y fue eliminada.
+    """
+    position = id_index.pop(entity_id, None)
+    if position is None:
+        return False
+    last = entities.pop()
+    if position < len(entities):
+        entities[position] = last
+        id_index[last['id']] = position
+    return True
+
+
+class _SecondaryIndex:
+    """
+    Índice secundario en memoria sobre un atributo: valor -> conjunto de IDs.
+    Los valores None o no hashables no se indexan.
+    """
+    def __init__(self, attribute: str, unique: bool = False, case_insensitive: bool = False):
+        self.attribute = attribute
+        self.unique = unique
+        self.case_insensitive = case_insensitive
+        self._entries: Dict[Any, set] = {}
+
+    def key(self, value: Any) -> Any:
+        """Normaliza un valor a su clave en el índice, o None si no es indexable."""
+        if value is None:
+            return None
+        if self.case_insensitive and isinstance(value, str):
+            return value.casefold()
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        return value
+
+    def lookup(self, value: Any) -> set:
+        return self._entries.get(self.key(value), set())
+
+    def conflicting_id(self, entity: dict) -> Optional[str]:
+        """Para índices únicos, devuelve el ID de otra entidad que ya usa el mismo valor."""
+        key = self.key(entity.get(self.attribute))
+        if not self.unique or key is None:
+            return None
+        for entity_id in self._entries.get(key, ()):
+            if entity_id != entity.get('id'):
+                return entity_id
+        return None
+
+    def add(self, entity: dict):
+        key = self.key(entity.get(self.attribute))
+        if key is not None:
+            self._entries.setdefault(key, set()).add(entity.get('id'))
+
+    def discard(self, entity: dict):
+        key = self.key(entity.get(self.attribute))
+        ids = self._entries.get(key)
+        if ids is not None:
+            ids.discard(entity.get('id'))
+            if not ids:
+                del self._entries[key]
+
+    def has_duplicates(self) -> bool:
+        return any(len(ids) > 1 for ids in self._entries.values())
+
+    def rebuild(self, entities: list):
+        self._entries = {}
+        for entity in entities:
+            self.add(entity)
+
+
+_MISSING = object() # Marca de atributo ausente en una fila compacta
+
+
+class _CompactRow:
+    """
+    Base de las filas compactas de un tipo con esquema registrado: cada atributo del
+    esquema ocupa un slot (sin diccionario por entidad ni claves repetidas) y los
+    atributos fuera del esquema van a `_extra`. Un slot sin asignar equivale a un
+    atributo ausente. Expone la parte de la interfaz de dict que usa JSONStorage.
+    """
+    __slots__ = ()
+    _slots_by_field: Dict[str, str] = {}
+
+    @classmethod
+    def from_dict(cls, entity: dict) -> '_CompactRow':
+        row = cls()
+        extra = None
+        for field, value in entity.items():
+            slot = cls._slots_by_field.get(field)
+            if slot is not None:
+                setattr(row, slot, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[field] = value
+        if extra is not None:
+            row._extra = extra
+        return row
+
+    def to_dict(self) -> dict:
+        entity = {}
+        for field, slot in self._slots_by_field.items():
+            value = getattr(self, slot, _MISSING)
+            if value is not _MISSING:
+                entity[field] = value
+        extra = getattr(self, '_extra', None)
+        if extra:
+            entity.update(extra)
+        return entity
+
+    def get(self, field: str, default: Any = None) -> Any:
+        slot = self._slots_by_field.get(field)
+        if slot is not None:
+            value = getattr(self, slot, _MISSING)
+            return default if value is _MISSING else value
+        return (getattr(self, '_extra', None) or {}).get(field, default)
+
+    def __getitem__(self, field: str) -> Any:
+        value = self.get(field, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field: str) -> bool:
+        return self.get(field, _MISSING) is not _MISSING
+
+    def keys(self):
+        return self.to_dict().keys()
+
+
+def _row_class(entity_type: str, fields: list) -> type:
+    """Crea la clase de fila compacta para un esquema (un slot por atributo)."""
+    slots_by_field = {field: f"_{i}" for i, field in enumerate(dict.fromkeys(fields))}
+    return type(f"_{entity_type}Row", (_CompactRow,), {
+        '__slots__': tuple(slots_by_field.values()) + ('_extra',),
+        '_slots_by_field': slots_by_field,
+    })
+
+
+def _copy_entity(entity: Any) -> dict:
+    """Copia una entidad almacenada (diccionario o fila compacta) como diccionario independiente."""
+    return entity.to_dict() if isinstance(entity, _CompactRow) else dict(entity)
+
+
+def _plain_data(data: dict) -> dict:
+    """Convierte las filas compactas a diccionarios (para formatos que no admiten `default`)."""
+    return {
+        entity_type: [_copy_entity(entity) for entity in entities] if isinstance(entities, list) else entities
+        for entity_type, entities in data.items()
+    }
+
+
+def project_entity(entity: dict, fields: Optional[list]) -> dict:
+    """Copia la entidad conservando solo los atributos pedidos (más su 'id')."""
+    if fields is None:
+        return _copy_entity(entity)
+    projected = {'id': entity.get('id')}
+    projected.update((field, entity[field]) for field in fields if field in entity)
+    return projected
+
+
+class _ReadWriteLock:
+    """
+    Lock de lectores-escritor: varios lectores pueden entrar a la vez y un escritor
+    entra solo. Da preferencia a los escritores en espera para que un flujo continuo
+    de lecturas no los deje esperando indefinidamente.
+    """
+    def __init__(self):
+        self._condition = Condition(Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
 class JSONStorage:
     """
     Clase para manejar la persistencia de datos en un archivo JSON.
     Actúa como una base de datos simple para almacenar diferentes tipos de entidades.
     Cada tipo de entidad (ej. 'users', 'products') se almacena como una lista
     de diccionarios bajo una clave en el diccionario JSON principal.
+
+    La copia en memoria es la autoritativa: solo se vuelve a leer el disco cuando
+    otro proceso modificó los archivos. Los métodos de lectura devuelven copias
+    de las entidades para que los llamadores no alteren el estado interno.
+
+    Con `process_shared=True` varios procesos (p. ej. workers de gunicorn) pueden
+    compartir el mismo archivo: los escritores se serializan con un bloqueo fcntl
+    sobre '<data_file>.lock' y los lectores detectan y cargan los cambios ajenos.
     """
-    def __init__(self, data_file='data.json'):
+    def __init__(self, data_file='data.json', wal_enabled: bool = False, checkpoint_interval: int = 1000,
+                 fsync: bool = True, group_commit_window: float = 0.0, process_shared: bool = False,
+                 snapshot_format: str = 'json', compact_rows: bool = False):
         """
         Inicializa el almacenamiento JSON.
 
         Args:
             data_file (str): El nombre del archivo JSON. Por defecto, 'data.json'.
                                 La ruta completa se construirá basada en la estructura del proyecto.
+            wal_enabled (bool): Si es True, cada mutación se añade como un registro compacto
+                                al log de escritura anticipada (WAL) en lugar de reescribir
+                                todo el archivo JSON.
+            checkpoint_interval (int): Cantidad de registros en el WAL tras la cual se reescribe
+                                el snapshot principal y se vacía el log.
+            fsync (bool): Si es True, cada escritura se sincroniza a disco (os.fsync) antes de confirmarse.
+            group_commit_window (float): Segundos que una escritura espera antes de volcarse a disco para
+                                agrupar en un único volcado las escrituras que lleguen en ese intervalo.
+                                0 desactiva la espera (las escrituras concurrentes igual se agrupan).
+            process_shared (bool): Si es True, coordina escrituras y lecturas con otros procesos
+                                mediante bloqueos de archivo fcntl (no disponible en Windows).
+            snapshot_format (str): Formato con el que se escribe el snapshot: 'json' (indentado),
+                                'compact' (JSON minificado) o 'marshal'. Al cargar, el formato
+                                se detecta automáticamente.
+            compact_rows (bool): Si es True, los tipos con esquema registrado (`register_schema`)
+                                se guardan en memoria como filas compactas en lugar de diccionarios.
+        Raises:
+            ValueError: Si el formato de snapshot no existe.
         """
-        current_dir = os.path.dirname(__file__)
-        project_root = os.path.abspath(os.path.join(current_dir, '..', '..'))
-        self._data_file = os.path.join(project_root, 'database', data_file) 
-        
-        self._lock = Lock() 
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Formato de snapshot desconocido: '{snapshot_format}'. Use uno de {SNAPSHOT_FORMATS}.")
+        self._snapshot_format = snapshot_format
+        self._compact_rows = compact_rows
+        self._row_classes: Dict[str, type] = {} # entity_type -> clase de fila compacta
+        self._change_feed = ChangeFeed()
+        self._changes: list = [] # (entity_type, id | None) aplicados desde el último aviso a los suscriptores
+        self._data_file = resolve_data_file(data_file)
+        self._wal_file = f"{self._data_file}.wal"
+        self._wal_enabled = wal_enabled
+        self._checkpoint_interval = max(1, int(checkpoint_interval))
+        self._wal_records = 0 # Registros en el WAL desde el último checkpoint
+        self._wal_offset = 0 # Bytes del WAL ya aplicados en memoria
+        self._fsync = fsync
+        self._group_commit_window = max(0.0, float(group_commit_window))
+        self._pending_wal = [] # Líneas del WAL aplicadas en memoria y aún no volcadas a disco
+        self._undo_log = [] # (seq, tipo, id, entidad anterior o None) de las mutaciones aún no volcadas
+        self._rolled_back: list = [] # Rangos (desde, hasta) de mutaciones revertidas por un volcado fallido
+        self._mutation_seq = 0 # Número de la última mutación aplicada en memoria
+        self._flushed_seq = 0 # Número de la última mutación volcada a disco
+        self._file_signature = None # Firma (inode, tamaño, mtime) de los archivos en la última carga/escritura propia
+        self._id_index: Dict[str, Dict[str, int]] = {} # entity_type -> {id: posición en la lista}
+        self._secondary_indexes: Dict[str, Dict[str, _SecondaryIndex]] = {} # entity_type -> {atributo: índice}
+        self._sorted_ids: Dict[str, list] = {} # entity_type -> IDs ordenados para paginar; se construye al primer uso
         
-        self._ensure_db_file_exists() 
+        self._lock = _ReadWriteLock() # Lecturas en paralelo; las mutaciones en memoria son exclusivas
+        self._io_lock = Lock() # Serializa los volcados a disco, que se hacen fuera del lock de escritura
+
+        self._process_shared = process_shared
+        if process_shared and fcntl is None:
+            logger.warning("fcntl no está disponible en este sistema. JSONStorage funcionará sin coordinación entre procesos.")
+            self._process_shared = False
+        if self._process_shared and self._group_commit_window:
+            logger.info("Con process_shared el volcado es inmediato: se ignora group_commit_window.")
+            self._group_commit_window = 0.0
+        self._file_lock_mutex = Lock() # flock es por descriptor: los hilos de este proceso se turnan para usarlo
+        self._lock_file = open(f"{self._data_file}.lock", 'a+') if self._process_shared else None
         
-        with self._lock: 
-            self._data = self._load_data() 
-        logger.info(f"JSONStorage inicializado. Datos cargados desde {self._data_file}.")
+        with self._file_lock(exclusive=True):
+            self._ensure_db_file_exists() 
+            with self._lock.write(): 
+                self._data = self._load_data() 
+                self._rebuild_indexes()
+                self._file_signature = self._current_signature()
+        if not self._wal_enabled and self._wal_records:
+            # Quedó un WAL de una ejecución anterior con el modo activado: se consolida en el snapshot.
+            self.checkpoint()
+        logger.info(f"JSONStorage inicializado. Datos cargados desde {self._data_file} (WAL {'activado' if self._wal_enabled else 'desactivado'}, multiproceso {'activado' if self._process_shared else 'desactivado'}).")
+
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """
+        Bloqueo de archivo entre procesos (exclusivo para escritores, compartido para
+        lectores que recargan). Sin `process_shared` no hace nada.
+        Debe adquirirse antes que self._lock.
+        """
+        if not self._process_shared:
+            yield
+            return
+        with self._file_lock_mutex:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+
+    def _write_guard(self):
+        """Contexto que envuelve una escritura completa (recarga, mutación y volcado)."""
+        return self._file_lock(exclusive=True) if self._process_shared else nullcontext()
+
+
+    def _refresh_for_read(self):
+        """
+        En modo multiproceso, carga los cambios de otros procesos antes de una lectura.
+        La comprobación es un par de os.stat; solo se bloquea si hay cambios.
+        """
+        if not self._process_shared or self._current_signature() == self._file_signature:
+            return
+        with self._file_lock(exclusive=False):
+            with self._lock.write():
+                self._refresh_if_changed()
+                events = self._commit_changes()
+        self._change_feed.publish(events)
+
+
+    def _commit_changes(self) -> list:
+        """
+        Avanza las versiones de los tipos modificados y devuelve los eventos a publicar
+        (una vez liberado el lock). Debe llamarse con el lock de escritura adquirido.
+        """
+        changes, self._changes = self._changes, []
+        return self._change_feed.commit(changes)
+
+
+    def subscribe(self, callback: ChangeCallback, entity_type: Optional[str] = None) -> Callable[[], None]:
+        """
+        Registra un callback que se invoca tras cada mutación confirmada como
+        callback(entity_type, version, ids); `ids` es None cuando se recargó todo el tipo.
+        Incluye los cambios de otros procesos en cuanto esta instancia los carga.
+
+        Args:
+            callback: La función a invocar (fuera de los locks del almacenamiento).
+            entity_type (str | None): Tipo a observar; None observa todos.
+        Returns:
+            Callable[[], None]: Función que cancela la suscripción.
+        """
+        return self._change_feed.subscribe(callback, entity_type)
+
+
+    def get_version(self, entity_type: str) -> int:
+        """
+        Devuelve la versión del tipo de entidad; aumenta con cada mutación confirmada.
+        En modo multiproceso carga antes los cambios de otros procesos, así que la versión
+        (y los avisos a los suscriptores) los incluyen.
+        """
+        self._refresh_for_read()
+        return self._change_feed.version(entity_type)
 
 
     def _ensure_db_file_exists(self):
@@ -44,17 +468,237 @@ class JSONStorage:
         db_dir = os.path.dirname(self._data_file)
         if not os.path.exists(db_dir):
             logger.info(f"Creando directorio para la base de datos: {db_dir}")
-            os.makedirs(db_dir) 
+            os.makedirs(db_dir, exist_ok=True)
 
         if not os.path.exists(self._data_file):
             logger.info(f"Creando archivo de base de datos vacío en: {self._data_file}")
-            with open(self._data_file, 'w', encoding='utf-8') as f:
-                json.dump({}, f) 
+            try:
+                # 'x' no trunca un archivo que otro proceso haya creado después de la comprobación.
+                with open(self._data_file, 'x', encoding='utf-8') as f:
+                    json.dump({}, f)
+            except FileExistsError:
+                pass
 
 
     def _load_data(self) -> dict:
         """
-        Carga los datos desde el archivo JSON al diccionario en memoria.
+        Carga los datos desde el archivo JSON al diccionario en memoria y reaplica
+        los registros pendientes del WAL, si existe.
+        """
+        data = self._load_snapshot()
+        self._wal_records, self._wal_offset = self._replay_wal(data)
+        self._discard_torn_wal_tail()
+        return data
+
+
+    def _current_signature(self) -> tuple:
+        """
+        Devuelve una firma barata (inode, tamaño, mtime) del snapshot y del WAL.
+        Si cambia respecto de la registrada, otro proceso modificó los archivos.
+        """
+        signature = []
+        for path in (self._data_file, self._wal_file):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+
+    def _refresh_if_changed(self):
+        """
+        Recarga los datos desde disco solo si los archivos cambiaron desde la última
+        carga o escritura de esta instancia. Debe llamarse con el lock de escritura adquirido.
+        """
+        if self._mutation_seq != self._flushed_seq:
+            # Hay mutaciones propias aún no volcadas: el disco está desactualizado, no es un cambio externo.
+            return
+        signature = self._current_signature()
+        if signature == self._file_signature:
+            return
+
+        snapshot_signature, wal_signature = signature
+        previous_snapshot, previous_wal = self._file_signature or (None, None)
+        if (snapshot_signature == previous_snapshot and wal_signature is not None
+                and (previous_wal is None or (wal_signature[0] == previous_wal[0] and wal_signature[1] >= previous_wal[1]))):
+            # Solo creció el WAL: se aplican únicamente los registros nuevos.
+            records, self._wal_offset = self._read_wal_records(self._wal_offset)
+            self._discard_torn_wal_tail()
+            for record in records:
+                self._apply_record(record)
+            self._wal_records += len(records)
+            logger.info(f"Aplicados {len(records)} registros nuevos del WAL escritos por otro proceso.")
+        else:
+            logger.info(f"Cambios externos detectados en '{self._data_file}'. Recargando datos.")
+            previous_types = set(self._data)
+            self._data = self._load_data()
+            self._rebuild_indexes()
+            self._changes.extend((entity_type, None) for entity_type in previous_types | set(self._data))
+        self._file_signature = self._current_signature()
+
+
+    def _apply_record(self, record: dict):
+        """Aplica un registro del WAL sobre los datos en memoria. Debe llamarse con el lock de escritura adquirido."""
+        if record.get('op') == 'put':
+            self._apply_put(record.get('type'), record['entity'])
+        elif record.get('op') == 'del':
+            self._apply_delete(record.get('type'), record['id'])
+
+
+    def _apply_put(self, entity_type: str, entity: dict) -> bool:
+        """
+        Inserta o reemplaza una entidad manteniendo sincronizados todos los índices.
+        Debe llamarse con el lock de escritura adquirido.
+
+        Returns:
+            bool: True si la entidad ya existía y fue reemplazada.
+        """
+        entities = self._entities_for(entity_type)
+        entity = self._to_stored(entity_type, entity)
+        position = self._id_index[entity_type].get(entity['id'])
+        self._unindex_entity(entity_type, entities[position] if position is not None else None)
+        self._index_entity(entity_type, entity)
+        self._changes.append((entity_type, entity['id']))
+        sorted_ids = self._sorted_ids.get(entity_type)
+        if position is None and sorted_ids is not None:
+            bisect.insort(sorted_ids, entity['id'], key=str)
+        return _put_entity(entities, self._id_index[entity_type], entity)
+
+
+    def _apply_delete(self, entity_type: str, entity_id: str) -> bool:
+        """
+        Elimina una entidad manteniendo sincronizados todos los índices.
+        Debe llamarse con el lock de escritura adquirido.
+
+        Returns:
+            bool: True si la entidad existía.
+        """
+        position = self._id_index.get(entity_type, {}).get(entity_id)
+        if position is None:
+            return False
+        self._unindex_entity(entity_type, self._data[entity_type][position])
+        self._changes.append((entity_type, entity_id))
+        sorted_ids = self._sorted_ids.get(entity_type)
+        if sorted_ids is not None:
+            del sorted_ids[bisect.bisect_left(sorted_ids, str(entity_id), key=str)]
+        return _remove_entity(self._data[entity_type], self._id_index[entity_type], entity_id)
+
+
+    def _rebuild_indexes(self):
+        """
+        Reconstruye el índice de clave primaria y los índices secundarios registrados
+        a partir de los datos en memoria, convirtiendo antes a filas compactas los tipos
+        con esquema. Debe llamarse con el lock de escritura adquirido tras cada carga completa.
+        """
+        for entity_type in self._row_classes:
+            self._compact_entities(entity_type)
+        self._id_index = {
+            entity_type: {entity.get('id'): i for i, entity in enumerate(entities)}
+            for entity_type, entities in self._data.items()
+            if isinstance(entities, list)
+        }
+        for entity_type, indexes in self._secondary_indexes.items():
+            for index in indexes.values():
+                index.rebuild(self._data.get(entity_type, []))
+        self._sorted_ids = {}
+
+
+    def register_schema(self, entity_type: str, fields: list):
+        """
+        Registra los atributos habituales de un tipo de entidad. Con `compact_rows` activado,
+        sus entidades pasan a guardarse en memoria como filas compactas (un slot por atributo,
+        sin repetir las claves en cada entidad); los diccionarios solo se crean al devolverlas.
+        Los atributos que no estén en el esquema se siguen admitiendo.
+
+        Args:
+            entity_type (str): La clave del tipo de entidad.
+            fields (list): Los nombres de los atributos del esquema.
+        """
+        if not self._compact_rows:
+            return
+        with self._lock.write():
+            self._row_classes[entity_type] = _row_class(entity_type, list(fields))
+            self._rebuild_indexes() # Convierte las entidades existentes y reindexa las nuevas filas
+        logger.info(f"Esquema compacto registrado para '{entity_type}' ({len(fields)} atributos).")
+
+
+    def _to_stored(self, entity_type: str, entity: dict) -> Any:
+        """Convierte una entidad al formato en memoria de su tipo (fila compacta o diccionario)."""
+        row_class = self._row_classes.get(entity_type)
+        if row_class is None or isinstance(entity, row_class):
+            return entity
+        return row_class.from_dict(_copy_entity(entity) if isinstance(entity, _CompactRow) else entity)
+
+
+    def _compact_entities(self, entity_type: str):
+        """Convierte a filas compactas las entidades de un tipo. Debe llamarse con el lock de escritura adquirido."""
+        entities = self._data.get(entity_type)
+        if isinstance(entities, list) and entity_type in self._row_classes:
+            self._data[entity_type] = [self._to_stored(entity_type, entity) for entity in entities]
+
+
+    def register_index(self, entity_type: str, attribute: str, unique: bool = False, case_insensitive: bool = False):
+        """
+        Registra un índice secundario sobre un atributo para que `find_by_attribute`
+        no tenga que recorrer todas las entidades del tipo.
+
+        Args:
+            entity_type (str): La clave del tipo de entidad.
+            attribute (str): El atributo a indexar.
+            unique (bool): Si es True, `save_entity` rechaza dos entidades con el mismo valor.
+            case_insensitive (bool): Si es True, las búsquedas por este atributo
+                                     ignoran mayúsculas/minúsculas en valores de texto.
+        """
+        with self._lock.write():
+            index = _SecondaryIndex(attribute, unique=unique, case_insensitive=case_insensitive)
+            index.rebuild(self._data.get(entity_type, []))
+            self._secondary_indexes.setdefault(entity_type, {})[attribute] = index
+            if unique and index.has_duplicates():
+                logger.warning(f"El índice único '{entity_type}.{attribute}' contiene valores duplicados en los datos existentes.")
+        logger.info(f"Índice secundario registrado sobre '{entity_type}.{attribute}' (único={unique}, sin_mayúsculas={case_insensitive}).")
+
+
+    def _unindex_entity(self, entity_type: str, entity: Optional[dict]):
+        """Quita una entidad de los índices secundarios. Debe llamarse con el lock de escritura adquirido."""
+        if entity is None:
+            return
+        for index in self._secondary_indexes.get(entity_type, {}).values():
+            index.discard(entity)
+
+
+    def _index_entity(self, entity_type: str, entity: dict):
+        """Añade una entidad a los índices secundarios. Debe llamarse con el lock de escritura adquirido."""
+        for index in self._secondary_indexes.get(entity_type, {}).values():
+            index.add(entity)
+
+
+    def _unique_conflict(self, entity_type: str, entity: dict) -> Optional[str]:
+        """
+        Devuelve el mensaje de error si la entidad viola algún índice único, o None.
+        Debe llamarse con el lock de escritura adquirido.
+        """
+        for index in self._secondary_indexes.get(entity_type, {}).values():
+            conflicting_id = index.conflicting_id(entity)
+            if conflicting_id:
+                return f"El valor de '{index.attribute}' ya está en uso por la entidad '{conflicting_id}' en '{entity_type}'."
+        return None
+
+
+    def _entities_for(self, entity_type: str) -> list:
+        """
+        Devuelve la lista interna de un tipo de entidad, creándola (junto con su índice) si no existe.
+        Debe llamarse con el lock de escritura adquirido.
+        """
+        if entity_type not in self._data:
+            self._data[entity_type] = []
+            self._id_index[entity_type] = {}
+        return self._data[entity_type]
+
+
+    def _load_snapshot(self) -> dict:
+        """
+        Carga el snapshot desde el archivo, detectando su formato (JSON, JSON compacto o marshal).
         Si el archivo no existe o está vacío/corrupto, inicializa los datos como un diccionario vacío.
         """
         logger.info(f"Cargando datos desde: {self._data_file}")
@@ -64,8 +708,8 @@ class JSONStorage:
                 self._ensure_db_file_exists() 
                 return {}
             
-            with open(self._data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(self._data_file, 'rb') as f:
+                data = parse_snapshot(f.read())
                 logger.info(f"Datos cargados exitosamente desde '{self._data_file}'.")
                 if not isinstance(data, dict): 
                         logger.warning(f"El contenido de '{self._data_file}' no es un diccionario. Inicializando con datos vacíos.")
@@ -83,23 +727,290 @@ class JSONStorage:
             raise 
 
 
-    def _save_data(self, data: dict):
+    def _save_data(self, payload: bytes):
         """
-        Guarda los datos del diccionario en memoria de vuelta al archivo JSON.
+        Guarda los datos ya serializados (ver `serialize_snapshot`) en el archivo.
+        Reemplaza atómicamente el archivo JSON: escribe en un temporal del mismo
+        directorio, lo sincroniza a disco y lo renombra con os.replace. Un lector
+        concurrente o un fallo a mitad de escritura nunca ven un archivo truncado.
         """
         logger.info(f"Guardando datos en {self._data_file}...")
+        db_dir = os.path.dirname(self._data_file)
+        fd, tmp_path = tempfile.mkstemp(dir=db_dir, prefix=f".{os.path.basename(self._data_file)}.", suffix=".tmp")
         try:
-            with open(self._data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                if self._fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self._data_file)
+            if self._fsync:
+                self._fsync_directory(db_dir)
             logger.info(f"Datos guardados exitosamente en {self._data_file}.")
         except IOError as e:
             logger.critical(f"ERROR CRÍTICO: Fallo de E/S al guardar datos en '{self._data_file}': {e}")
+            self._discard_temp_file(tmp_path)
             raise 
         except Exception as e:
             logger.critical(f"ERROR CRÍTICO: Fallo inesperado al guardar datos en '{self._data_file}': {e}")
+            self._discard_temp_file(tmp_path)
             raise 
 
 
+    @staticmethod
+    def _discard_temp_file(tmp_path: str):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+    @staticmethod
+    def _fsync_directory(directory: str):
+        """Sincroniza la entrada de directorio tras un rename (no soportado en Windows)."""
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+    def _read_wal_records(self, offset: int = 0) -> tuple:
+        """
+        Lee los registros completos del WAL a partir de `offset` (en bytes).
+        Una última línea incompleta (escritura interrumpida o en curso) no se consume.
+
+        Returns:
+            tuple: (lista de registros, offset hasta el que se leyó).
+        """
+        if not os.path.exists(self._wal_file):
+            return [], 0
+
+        with open(self._wal_file, 'rb') as f:
+            f.seek(offset)
+            content = f.read()
+
+        records = []
+        for line in content.split(b'\n')[:-1]: # El último fragmento no terminó en salto de línea
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Registro corrupto en '{self._wal_file}' (byte {offset}). Se descarta el resto del log.")
+                    break
+            offset += len(line) + 1
+        return records, offset
+
+
+    def _discard_torn_wal_tail(self):
+        """
+        Recorta del WAL lo que sigue al último registro leído (una línea incompleta por una
+        escritura interrumpida, o un registro corrupto y lo posterior, que ya se descartaron al
+        leer). Sin esto, el próximo registro se añadiría pegado a esos bytes y se perdería en
+        el siguiente arranque. Debe llamarse con el lock de escritura adquirido y, en modo
+        multiproceso, con el bloqueo de archivo tomado (ningún otro proceso está escribiendo).
+        """
+        try:
+            size = os.path.getsize(self._wal_file)
+        except FileNotFoundError:
+            return
+        if size <= self._wal_offset:
+            return
+        logger.warning(f"Se recortan {size - self._wal_offset} bytes incompletos o corruptos al final de '{self._wal_file}'.")
+        with open(self._wal_file, 'r+b') as f:
+            f.truncate(self._wal_offset)
+            if self._fsync:
+                os.fsync(f.fileno())
+
+
+    def _replay_wal(self, data: dict) -> tuple:
+        """
+        Aplica sobre `data` los registros del WAL posteriores al último checkpoint.
+
+        Returns:
+            tuple: (cantidad de registros aplicados, offset del WAL hasta el que se leyó).
+        """
+        records, offset = self._read_wal_records()
+
+        id_index = {} # entity_type -> {id: posición}, para no recorrer listas en cada registro
+        for record in records:
+            entity_type = record.get('type')
+            entities = data.setdefault(entity_type, [])
+            if entity_type not in id_index:
+                id_index[entity_type] = {entity.get('id'): i for i, entity in enumerate(entities)}
+
+            if record.get('op') == 'put':
+                _put_entity(entities, id_index[entity_type], record['entity'])
+            elif record.get('op') == 'del':
+                _remove_entity(entities, id_index[entity_type], record['id'])
+
+        if records:
+            logger.info(f"Reaplicados {len(records)} registros del WAL '{self._wal_file}'.")
+        return len(records), offset
+
+
+    def _append_wal(self, lines: list):
+        """
+        Añade registros compactos (una línea JSON por registro) al final del WAL con una sola escritura.
+        """
+        payload = ''.join(lines).encode('utf-8')
+        try:
+            with open(self._wal_file, 'ab') as f:
+                f.write(payload)
+                f.flush()
+                if self._fsync:
+                    os.fsync(f.fileno())
+        except IOError as e:
+            logger.critical(f"ERROR CRÍTICO: Fallo de E/S al escribir en el WAL '{self._wal_file}': {e}")
+            self._discard_torn_wal_tail() # Una escritura parcial no debe quedar pegada al próximo registro
+            raise
+        self._wal_offset += len(payload)
+
+
+    def _stored_entity(self, entity_type: str, entity_id: str) -> Any:
+        """Devuelve la entidad tal como está en memoria (sin copiar), o None. Debe llamarse con un lock adquirido."""
+        position = self._id_index.get(entity_type, {}).get(entity_id)
+        return self._data[entity_type][position] if position is not None else None
+
+
+    def _stage(self, record: dict, previous: Any) -> int:
+        """
+        Registra una mutación ya aplicada en memoria para el próximo volcado a disco,
+        junto con la entidad que reemplazó (`previous`, None si no existía) para poder
+        revertirla si el volcado falla. Debe llamarse con el lock de escritura adquirido.
+
+        Returns:
+            int: El número de secuencia de la mutación, que se pasa a `_flush`.
+        """
+        self._mutation_seq += 1
+        entity_id = record['entity']['id'] if record['op'] == 'put' else record['id']
+        self._undo_log.append((self._mutation_seq, record['type'], entity_id, previous))
+        if self._wal_enabled:
+            self._pending_wal.append(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+            self._wal_records += 1
+        return self._mutation_seq
+
+
+    def _flush(self, seq: int, checkpoint: bool = False):
+        """
+        Vuelca a disco todas las mutaciones pendientes hasta, al menos, la número `seq`.
+        Se llama sin el lock de escritura: mientras un hilo escribe, los demás siguen
+        aplicando mutaciones en memoria, y el siguiente volcado las agrupa todas
+        (group commit). Si otro hilo ya volcó `seq`, no hace nada.
+        El estado a volcar se captura con el lock de lectura: los escritores quedan
+        excluidos y `self._io_lock` garantiza que un solo hilo toca el WAL pendiente,
+        así que las lecturas concurrentes no se bloquean ni durante la serialización.
+        Con el WAL activado añade las líneas pendientes al log y hace checkpoint cada
+        `checkpoint_interval` registros; de lo contrario reescribe el snapshot completo.
+
+        Si la escritura falla, se revierten en memoria todas las mutaciones aún no volcadas
+        (ver `_rollback_unflushed`), así ninguna queda visible ni se guarda más tarde.
+
+        Raises:
+            OSError: Si la mutación `seq` no se pudo guardar (en este volcado o en uno
+                     anterior que la agrupó y falló).
+        """
+        if self._group_commit_window and not checkpoint:
+            time.sleep(self._group_commit_window)
+
+        with self._io_lock:
+            if self._flushed_seq >= seq and not checkpoint:
+                self._raise_if_rolled_back(seq) # Ya resuelta: guardada, o revertida por un volcado fallido
+                return
+
+            with self._lock.read():
+                target_seq = self._mutation_seq
+                write_snapshot = checkpoint or not self._wal_enabled or self._wal_records >= self._checkpoint_interval
+                lines = self._pending_wal
+                self._pending_wal = []
+                if write_snapshot:
+                    checkpointed_records = self._wal_records
+                    self._wal_records = 0
+                    payload = serialize_snapshot(self._data, self._snapshot_format)
+
+            try:
+                if write_snapshot:
+                    self._save_data(payload)
+                elif lines:
+                    self._append_wal(lines)
+            except Exception as e:
+                with self._lock.write():
+                    # En disco quedan los registros ya volcados: los pendientes se descartan junto
+                    # con sus mutaciones, incluidas las aplicadas después de capturar este volcado.
+                    if write_snapshot:
+                        self._wal_records = checkpointed_records - len(lines)
+                    else:
+                        self._wal_records -= len(lines) + len(self._pending_wal)
+                    self._pending_wal = []
+                    self._rollback_unflushed(e)
+                    events = self._commit_changes()
+                self._change_feed.publish(events)
+                raise
+
+            if write_snapshot:
+                self._wal_offset = 0
+                try:
+                    if os.path.exists(self._wal_file):
+                        os.remove(self._wal_file)
+                        logger.info(f"Checkpoint completado: {checkpointed_records} registros del WAL consolidados en {self._data_file}.")
+                except OSError as e:
+                    # El snapshot ya incluye esos registros: reaplicarlos en el arranque no cambia el resultado.
+                    logger.error(f"No se pudo eliminar el WAL '{self._wal_file}' tras el checkpoint: {e}")
+
+            with self._lock.read():
+                self._flushed_seq = target_seq
+                self._undo_log = [entry for entry in self._undo_log if entry[0] > target_seq]
+                self._file_signature = self._current_signature()
+
+
+    def _rollback_unflushed(self, error: Exception):
+        """
+        Revierte en memoria, de la más reciente a la más antigua, las mutaciones aún no
+        volcadas y recuerda sus números para que los escritores que las esperan reciban
+        el error. Debe llamarse con el lock de escritura adquirido.
+        """
+        for _, entity_type, entity_id, previous in reversed(self._undo_log):
+            if previous is None:
+                self._apply_delete(entity_type, entity_id)
+            else:
+                self._apply_put(entity_type, previous)
+        if self._mutation_seq > self._flushed_seq:
+            self._rolled_back.append((self._flushed_seq + 1, self._mutation_seq, error))
+            logger.error(f"Revertidas en memoria {self._mutation_seq - self._flushed_seq} mutaciones que no se pudieron guardar: {error}")
+        self._undo_log = []
+        self._flushed_seq = self._mutation_seq # Memoria y disco vuelven a coincidir
+
+
+    def _raise_if_rolled_back(self, seq: int):
+        """Lanza OSError si la mutación `seq` fue revertida por un volcado fallido."""
+        for first, last, error in self._rolled_back:
+            if first <= seq <= last:
+                raise OSError(f"La escritura no se guardó en '{self._data_file}': {error}")
+
+
+    def checkpoint(self):
+        """
+        Consolida el WAL en el snapshot principal. Puede invocarse periódicamente
+        (o al apagar la aplicación) para acotar el tiempo de reaplicación en el arranque.
+        """
+        with self._write_guard():
+            with self._lock.write():
+                self._refresh_if_changed()
+                events = self._commit_changes()
+            self._flush(self._mutation_seq, checkpoint=True)
+        self._change_feed.publish(events)
+
+
+    def entity_types(self) -> list:
+        """Devuelve los tipos de entidad presentes en el almacenamiento."""
+        self._refresh_for_read()
+        with self._lock.read():
+            return list(self._data)
+
+
     def get_all(self, entity_type: str) -> list:
         """
         Recupera todas las entidades de un tipo específico.
@@ -111,10 +1022,9 @@ class JSONStorage:
             list: Una lista de diccionarios que representan las entidades.
                     Retorna una lista vacía si el tipo de entidad no existe.
         """
-        with self._lock:
-            if entity_type not in self._data:
-                self._data[entity_type] = [] 
-            return list(self._data.get(entity_type, []))
+        self._refresh_for_read()
+        with self._lock.read():
+            return [_copy_entity(entity) for entity in self._data.get(entity_type, [])]
 
 
     def save_entity(self, entity_type: str, entity_data: dict) -> dict:
@@ -129,43 +1039,166 @@ class JSONStorage:
         Returns:
             dict: El diccionario de la entidad guardada (con ID asignado si es nuevo).
         Raises:
-            ValueError: Si entity_data no contiene una clave 'id' (y no se pudo generar una).
+            ValueError: Si la entidad viola un índice único registrado.
         """
         logger.info(f"save_entity: Iniciando guardado para tipo '{entity_type}'.")
         
         if 'id' not in entity_data or not entity_data['id']:
             entity_data['id'] = str(uuid.uuid4())
             logger.info(f"save_entity: ID generado para nueva entidad: {entity_data['id']}.")
+        stored_data = dict(entity_data) # Copia propia: el llamador puede seguir modificando su diccionario
         
-        with self._lock: 
-            self._data = self._load_data() 
+        events = []
+        try:
+            with self._write_guard():
+                with self._lock.write(): 
+                    self._refresh_if_changed()
 
-            if entity_type not in self._data:
-                self._data[entity_type] = []
-                logger.info(f"save_entity: Creada nueva lista para '{entity_type}'.")
-
-            found = False
-            for i, existing_entity in enumerate(self._data[entity_type]):
-                if existing_entity.get('id') == entity_data['id']:
-                    self._data[entity_type][i] = entity_data 
-                    found = True
-                    logger.info(f"save_entity: Entidad con ID '{entity_data['id']}' actualizada.")
-                    break
-            
-            if not found:
-                self._data[entity_type].append(entity_data) 
-                logger.info(f"save_entity: Entidad con ID '{entity_data['id']}' añadida.")
-            
-            try:
-                self._save_data(self._data) 
-                logger.info(f"save_entity: Proceso de guardado completado para ID: {entity_data['id']}.")
-            except Exception as e:
-                logger.error(f"ERROR CRÍTICO: Fallo en self._save_data dentro de save_entity: {e}")
-                raise 
+                    conflict = self._unique_conflict(entity_type, stored_data)
+                    if conflict:
+                        raise ValueError(conflict)
+
+                    previous = self._stored_entity(entity_type, stored_data['id'])
+                    if self._apply_put(entity_type, stored_data):
+                        logger.info(f"save_entity: Entidad con ID '{entity_data['id']}' actualizada.")
+                    else:
+                        logger.info(f"save_entity: Entidad con ID '{entity_data['id']}' añadida.")
+                    seq = self._stage({'op': 'put', 'type': entity_type, 'entity': stored_data}, previous)
+                    events = self._commit_changes()
+                    
+                try:
+                    self._flush(seq)
+                    logger.info(f"save_entity: Proceso de guardado completado para ID: {entity_data['id']}.")
+                except Exception as e:
+                    logger.error(f"ERROR CRÍTICO: Fallo al persistir dentro de save_entity: {e}")
+                    raise 
+        finally:
+            # Fuera de los locks: un suscriptor puede volver a leer del almacenamiento.
+            self._change_feed.publish(events)
         
         return entity_data
 
 
+    def save_entities(self, entity_type: str, items: list) -> list:
+        """
+        Guarda o actualiza muchas entidades con una sola adquisición del lock y un
+        único volcado a disco. Cada entidad se valida por separado: una que viola un
+        índice único se rechaza sin afectar a las demás.
+
+        Args:
+            entity_type (str): La clave del tipo de entidad.
+            items (list): Los diccionarios a guardar (se les asigna 'id' si no lo tienen).
+        Returns:
+            list: Un resultado por entidad, en el mismo orden:
+                    {'ok': True, 'entity': dict} o {'ok': False, 'error': str}.
+        """
+        results = []
+        seq = None
+        events = []
+        try:
+            with self._write_guard():
+                with self._lock.write():
+                    self._refresh_if_changed()
+                    for entity_data in items:
+                        if 'id' not in entity_data or not entity_data['id']:
+                            entity_data['id'] = str(uuid.uuid4())
+                        stored_data = dict(entity_data)
+
+                        conflict = self._unique_conflict(entity_type, stored_data)
+                        if conflict:
+                            results.append({'ok': False, 'error': conflict})
+                            continue
+
+                        previous = self._stored_entity(entity_type, stored_data['id'])
+                        self._apply_put(entity_type, stored_data)
+                        seq = self._stage({'op': 'put', 'type': entity_type, 'entity': stored_data}, previous)
+                        results.append({'ok': True, 'entity': entity_data})
+                    events = self._commit_changes()
+
+                if seq is not None:
+                    self._flush(seq)
+        finally:
+            self._change_feed.publish(events)
+        logger.info(f"save_entities: {sum(r['ok'] for r in results)} de {len(items)} entidades guardadas en '{entity_type}'.")
+        return results
+
+
+    def compare_and_set(self, entity_type: str, attribute: str, changes: list) -> list:
+        """
+        Cambia un atributo de muchas entidades solo donde todavía tiene el valor esperado,
+        con una sola adquisición del lock y un único volcado a disco. El resto de cada entidad
+        se toma de la copia guardada, así que no se pisan las escrituras hechas desde que
+        el llamador la leyó.
+
+        Args:
+            entity_type (str): La clave del tipo de entidad.
+            attribute (str): El atributo a cambiar.
+            changes (list): Tuplas (id, valor_esperado, valor_nuevo).
+        Returns:
+            list: Un booleano por cambio, en el mismo orden: True si se aplicó; False si la
+                    entidad no existe, el atributo ya no tenía el valor esperado o el valor
+                    nuevo viola un índice único.
+        """
+        results = []
+        seq = None
+        events = []
+        try:
+            with self._write_guard():
+                with self._lock.write():
+                    self._refresh_if_changed()
+                    for entity_id, expected, new_value in changes:
+                        previous = self._stored_entity(entity_type, entity_id)
+                        if previous is None or previous.get(attribute) != expected:
+                            results.append(False)
+                            continue
+                        current = _copy_entity(previous)
+                        current[attribute] = new_value
+                        if self._unique_conflict(entity_type, current):
+                            results.append(False)
+                            continue
+                        self._apply_put(entity_type, current)
+                        seq = self._stage({'op': 'put', 'type': entity_type, 'entity': current}, previous)
+                        results.append(True)
+                    events = self._commit_changes()
+
+                if seq is not None:
+                    self._flush(seq)
+        finally:
+            self._change_feed.publish(events)
+        logger.info(f"compare_and_set: {sum(results)} de {len(changes)} entidades actualizadas en '{entity_type}.{attribute}'.")
+        return results
+
+
+    def delete_entities(self, entity_type: str, entity_ids: list) -> list:
+        """
+        Elimina muchas entidades con una sola adquisición del lock y un único volcado a disco.
+
+        Returns:
+            list: Un booleano por ID, en el mismo orden: True si se eliminó, False si no existía.
+        """
+        results = []
+        seq = None
+        events = []
+        try:
+            with self._write_guard():
+                with self._lock.write():
+                    self._refresh_if_changed()
+                    for entity_id in entity_ids:
+                        previous = self._stored_entity(entity_type, entity_id)
+                        deleted = self._apply_delete(entity_type, entity_id)
+                        if deleted:
+                            seq = self._stage({'op': 'del', 'type': entity_type, 'id': entity_id}, previous)
+                        results.append(deleted)
+                    events = self._commit_changes()
+
+                if seq is not None:
+                    self._flush(seq)
+        finally:
+            self._change_feed.publish(events)
+        logger.info(f"delete_entities: {sum(results)} de {len(entity_ids)} entidades eliminadas de '{entity_type}'.")
+        return results
+
+
     def get_by_id(self, entity_type: str, entity_id: str) -> Optional[dict]:
         """
         Recupera una entidad por su ID.
@@ -178,14 +1211,72 @@ class JSONStorage:
             dict | None: El diccionario que representa la entidad si se encuentra,
                             None si no se encuentra.
         """
-        with self._lock:
-            if entity_type not in self._data:
+        self._refresh_for_read()
+        with self._lock.read():
+            position = self._id_index.get(entity_type, {}).get(entity_id)
+            if position is None:
                 return None 
-            
-            for entity in self._data.get(entity_type, []):
-                if entity.get('id') == entity_id:
-                    return entity
-            return None
+            return _copy_entity(self._data[entity_type][position])
+
+
+    def _sorted_ids_for(self, entity_type: str) -> list:
+        """
+        Devuelve los IDs del tipo ordenados (como texto), construyéndolos la primera vez.
+        Puede llamarse con el lock de lectura: los escritores están excluidos y, si dos
+        lectores lo construyen a la vez, ambos obtienen la misma lista.
+        """
+        sorted_ids = self._sorted_ids.get(entity_type)
+        if sorted_ids is None:
+            sorted_ids = sorted(self._id_index.get(entity_type, {}), key=str)
+            self._sorted_ids[entity_type] = sorted_ids
+        return sorted_ids
+
+
+    def get_page(self, entity_type: str, after_id: Optional[str] = None, limit: int = 100,
+                 fields: Optional[list] = None) -> tuple:
+        """
+        Devuelve una página de entidades ordenadas por ID (paginación por cursor).
+        Solo se copian las entidades de la página, no la colección completa.
+
+        Args:
+            entity_type (str): La clave del tipo de entidad.
+            after_id (str | None): Cursor: se devuelven las entidades con ID posterior a este.
+            limit (int): Cantidad máxima de entidades de la página.
+            fields (list | None): Atributos a incluir (el 'id' se incluye siempre). None incluye todos.
+
+        Returns:
+            tuple: (lista de entidades, cursor de la página siguiente o None si no hay más).
+        """
+        limit = max(1, int(limit))
+        self._refresh_for_read()
+        with self._lock.read():
+            if entity_type not in self._data:
+                return [], None
+            sorted_ids = self._sorted_ids_for(entity_type)
+            start = bisect.bisect_right(sorted_ids, str(after_id), key=str) if after_id is not None else 0
+            page_ids = sorted_ids[start:start + limit]
+            entities, id_index = self._data[entity_type], self._id_index[entity_type]
+            items = [project_entity(entities[id_index[entity_id]], fields) for entity_id in page_ids]
+            has_more = start + limit < len(sorted_ids)
+        return items, (page_ids[-1] if has_more and page_ids else None)
+
+
+    def iter_entities(self, entity_type: str, after_id: Optional[str] = None, fields: Optional[list] = None,
+                      batch_size: int = 500):
+        """
+        Recorre todas las entidades de un tipo en orden de ID, de a `batch_size` por vez.
+        El lock solo se toma mientras se copia cada lote, así que las escrituras pueden
+        intercalarse: cada lote refleja el estado del momento en que se leyó.
+
+        Yields:
+            dict: Cada entidad (proyectada a `fields` si se indica).
+        """
+        cursor = after_id
+        while True:
+            items, cursor = self.get_page(entity_type, after_id=cursor, limit=batch_size, fields=fields)
+            yield from items
+            if cursor is None:
+                return
 
 
     def delete_entity(self, entity_type: str, entity_id: str) -> bool:
@@ -199,26 +1290,30 @@ class JSONStorage:
         Returns:
             bool: True si la entidad fue eliminada exitosamente, False si no se encontró.
         """
-        with self._lock:
-            if entity_type not in self._data:
-                return False
+        events = []
+        try:
+            with self._write_guard():
+                with self._lock.write():
+                    self._refresh_if_changed()
+                    previous = self._stored_entity(entity_type, entity_id)
+                    if not self._apply_delete(entity_type, entity_id):
+                        logger.info(f"Entidad con ID '{entity_id}' no encontrada para eliminar en '{entity_type}'.")
+                        return False
+                    seq = self._stage({'op': 'del', 'type': entity_type, 'id': entity_id}, previous)
+                    events = self._commit_changes()
 
-            original_len = len(self._data[entity_type])
-            self._data[entity_type] = [
-                entity for entity in self._data[entity_type]
-                if entity.get('id') != entity_id
-            ]
-            if len(self._data[entity_type]) < original_len:
-                self._save_data(self._data) 
-                logger.info(f"Entidad con ID '{entity_id}' eliminada de '{entity_type}'.")
-                return True
-            logger.info(f"Entidad con ID '{entity_id}' no encontrada para eliminar en '{entity_type}'.")
-            return False
+                self._flush(seq)
+        finally:
+            self._change_feed.publish(events)
+        logger.info(f"Entidad con ID '{entity_id}' eliminada de '{entity_type}'.")
+        return True
 
 
     def find_by_attribute(self, entity_type: str, attribute: str, value: Any) -> list:
         """
         Encuentra entidades que coinciden con un atributo y valor específicos.
+        Si el atributo tiene un índice secundario registrado se consulta el índice
+        (con su semántica de mayúsculas); de lo contrario se recorren todas las entidades.
 
         Args:
             entity_type (str): La clave del tipo de entidad.
@@ -228,12 +1323,19 @@ class JSONStorage:
         Returns:
             list: Una lista de diccionarios que representan las entidades encontradas.
         """
-        with self._lock:
+        self._refresh_for_read()
+        with self._lock.read():
             if entity_type not in self._data:
                 return [] 
+
+            index = self._secondary_indexes.get(entity_type, {}).get(attribute)
+            if index is not None and index.key(value) is not None:
+                id_index = self._id_index[entity_type]
+                positions = sorted(id_index[entity_id] for entity_id in index.lookup(value))
+                return [_copy_entity(self._data[entity_type][position]) for position in positions]
             
             results = [
-                entity for entity in self._data.get(entity_type, [])
+                _copy_entity(entity) for entity in self._data.get(entity_type, [])
                 if entity.get(attribute) == value
             ]
             return results
@@ -0,0 +1,60 @@
+# backend/repositories/lru_cache.py
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+class LRUCache:
+    """
+    Caché en memoria acotada por cantidad de elementos (se descarta el menos usado)
+    y por antigüedad (cada elemento expira `ttl_seconds` después de guardarse).
+    Es segura para usar desde varios hilos.
+    """
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_size (int): Cantidad máxima de elementos. 0 desactiva la caché.
+            ttl_seconds (float): Segundos que un elemento sigue siendo válido. 0 o menos: sin expiración.
+        """
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # clave -> (valor, expira_en)
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve el valor guardado o None si no existe o expiró."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        """Guarda un valor, descartando el menos usado si se supera el tamaño máximo."""
+        if not self.max_size:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self._hits, "misses": self._misses}
@@ -1,56 +1,250 @@
 # backend/repositories/product_repository.py
+import os
+import json
+import time
+import asyncio
 import logging
+import threading
 from typing import List, Optional, Dict, Any, Tuple
 from backend.models.product import Product
 from backend.services.external_product_service import ExternalProductService
+from backend.repositories.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+class _CatalogSnapshot:
+    """
+    Catálogo de productos cargado de una vez: productos en orden, índice por ID, total
+    informado por la API externa y momento de carga.
+    """
+    __slots__ = ("by_id", "products", "total_from_api", "loaded_at")
+
+    def __init__(self, all_products_data: List[Dict[str, Any]], total_from_api: int,
+                 fetched_at: Optional[float] = None):
+        """
+        Args:
+            all_products_data (list): Productos tal como los devuelve la API externa.
+            total_from_api (int): Total informado por la API externa.
+            fetched_at (float, optional): Momento (time.time()) en que se obtuvieron, si no es ahora
+                                          (p. ej. al cargarlos de disco). Se usa para calcular la antigüedad.
+        """
+        self.by_id: Dict[str, Product] = {}
+        self.products: List[Product] = []
+        for product_data in all_products_data:
+            try:
+                self.add(Product.from_dict(product_data))
+            except Exception as e:
+                logger.error(f"Error al procesar producto {product_data.get('id')}: {e}")
+        self.total_from_api = total_from_api
+        self.loaded_at = time.monotonic()
+        if fetched_at is not None:
+            self.loaded_at -= max(0.0, time.time() - fetched_at)
+
+    def add(self, product: Product) -> None:
+        self.by_id[product.id] = product
+        self.products.append(product)
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
 class ProductRepository:
     """
     Repositorio que maneja el almacenamiento y la recuperación de productos.
     Actúa como una capa de abstracción entre la fuente de datos externa 
     y el resto de la aplicación, incluyendo un caché para los datos.
     """
-    def __init__(self, external_product_service: ExternalProductService):
+    REFRESH_RETRY_SECONDS = 60 # Espera máxima antes de reintentar un refresco fallido
+
+    def __init__(self, external_product_service: ExternalProductService, async_product_service=None,
+                 catalog_ttl_seconds: float = 600.0, snapshot_file: Optional[str] = None,
+                 snapshot_max_age_seconds: float = 86400.0):
+        """
+        Args:
+            external_product_service (ExternalProductService): Servicio bloqueante de la API externa.
+            async_product_service (AsyncExternalProductService, optional): Variante asyncio que usan
+                                  los métodos *_async (para un servidor ASGI). Si no se pasa, esos
+                                  métodos ejecutan el servicio bloqueante en un hilo.
+            catalog_ttl_seconds (float): Segundos tras los que el catálogo se refresca en segundo
+                                  plano mientras se sigue sirviendo el actual. 0 lo desactiva.
+            snapshot_file (str, optional): Archivo donde se guarda cada catálogo obtenido de la API
+                                  externa. Al iniciar se carga desde ahí, así un worker nuevo responde
+                                  sin esperar la carga completa (y lo refresca en segundo plano si venció).
+            snapshot_max_age_seconds (float): Antigüedad máxima del archivo para usarlo al iniciar.
+        """
         self.external_product_service = external_product_service
-        # Caché para almacenar todos los productos obtenidos de la API externa
-        # Se guarda como un diccionario para fácil acceso por ID
-        self._cache: Dict[str, Product] = {}
-        # Lista completa de productos para facilitar la paginación y filtros
-        self._all_products_list: List[Product] = [] 
-        # Almacena el total de productos reportado por la API externa
-        self._total_products_from_api: int = 0
-        self._cache_is_loaded = False
+        self.async_product_service = async_product_service
+        # Catálogo completo obtenido de la API externa (ver _CatalogSnapshot). Al refrescarlo se
+        # reemplaza la referencia entera, así nadie ve un catálogo a medio cargar.
+        self._snapshot: Optional[_CatalogSnapshot] = None
+        # Pasado este tiempo el catálogo se sigue sirviendo pero se refresca en segundo plano. 0 = nunca.
+        self.catalog_ttl_seconds = float(catalog_ttl_seconds)
+        self._refresh_lock = threading.Lock() # Tomado mientras hay un refresco en segundo plano
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._retry_refresh_at = 0.0 # Tras un refresco fallido, no se reintenta antes de este instante
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"refreshes": 0, "refresh_failures": 0, "last_refresh_duration_s": None}
+        self.snapshot_file = snapshot_file
+        self.snapshot_max_age_seconds = float(snapshot_max_age_seconds)
+        if self.snapshot_file:
+            self._snapshot = self._read_snapshot_file()
+        # Las peticiones concurrentes que encuentran el caché vacío (o piden el mismo producto
+        # que falta) esperan una única llamada a la API externa en lugar de lanzar una cada una.
+        self._single_flight = SingleFlight()
         logger.info("ProductRepository inicializado.")
 
-    def _load_cache(self) -> None:
+    def _load_cache(self) -> _CatalogSnapshot:
         """
-        Carga todos los productos desde el servicio externo al caché.
-        Esta operación solo debería realizarse una vez o cuando los datos necesiten ser refrescados.
+        Devuelve el catálogo en caché, cargándolo desde el servicio externo la primera vez.
+        Si el catálogo superó su TTL se sigue sirviendo y se refresca en segundo plano
+        (stale-while-revalidate).
         """
-        if self._cache_is_loaded and self._all_products_list: # Solo cargar si no está cargado o si la lista está vacía
-            return
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.products: # Solo cargar si no está cargado o si la lista está vacía
+            self._maybe_refresh_in_background(snapshot)
+            return snapshot
+        self._single_flight.do(("catalog",), self._fetch_catalog)
+        return self._snapshot
 
+    def _fetch_catalog(self) -> None:
+        if self._snapshot is not None and self._snapshot.products: # Otra llamada lo cargó mientras se esperaba
+            return
         logger.info("Cargando todos los productos desde la API externa al caché...")
+        started = time.monotonic()
         # El servicio externo ahora se encarga de realizar múltiples llamadas
         # para obtener todos los productos base. Se pide un límite alto para asegurar la recolección inicial.
         all_products_data, total_from_api = self.external_product_service.get_all_products(limit=100) # Un limit=100 a la API base debería traer la primera tanda completa. El servicio luego hace más si es necesario.
-        
-        self._cache = {}
-        self._all_products_list = []
-        for product_data in all_products_data:
-            try:
-                product = Product.from_dict(product_data)
-                self._cache[product.id] = product
-                self._all_products_list.append(product)
-            except Exception as e:
-                logger.error(f"Error al procesar producto {product_data.get('id')}: {e}")
-        
-        self._total_products_from_api = total_from_api 
-        self._cache_is_loaded = True
-        logger.info(f"Caché de productos cargado. Total de productos en caché: {len(self._all_products_list)}.")
-        logger.info(f"Total reportado por la API externa: {self._total_products_from_api}.")
+        self._swap_snapshot(_CatalogSnapshot(all_products_data, total_from_api), time.monotonic() - started, all_products_data)
+
+    async def _load_cache_async(self) -> _CatalogSnapshot:
+        """Igual que _load_cache, pero esperando a la API externa sin bloquear el hilo."""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.products:
+            self._maybe_refresh_in_background(snapshot)
+            return snapshot
+        await self._single_flight.do_async(("catalog",), self._fetch_catalog_async)
+        return self._snapshot
+
+    async def _fetch_catalog_async(self) -> None:
+        if self._snapshot is not None and self._snapshot.products:
+            return
+        logger.info("Cargando todos los productos desde la API externa al caché (async)...")
+        started = time.monotonic()
+        if self.async_product_service:
+            all_products_data, total_from_api = await self.async_product_service.get_all_products(limit=100)
+        else:
+            all_products_data, total_from_api = await asyncio.to_thread(self.external_product_service.get_all_products, limit=100)
+        self._swap_snapshot(_CatalogSnapshot(all_products_data, total_from_api), time.monotonic() - started, all_products_data)
+
+    def _swap_snapshot(self, snapshot: _CatalogSnapshot, duration: float,
+                       all_products_data: List[Dict[str, Any]]) -> None:
+        """
+        Publica un catálogo nuevo (las peticiones en curso siguen usando el que ya tomaron)
+        y, si está completo, lo guarda en disco para los próximos arranques.
+        """
+        self._snapshot = snapshot
+        if snapshot.products and len(all_products_data) >= snapshot.total_from_api:
+            self._write_snapshot_file(all_products_data, snapshot.total_from_api)
+        elif snapshot.products:
+            logger.warning(f"Catálogo incompleto ({len(all_products_data)} de {snapshot.total_from_api} productos); no se guarda en disco.")
+        with self._metrics_lock:
+            self._metrics["refreshes"] += 1
+            self._metrics["last_refresh_duration_s"] = round(duration, 3)
+        logger.info(f"Caché de productos cargado en {duration:.2f}s. Total de productos en caché: {len(snapshot.products)}.")
+        logger.info(f"Total reportado por la API externa: {snapshot.total_from_api}.")
+
+    def _maybe_refresh_in_background(self, snapshot: _CatalogSnapshot) -> None:
+        """Lanza un refresco en segundo plano si el catálogo venció y no hay otro en curso."""
+        if self.catalog_ttl_seconds <= 0 or snapshot.age() < self.catalog_ttl_seconds:
+            return
+        if time.monotonic() < self._retry_refresh_at:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_catalog, name="catalog-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_catalog(self) -> None:
+        """
+        Reconstruye el catálogo completo y lo reemplaza de una vez. Si la API externa falla,
+        no devuelve productos o devuelve menos de los que informa (get_all_products corta en la
+        primera página que falla) se conserva el catálogo actual y se reintenta más tarde.
+        """
+        try:
+            logger.info("Refrescando en segundo plano el catálogo de productos vencido...")
+            started = time.monotonic()
+            all_products_data, total_from_api = self.external_product_service.get_all_products(limit=100)
+            if not all_products_data:
+                raise ValueError("la API externa no devolvió productos")
+            if len(all_products_data) < total_from_api:
+                raise ValueError(f"catálogo incompleto: {len(all_products_data)} de {total_from_api} productos")
+            snapshot = _CatalogSnapshot(all_products_data, total_from_api)
+            self._swap_snapshot(snapshot, time.monotonic() - started, all_products_data)
+        except Exception as e:
+            self._retry_refresh_at = time.monotonic() + min(self.catalog_ttl_seconds, self.REFRESH_RETRY_SECONDS)
+            with self._metrics_lock:
+                self._metrics["refresh_failures"] += 1
+            logger.error(f"No se pudo refrescar el catálogo de productos; se sigue sirviendo el anterior: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _write_snapshot_file(self, all_products_data: List[Dict[str, Any]], total_from_api: int) -> None:
+        """Guarda el catálogo en `snapshot_file` de forma atómica. Un error se registra y no interrumpe la petición."""
+        if not self.snapshot_file:
+            return
+        tmp_path = f"{self.snapshot_file}.{os.getpid()}.tmp" # Único por proceso si varios workers escriben a la vez
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_file) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"fetched_at": time.time(), "total_from_api": total_from_api,
+                           "products": all_products_data}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_file)
+            logger.info(f"Catálogo de productos guardado en {self.snapshot_file}.")
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"No se pudo guardar el catálogo de productos en {self.snapshot_file}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _read_snapshot_file(self) -> Optional[_CatalogSnapshot]:
+        """Carga el catálogo guardado si existe, es válido y no supera `snapshot_max_age_seconds`."""
+        if not os.path.exists(self.snapshot_file):
+            return None
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            fetched_at = float(data["fetched_at"])
+            products_data = data["products"]
+            total_from_api = int(data.get("total_from_api", len(products_data)))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Se ignora el catálogo guardado en {self.snapshot_file}: {e}")
+            return None
+
+        if len(products_data) < total_from_api:
+            logger.warning(f"Se ignora el catálogo guardado en {self.snapshot_file}: incompleto ({len(products_data)} de {total_from_api} productos).")
+            return None
+        age = time.time() - fetched_at
+        if age > self.snapshot_max_age_seconds:
+            logger.info(f"El catálogo guardado en {self.snapshot_file} tiene {age:.0f}s; se cargará desde la API externa.")
+            return None
+        snapshot = _CatalogSnapshot(products_data, total_from_api, fetched_at=fetched_at)
+        logger.info(f"Catálogo de productos cargado desde {self.snapshot_file}: {len(snapshot.products)} productos, {age:.0f}s de antigüedad.")
+        return snapshot if snapshot.products else None
+
+    def get_catalog_stats(self) -> Dict[str, Any]:
+        """
+        Métricas del catálogo en caché: antigüedad, cantidad de productos, refrescos
+        completados y fallidos, duración del último refresco y si hay uno en curso.
+        """
+        snapshot = self._snapshot
+        with self._metrics_lock:
+            stats = dict(self._metrics)
+        stats.update({
+            "loaded": snapshot is not None,
+            "age_seconds": round(snapshot.age(), 3) if snapshot is not None else None,
+            "products": len(snapshot.products) if snapshot is not None else 0,
+            "stale": snapshot is not None and 0 < self.catalog_ttl_seconds <= snapshot.age(),
+            "refreshing": self._refresh_lock.locked(),
+        })
+        return stats
 
 
     def get_all_products(self, query: Optional[str] = None, category: Optional[str] = None, 
@@ -69,12 +263,22 @@ class ProductRepository:
             Tuple[List[Product], int]: Una tupla con la lista de objetos Product para la página actual
                                         y el total de productos *filtrados* disponibles.
         """
-        self._load_cache() # Asegura que el caché esté cargado
+        snapshot = self._load_cache() # Asegura que el caché esté cargado
+        return self._filter_and_paginate(snapshot, query, category, page, limit)
 
+    async def get_all_products_async(self, query: Optional[str] = None, category: Optional[str] = None,
+                                     page: int = 1, limit: int = 10) -> Tuple[List[Product], int]:
+        """Versión async de get_all_products (mismos argumentos y resultado)."""
+        snapshot = await self._load_cache_async()
+        return self._filter_and_paginate(snapshot, query, category, page, limit)
+
+    def _filter_and_paginate(self, snapshot: _CatalogSnapshot, query: Optional[str], category: Optional[str],
+                             page: int, limit: int) -> Tuple[List[Product], int]:
+        """Filtra el catálogo por búsqueda y categoría y devuelve la página pedida y el total filtrado."""
         filtered_products: List[Product] = []
 
         # Aplicar filtros
-        for product in self._all_products_list:
+        for product in snapshot.products:
             matches_query = True
             matches_category = True
 
@@ -110,21 +314,48 @@ class ProductRepository:
         Obtiene un producto por su ID.
         Si el producto no está en caché, intenta obtenerlo directamente del servicio externo.
         """
-        self._load_cache() # Asegura que el caché esté cargado
+        snapshot = self._load_cache() # Asegura que el caché esté cargado
 
-        product = self._cache.get(product_id)
+        product = snapshot.by_id.get(product_id)
         if product:
             logger.info(f"Producto {product_id} encontrado en caché.")
             return product
         
         # Si no está en caché, intentar obtenerlo del servicio externo directamente
         logger.info(f"Producto {product_id} no encontrado en caché, intentando obtener del servicio externo.")
-        product_data = self.external_product_service.get_product_by_id(product_id)
+        return self._single_flight.do(
+            ("product", str(product_id)),
+            lambda: self._snapshot.by_id.get(product_id) or self._add_fetched_product(product_id, self.external_product_service.get_product_by_id(product_id))
+        )
+
+    async def get_product_by_id_async(self, product_id: str) -> Optional[Product]:
+        """Versión async de get_product_by_id."""
+        snapshot = await self._load_cache_async()
+
+        product = snapshot.by_id.get(product_id)
+        if product:
+            logger.info(f"Producto {product_id} encontrado en caché.")
+            return product
+
+        logger.info(f"Producto {product_id} no encontrado en caché, intentando obtener del servicio externo.")
+        return await self._single_flight.do_async(("product", str(product_id)), lambda: self._fetch_product_async(product_id))
+
+    async def _fetch_product_async(self, product_id: str) -> Optional[Product]:
+        product = self._snapshot.by_id.get(product_id)
+        if product:
+            return product
+        if self.async_product_service:
+            product_data = await self.async_product_service.get_product_by_id(product_id)
+        else:
+            product_data = await asyncio.to_thread(self.external_product_service.get_product_by_id, product_id)
+        return self._add_fetched_product(product_id, product_data)
+
+    def _add_fetched_product(self, product_id: str, product_data: Optional[Dict[str, Any]]) -> Optional[Product]:
+        """Convierte el producto obtenido del servicio externo y lo añade al caché."""
         if product_data:
             try:
                 product = Product.from_dict(product_data)
-                self._cache[product.id] = product
-                self._all_products_list.append(product) # Añadirlo a la lista completa también
+                self._snapshot.add(product) # Añadirlo al catálogo actual (un refresco posterior lo reemplaza)
                 logger.info(f"Producto {product_id} obtenido del servicio externo y añadido al caché.")
                 return product
             except Exception as e:
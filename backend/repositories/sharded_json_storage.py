@@ -0,0 +1,214 @@
+# backend/repositories/sharded_json_storage.py
+import os
+import json
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+from backend.repositories.change_feed import ChangeCallback
+from backend.repositories.json_storage import JSONStorage, resolve_data_file
+
+logger = logging.getLogger(__name__)
+
+class ShardedJSONStorage:
+    """
+    Almacenamiento JSON con un archivo por tipo de entidad ('data.users.json',
+    'data.importers.json', ...). Cada archivo es un JSONStorage independiente, con
+    su propio lock y WAL, de modo que escribir un importador no reescribe los usuarios
+    ni compite por su lock. Los archivos se abren la primera vez que se usa el tipo.
+
+    Expone la misma interfaz pública que JSONStorage, por lo que los repositorios
+    pueden usar cualquiera de los dos.
+    """
+    def __init__(self, data_file='data.json', **storage_options):
+        """
+        Args:
+            data_file (str): Nombre del archivo combinado. Los archivos por tipo se
+                            nombran '<nombre>.<tipo><extensión>' en la misma carpeta.
+                            Si el archivo combinado existe, se usa para sembrar los
+                            tipos que aún no tienen archivo propio (migración).
+            **storage_options: Opciones que se pasan a cada JSONStorage (wal_enabled,
+                            checkpoint_interval, fsync, group_commit_window, process_shared).
+        """
+        self._legacy_file = resolve_data_file(data_file)
+        self._stem, self._extension = os.path.splitext(self._legacy_file)
+        self._storage_options = storage_options
+        self._shards: Dict[str, JSONStorage] = {}
+        self._index_definitions: Dict[str, list] = {} # Índices registrados antes de abrir el archivo del tipo
+        self._schemas: Dict[str, list] = {} # Esquemas registrados, aplicados al abrir el archivo del tipo
+        self._subscriptions: list = [] # [entity_type | None, callback, cancelaciones en cada archivo abierto]
+        self._shards_lock = Lock()
+        self._legacy_data: Optional[dict] = None
+        logger.info(f"ShardedJSONStorage inicializado. Archivos por tipo en '{self._stem}.<tipo>{self._extension}'.")
+
+
+    def _shard_path(self, entity_type: str) -> str:
+        return f"{self._stem}.{entity_type}{self._extension}"
+
+
+    def _shard(self, entity_type: str) -> JSONStorage:
+        """Devuelve el JSONStorage del tipo, abriéndolo (y sembrándolo si corresponde) la primera vez."""
+        shard = self._shards.get(entity_type)
+        if shard is not None:
+            return shard
+
+        with self._shards_lock:
+            shard = self._shards.get(entity_type)
+            if shard is None:
+                path = self._shard_path(entity_type)
+                if not os.path.exists(path):
+                    self._seed_from_legacy(entity_type, path)
+                shard = JSONStorage(data_file=path, **self._storage_options)
+                if entity_type in self._schemas:
+                    shard.register_schema(entity_type, self._schemas[entity_type])
+                for subscribed_type, callback, cancellations in self._subscriptions:
+                    if subscribed_type in (None, entity_type):
+                        cancellations.append(shard.subscribe(callback, entity_type))
+                for attribute, unique, case_insensitive in self._index_definitions.get(entity_type, []):
+                    shard.register_index(entity_type, attribute, unique=unique, case_insensitive=case_insensitive)
+                self._shards[entity_type] = shard
+            return shard
+
+
+    def _load_legacy_data(self) -> dict:
+        """Lee (una sola vez) el archivo combinado, si existe."""
+        if self._legacy_data is None:
+            self._legacy_data = {}
+            if os.path.exists(self._legacy_file):
+                # Se abre con JSONStorage para incluir un posible WAL pendiente del archivo combinado.
+                legacy_options = dict(self._storage_options, process_shared=False)
+                legacy = JSONStorage(data_file=self._legacy_file, **legacy_options)
+                self._legacy_data = {name: legacy.get_all(name) for name in legacy.entity_types()}
+        return self._legacy_data
+
+
+    def _seed_from_legacy(self, entity_type: str, path: str):
+        """
+        Crea el archivo del tipo con las entidades que tenga en el archivo combinado.
+        El archivo combinado no se modifica, queda como respaldo.
+        Debe llamarse con self._shards_lock adquirido.
+
+        Se publica con os.link, que falla si el archivo ya existe: si otro worker lo creó
+        (y quizá ya escribió en él) después de comprobar que faltaba, se conserva el suyo.
+        """
+        entities = self._load_legacy_data().get(entity_type)
+        if not entities:
+            return
+
+        tmp_path = f"{path}.{os.getpid()}.tmp" # Único por proceso si varios workers siembran a la vez
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({entity_type: entities}, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(tmp_path, path)
+            logger.info(f"Migradas {len(entities)} entidades de '{entity_type}' desde {self._legacy_file} a {path}.")
+        except FileExistsError:
+            logger.info(f"Otro proceso ya creó {path}; no se vuelve a migrar '{entity_type}'.")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+    def register_schema(self, entity_type: str, fields: list):
+        """Registra el esquema de un tipo; se aplica al abrir su archivo."""
+        with self._shards_lock:
+            self._schemas[entity_type] = list(fields)
+            shard = self._shards.get(entity_type)
+        if shard is not None:
+            shard.register_schema(entity_type, fields)
+
+
+    def subscribe(self, callback: ChangeCallback, entity_type: Optional[str] = None) -> Callable[[], None]:
+        """Suscribe el callback a los cambios de un tipo (o de todos), incluidos los archivos que se abran después."""
+        with self._shards_lock:
+            cancellations = [
+                shard.subscribe(callback, shard_type)
+                for shard_type, shard in self._shards.items() if entity_type in (None, shard_type)
+            ]
+            subscription = [entity_type, callback, cancellations]
+            self._subscriptions.append(subscription)
+
+        def unsubscribe():
+            with self._shards_lock:
+                if subscription in self._subscriptions:
+                    self._subscriptions.remove(subscription)
+            for cancel in cancellations:
+                cancel()
+        return unsubscribe
+
+
+    def get_version(self, entity_type: str) -> int:
+        shard = self._shards.get(entity_type)
+        return shard.get_version(entity_type) if shard is not None else 0
+
+
+    def register_index(self, entity_type: str, attribute: str, unique: bool = False, case_insensitive: bool = False):
+        """Registra un índice secundario; se aplica al abrir el archivo del tipo."""
+        with self._shards_lock:
+            self._index_definitions.setdefault(entity_type, []).append((attribute, unique, case_insensitive))
+            shard = self._shards.get(entity_type)
+        if shard is not None:
+            shard.register_index(entity_type, attribute, unique=unique, case_insensitive=case_insensitive)
+
+
+    def entity_types(self) -> list:
+        """Devuelve los tipos de entidad con archivo propio o presentes en el archivo combinado."""
+        prefix = f"{os.path.basename(self._stem)}."
+        types = set(self._shards)
+        directory = os.path.dirname(self._legacy_file)
+        for name in (os.listdir(directory) if os.path.isdir(directory) else []):
+            if name.startswith(prefix) and name.endswith(self._extension) and self._extension:
+                types.add(name[len(prefix):-len(self._extension)])
+        with self._shards_lock:
+            types.update(self._load_legacy_data())
+        types.discard('')
+        return sorted(types)
+
+
+    def checkpoint(self):
+        """Consolida el WAL de cada archivo abierto."""
+        for shard in list(self._shards.values()):
+            shard.checkpoint()
+
+
+    def get_all(self, entity_type: str) -> list:
+        return self._shard(entity_type).get_all(entity_type)
+
+
+    def save_entity(self, entity_type: str, entity_data: dict) -> dict:
+        return self._shard(entity_type).save_entity(entity_type, entity_data)
+
+
+    def save_entities(self, entity_type: str, items: list) -> list:
+        return self._shard(entity_type).save_entities(entity_type, items)
+
+
+    def compare_and_set(self, entity_type: str, attribute: str, changes: list) -> list:
+        return self._shard(entity_type).compare_and_set(entity_type, attribute, changes)
+
+
+    def delete_entities(self, entity_type: str, entity_ids: list) -> list:
+        return self._shard(entity_type).delete_entities(entity_type, entity_ids)
+
+
+    def get_by_id(self, entity_type: str, entity_id: str) -> Optional[dict]:
+        return self._shard(entity_type).get_by_id(entity_type, entity_id)
+
+
+    def get_page(self, entity_type: str, after_id: Optional[str] = None, limit: int = 100,
+                 fields: Optional[list] = None) -> tuple:
+        return self._shard(entity_type).get_page(entity_type, after_id=after_id, limit=limit, fields=fields)
+
+
+    def iter_entities(self, entity_type: str, after_id: Optional[str] = None, fields: Optional[list] = None,
+                      batch_size: int = 500):
+        return self._shard(entity_type).iter_entities(entity_type, after_id=after_id, fields=fields, batch_size=batch_size)
+
+
+    def delete_entity(self, entity_type: str, entity_id: str) -> bool:
+        return self._shard(entity_type).delete_entity(entity_type, entity_id)
+
+
+    def find_by_attribute(self, entity_type: str, attribute: str, value: Any) -> list:
+        return self._shard(entity_type).find_by_attribute(entity_type, attribute, value)
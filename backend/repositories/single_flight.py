@@ -0,0 +1,116 @@
+# backend/repositories/single_flight.py
+import asyncio
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Call:
+    """
+    Una carga en curso: los que llegan después comparten su resultado. Los hilos esperan
+    el evento; las corrutinas, un Future de su propio loop que se completa al terminar.
+    """
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+        self.waiters = [] # (loop, future) de las esperas async
+
+def _wake(future: "asyncio.Future"):
+    if not future.done(): # Pudo cancelarse mientras esperaba
+        future.set_result(None)
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave: solo la primera ejecuta la carga y las
+    demás esperan y reciben su resultado (o su excepción). Al terminar se olvida la clave, así
+    que no es una caché: la siguiente llamada vuelve a cargar.
+
+    Las variantes síncrona y async comparten las cargas en curso: una petición async puede
+    esperar la carga iniciada por un hilo y viceversa.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def _join(self, key: Hashable):
+        """Devuelve (llamada, es_lider): crea la llamada si no hay una en curso para la clave."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self._leaders += 1
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call):
+        with self._lock:
+            self._calls.pop(key, None)
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError: # El loop del que esperaba ya se cerró
+                pass
+
+    @staticmethod
+    def _outcome(call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecuta `fn` salvo que ya haya una llamada en curso con la misma clave, en cuyo caso
+        espera a que termine y devuelve su resultado.
+
+        Raises:
+            Exception: La excepción de `fn`, tanto al que la ejecutó como a los que esperaban.
+        """
+        call, is_leader = self._join(key)
+        if not is_leader:
+            call.done.wait()
+            return self._outcome(call)
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Igual que `do`, pero `fn` es una corrutina. Los que esperan no bloquean el loop ni
+        ocupan un hilo: esperan un Future que el líder completa desde su hilo o su loop.
+        """
+        call, is_leader = self._join(key)
+        if not is_leader:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                if call.done.is_set():
+                    future = None
+                else:
+                    call.waiters.append((loop, future))
+            if future is not None:
+                await future
+            return self._outcome(call)
+        try:
+            call.result = await fn()
+        except BaseException as e: # Incluye la cancelación: los que esperan no quedan bloqueados
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    def get_stats(self) -> Dict[str, int]:
+        """Cargas ejecutadas y llamadas que se sumaron a una carga en curso."""
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self._leaders, "coalesced": self._coalesced}
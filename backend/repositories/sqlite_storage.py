@@ -0,0 +1,327 @@
+# backend/repositories/sqlite_storage.py
+import re
+import json
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from backend.repositories.change_feed import ChangeCallback, ChangeFeed
+from backend.repositories.json_storage import resolve_data_file, project_entity
+
+logger = logging.getLogger(__name__)
+
+# Los nombres de tipos y atributos se incrustan en el SQL de los índices, por lo que se restringen.
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+class SQLiteStorage:
+    """
+    Almacenamiento en SQLite con la misma interfaz pública que JSONStorage.
+    Cada entidad es una fila (tipo, id, JSON del documento) en una única tabla, así
+    que los repositorios no cambian. La base de datos usa el modo de journal WAL,
+    la clave primaria (tipo, id) y un índice de expresión por cada atributo registrado
+    con `register_index`.
+
+    Cada hilo usa su propia conexión; SQLite coordina la concurrencia entre hilos y procesos.
+    """
+    def __init__(self, data_file: str = 'data.sqlite3', timeout: float = 30.0):
+        """
+        Args:
+            data_file (str): Nombre del archivo SQLite (en la carpeta 'database'; una ruta absoluta se respeta).
+            timeout (float): Segundos que una conexión espera un bloqueo de escritura antes de fallar.
+        """
+        self._data_file = resolve_data_file(data_file)
+        self._timeout = timeout
+        self._local = threading.local()
+        self._indexes: Dict[str, Dict[str, tuple]] = {} # entity_type -> {atributo: (unique, case_insensitive)}
+        self._change_feed = ChangeFeed() # Solo refleja los cambios hechos a través de este proceso
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                " entity_type TEXT NOT NULL,"
+                " id TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (entity_type, id))"
+            )
+        logger.info(f"SQLiteStorage inicializado. Datos en {self._data_file} (journal WAL).")
+
+
+    def _connection(self) -> sqlite3.Connection:
+        """Devuelve la conexión del hilo actual, creándola si no existe."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._data_file, timeout=self._timeout)
+            conn.execute("PRAGMA synchronous=NORMAL") # Seguro con WAL: solo un corte de energía puede perder la última transacción
+            self._local.conn = conn
+        return conn
+
+
+    @staticmethod
+    def _check_identifier(name: str):
+        if not _IDENTIFIER.match(name or ''):
+            raise ValueError(f"Nombre no válido para un índice de SQLiteStorage: '{name}'.")
+
+
+    @staticmethod
+    def _index_expression(attribute: str, case_insensitive: bool) -> str:
+        expression = f"json_extract(data, '$.{attribute}')"
+        return f"lower({expression})" if case_insensitive else expression
+
+
+    def register_index(self, entity_type: str, attribute: str, unique: bool = False, case_insensitive: bool = False):
+        """
+        Crea (si no existe) un índice de expresión sobre un atributo de un tipo de entidad.
+        Con `unique=True` SQLite rechaza que dos entidades compartan un valor no nulo.
+
+        Raises:
+            ValueError: Si el nombre no es un identificador válido o los datos ya tienen duplicados.
+        """
+        self._check_identifier(entity_type)
+        self._check_identifier(attribute)
+        index_name = f"idx_{entity_type}_{attribute}"
+        expression = self._index_expression(attribute, case_insensitive)
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} "
+                    f"ON entities({expression}) WHERE entity_type = '{entity_type}'"
+                )
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Hay valores duplicados de '{attribute}' en '{entity_type}'; no se puede crear un índice único.") from e
+        self._indexes.setdefault(entity_type, {})[attribute] = (unique, case_insensitive)
+        logger.info(f"Índice {'único ' if unique else ''}registrado en SQLite para '{entity_type}.{attribute}'.")
+
+
+    def register_schema(self, entity_type: str, fields: list):
+        """Sin efecto: SQLite ya guarda cada entidad fuera de la memoria del proceso."""
+        pass
+
+
+    def subscribe(self, callback: ChangeCallback, entity_type: Optional[str] = None) -> Callable[[], None]:
+        """
+        Registra un callback(entity_type, version, ids) que se invoca tras cada escritura
+        confirmada por este proceso (SQLite no avisa de los cambios de otros procesos).
+        """
+        return self._change_feed.subscribe(callback, entity_type)
+
+
+    def get_version(self, entity_type: str) -> int:
+        return self._change_feed.version(entity_type)
+
+
+    def _publish(self, entity_type: str, entity_ids: list):
+        if entity_ids:
+            self._change_feed.publish(self._change_feed.commit([(entity_type, entity_id) for entity_id in entity_ids]))
+
+
+    def entity_types(self) -> list:
+        """Devuelve los tipos de entidad presentes en el almacenamiento."""
+        rows = self._connection().execute("SELECT DISTINCT entity_type FROM entities").fetchall()
+        return [row[0] for row in rows]
+
+
+    def checkpoint(self):
+        """Consolida el WAL de SQLite en el archivo principal."""
+        self._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+    def get_all(self, entity_type: str) -> list:
+        """
+        Recupera todas las entidades de un tipo específico, en orden de inserción.
+
+        Returns:
+            list: Una lista de diccionarios (vacía si el tipo no existe).
+        """
+        rows = self._connection().execute(
+            "SELECT data FROM entities WHERE entity_type = ? ORDER BY rowid", (entity_type,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+    def save_entity(self, entity_type: str, entity_data: dict) -> dict:
+        """
+        Guarda o actualiza una entidad (por su 'id'), generando uno si no lo tiene.
+
+        Returns:
+            dict: El diccionario de la entidad guardada.
+        Raises:
+            ValueError: Si la entidad viola un índice único registrado.
+        """
+        if 'id' not in entity_data or not entity_data['id']:
+            entity_data['id'] = str(uuid.uuid4())
+        try:
+            with self._connection() as conn:
+                self._upsert(conn, entity_type, entity_data)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"La entidad '{entity_data['id']}' viola un índice único de '{entity_type}': {e}") from e
+        logger.info(f"save_entity: Entidad con ID '{entity_data['id']}' guardada en SQLite ('{entity_type}').")
+        self._publish(entity_type, [entity_data['id']])
+        return entity_data
+
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, entity_type: str, entity_data: dict):
+        # ON CONFLICT conserva el rowid, así una actualización mantiene la posición de la entidad.
+        conn.execute(
+            "INSERT INTO entities (entity_type, id, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(entity_type, id) DO UPDATE SET data = excluded.data",
+            (entity_type, entity_data['id'], json.dumps(entity_data, ensure_ascii=False))
+        )
+
+
+    def save_entities(self, entity_type: str, items: list) -> list:
+        """
+        Guarda o actualiza muchas entidades en una única transacción. Una entidad que
+        viola un índice único se rechaza sin afectar a las demás.
+
+        Returns:
+            list: Un resultado por entidad, en el mismo orden:
+                    {'ok': True, 'entity': dict} o {'ok': False, 'error': str}.
+        """
+        results = []
+        with self._connection() as conn:
+            for entity_data in items:
+                if 'id' not in entity_data or not entity_data['id']:
+                    entity_data['id'] = str(uuid.uuid4())
+                try:
+                    self._upsert(conn, entity_type, entity_data)
+                    results.append({'ok': True, 'entity': entity_data})
+                except sqlite3.IntegrityError as e:
+                    # Solo se revierte la sentencia fallida; la transacción continúa.
+                    results.append({'ok': False, 'error': f"La entidad '{entity_data['id']}' viola un índice único de '{entity_type}': {e}"})
+        logger.info(f"save_entities: {sum(r['ok'] for r in results)} de {len(items)} entidades guardadas en SQLite ('{entity_type}').")
+        self._publish(entity_type, [r['entity']['id'] for r in results if r['ok']])
+        return results
+
+
+    def compare_and_set(self, entity_type: str, attribute: str, changes: list) -> list:
+        """
+        Cambia un atributo de muchas entidades solo donde todavía tiene el valor esperado,
+        en una única transacción (ver JSONStorage.compare_and_set).
+
+        Returns:
+            list: Un booleano por cambio, en el mismo orden: True si se aplicó.
+        Raises:
+            ValueError: Si el atributo no es un identificador válido.
+        """
+        self._check_identifier(attribute)
+        path = f"$.{attribute}"
+        results = []
+        with self._connection() as conn:
+            for entity_id, expected, new_value in changes:
+                try:
+                    updated = conn.execute(
+                        "UPDATE entities SET data = json_set(data, ?, ?) "
+                        "WHERE entity_type = ? AND id = ? AND json_extract(data, ?) = ?",
+                        (path, new_value, entity_type, entity_id, path, expected)
+                    ).rowcount > 0
+                except sqlite3.IntegrityError:
+                    updated = False
+                results.append(updated)
+        logger.info(f"compare_and_set: {sum(results)} de {len(changes)} entidades actualizadas en SQLite ('{entity_type}.{attribute}').")
+        self._publish(entity_type, [change[0] for change, updated in zip(changes, results) if updated])
+        return results
+
+
+    def delete_entities(self, entity_type: str, entity_ids: list) -> list:
+        """
+        Elimina muchas entidades en una única transacción.
+
+        Returns:
+            list: Un booleano por ID, en el mismo orden: True si se eliminó, False si no existía.
+        """
+        with self._connection() as conn:
+            results = [
+                conn.execute("DELETE FROM entities WHERE entity_type = ? AND id = ?", (entity_type, entity_id)).rowcount > 0
+                for entity_id in entity_ids
+            ]
+        self._publish(entity_type, [entity_id for entity_id, deleted in zip(entity_ids, results) if deleted])
+        return results
+
+
+    def get_by_id(self, entity_type: str, entity_id: str) -> Optional[dict]:
+        """
+        Recupera una entidad por su ID.
+
+        Returns:
+            dict | None: La entidad si se encuentra, None si no.
+        """
+        row = self._connection().execute(
+            "SELECT data FROM entities WHERE entity_type = ? AND id = ?", (entity_type, entity_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+    def get_page(self, entity_type: str, after_id: Optional[str] = None, limit: int = 100,
+                 fields: Optional[list] = None) -> tuple:
+        """
+        Devuelve una página de entidades ordenadas por ID (paginación por cursor sobre la clave primaria).
+
+        Returns:
+            tuple: (lista de entidades, cursor de la página siguiente o None si no hay más).
+        """
+        limit = max(1, int(limit))
+        rows = self._connection().execute(
+            "SELECT id, data FROM entities WHERE entity_type = ? AND id > ? ORDER BY id LIMIT ?",
+            (entity_type, after_id if after_id is not None else '', limit + 1)
+        ).fetchall()
+        items = [project_entity(json.loads(data), fields) for _, data in rows[:limit]]
+        return items, (rows[limit - 1][0] if len(rows) > limit else None)
+
+
+    def iter_entities(self, entity_type: str, after_id: Optional[str] = None, fields: Optional[list] = None,
+                      batch_size: int = 500):
+        """Recorre todas las entidades de un tipo en orden de ID, de a `batch_size` por consulta."""
+        cursor = after_id
+        while True:
+            items, cursor = self.get_page(entity_type, after_id=cursor, limit=batch_size, fields=fields)
+            yield from items
+            if cursor is None:
+                return
+
+
+    def delete_entity(self, entity_type: str, entity_id: str) -> bool:
+        """
+        Elimina una entidad por su ID.
+
+        Returns:
+            bool: True si la entidad fue eliminada, False si no se encontró.
+        """
+        with self._connection() as conn:
+            cursor = conn.execute("DELETE FROM entities WHERE entity_type = ? AND id = ?", (entity_type, entity_id))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            logger.info(f"Entidad con ID '{entity_id}' eliminada de '{entity_type}' (SQLite).")
+            self._publish(entity_type, [entity_id])
+        return deleted
+
+
+    def find_by_attribute(self, entity_type: str, attribute: str, value: Any) -> list:
+        """
+        Encuentra entidades cuyo atributo coincide con el valor. Si el atributo tiene
+        un índice registrado la consulta lo usa (con su semántica de mayúsculas).
+        Buscar None devuelve también las entidades que no tienen el atributo, como en JSONStorage.
+        """
+        if isinstance(value, (dict, list)) or not _IDENTIFIER.match(attribute or ''):
+            # Valores compuestos o atributos con caracteres especiales: comparación exacta en Python.
+            return [entity for entity in self.get_all(entity_type) if entity.get(attribute) == value]
+
+        index = self._indexes.get(entity_type, {}).get(attribute)
+        if index is not None and value is not None:
+            _, case_insensitive = index
+            expression = self._index_expression(attribute, case_insensitive)
+            if case_insensitive and isinstance(value, str):
+                value = value.lower()
+            # El tipo literal permite que SQLite use el índice parcial del tipo de entidad.
+            sql = f"SELECT data FROM entities WHERE entity_type = '{entity_type}' AND {expression} = ? ORDER BY rowid"
+            rows = self._connection().execute(sql, (value,)).fetchall()
+        else:
+            rows = self._connection().execute(
+                f"SELECT data FROM entities WHERE entity_type = ? AND json_extract(data, '$.{attribute}') IS ? ORDER BY rowid",
+                (entity_type, value)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,70 @@
+# backend/repositories/storage_factory.py
+import logging
+
+from backend.repositories.json_storage import JSONStorage
+from backend.repositories.sharded_json_storage import ShardedJSONStorage
+from backend.repositories.sqlite_storage import SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+def create_json_storage(config, **overrides):
+    """
+    Crea el almacenamiento JSON (combinado o por tipo) según la configuración.
+    `overrides` reemplaza opciones puntuales (p. ej. snapshot_format al convertir).
+    """
+    storage_class = ShardedJSONStorage if config.JSON_STORAGE_SHARDED else JSONStorage
+    options = dict(
+        wal_enabled=config.JSON_STORAGE_WAL_ENABLED,
+        checkpoint_interval=config.JSON_STORAGE_CHECKPOINT_INTERVAL,
+        fsync=config.JSON_STORAGE_FSYNC,
+        group_commit_window=config.JSON_STORAGE_GROUP_COMMIT_MS / 1000,
+        process_shared=config.JSON_STORAGE_PROCESS_SHARED,
+        snapshot_format=config.JSON_STORAGE_SNAPSHOT_FORMAT,
+        compact_rows=config.JSON_STORAGE_COMPACT_ROWS
+    )
+    options.update(overrides)
+    return storage_class(data_file=config.JSON_DATABASE_PATH, **options)
+
+def create_storage(config):
+    """
+    Crea el motor de almacenamiento indicado por `config.STORAGE_ENGINE` ('json' o 'sqlite').
+    Todos los motores exponen la misma interfaz, por lo que los repositorios no cambian.
+
+    Raises:
+        ValueError: Si el motor configurado no existe.
+    """
+    engine = (config.STORAGE_ENGINE or 'json').lower()
+    if engine == 'json':
+        storage = create_json_storage(config)
+    elif engine == 'sqlite':
+        storage = SQLiteStorage(data_file=config.SQLITE_DATABASE_PATH)
+    else:
+        raise ValueError(f"Motor de almacenamiento desconocido: '{config.STORAGE_ENGINE}'. Use 'json' o 'sqlite'.")
+    logger.info(f"Motor de almacenamiento seleccionado: {type(storage).__name__}.")
+    return storage
+
+def import_json_into(target, source) -> dict:
+    """
+    Copia todas las entidades de un almacenamiento JSON a otro motor (p. ej. SQLiteStorage).
+
+    Returns:
+        dict: Cantidad de entidades importadas por tipo.
+    """
+    return {
+        entity_type: sum(result['ok'] for result in target.save_entities(entity_type, source.get_all(entity_type)))
+        for entity_type in source.entity_types()
+    }
+
+def rewrite_json_snapshots(storage) -> list:
+    """
+    Reescribe todos los snapshots de un almacenamiento JSON en el formato con el que
+    se abrió (conversión entre 'json', 'compact' y 'marshal').
+
+    Returns:
+        list: Los tipos de entidad reescritos.
+    """
+    entity_types = storage.entity_types()
+    for entity_type in entity_types:
+        storage.get_all(entity_type) # En el almacenamiento por tipo, abre el archivo de cada tipo
+    storage.checkpoint()
+    return entity_types
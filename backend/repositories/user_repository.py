@@ -2,11 +2,16 @@
 from .base_repository import BaseRepository 
 from backend.models.user import User
 from backend.repositories.json_storage import JSONStorage
+from backend.repositories.lru_cache import LRUCache
+from backend.services.password_hashing_service import PasswordHashingService, PasswordHashingOverloadedError
 import os
-import bcrypt 
-from cryptography.fernet import Fernet 
+import hmac
+import hashlib
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+import time
 import logging
-from typing import Optional
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -14,16 +19,41 @@ class UserRepository(BaseRepository):
     """
     Gestiona la persistencia de objetos User utilizando JSONStorage.
     """
-    def __init__(self, storage: JSONStorage):
+    def __init__(self, storage: JSONStorage, password_hasher: Optional[PasswordHashingService] = None,
+                 user_cache_size: int = 1024, user_cache_ttl: float = 300.0):
         super().__init__() # Llama al __init__ de BaseRepository (que es object.__init__ en este caso)
         self.storage = storage
+        # bcrypt se ejecuta en un pool acotado para no bloquear sin límite los hilos de las peticiones.
+        self.password_hasher = password_hasher or PasswordHashingService()
         self.entity_type = "users" 
-        self.fernet = self._load_fernet_key_from_file()
-        logger.info("Clave Fernet cargada desde archivo en UserRepository.")
+        # Atributos guardados por add_user: con JSON_STORAGE_COMPACT_ROWS se usan como filas compactas en memoria.
+        self.storage.register_schema(self.entity_type, list(User(email=None, password=None).to_dict()) + ["email_hash"])
+        self.storage.register_index(self.entity_type, "google_id", unique=True)
+        # Índice ciego: HMAC determinista del email normalizado, guardado junto al email cifrado.
+        self.storage.register_index(self.entity_type, "email_hash", unique=True)
+        fernet_keys = self._load_fernet_keys_from_file()
+        # MultiFernet cifra con la clave principal y descifra con cualquiera de las cargadas.
+        self._primary_fernet = fernet_keys[0]
+        self.fernet = MultiFernet(fernet_keys)
+        logger.info("Claves Fernet cargadas desde archivo en UserRepository.")
+        self._email_index_key = self._load_email_index_key_from_file()
+        # Caché de usuarios ya desencriptados por ID para la ruta caliente de sesión y verificación premium.
+        # Se invalida con cada cambio de usuarios que publica el almacenamiento. Con JSONStorage en modo
+        # multiproceso, get_user_by_id carga antes los cambios de otros procesos; con SQLite las
+        # escrituras de otros procesos solo se ven al vencer el TTL.
+        self._user_cache = LRUCache(max_size=user_cache_size, ttl_seconds=user_cache_ttl)
+        self.storage.subscribe(self._on_users_changed, entity_type=self.entity_type)
+        # Mientras existan usuarios sin índice ciego, las búsquedas por email que fallen en el índice
+        # recorren esos usuarios. Se desactiva al ejecutar backfill_email_index().
+        self._legacy_email_scan = bool(self.storage.find_by_attribute(self.entity_type, "email_hash", None))
+        if self._legacy_email_scan:
+            logger.warning("Hay usuarios sin índice ciego de email. Ejecuta 'flask backfill-email-index' para migrarlos.")
 
-    def _load_fernet_key_from_file(self) -> Fernet:
+    def _load_fernet_keys_from_file(self) -> List[Fernet]:
         """
-        Carga la clave Fernet desde el archivo 'backend/email.key' o la genera si no existe.
+        Carga las claves Fernet desde el archivo 'backend/email.key' o genera una si no existe.
+        El archivo admite una clave por línea: la primera es la principal (con ella se cifra)
+        y las siguientes son claves anteriores que solo se usan para descifrar durante una rotación.
         """
         key_file_path = os.path.join(
             os.path.dirname(os.path.abspath(__file__)),
@@ -45,12 +75,48 @@ class UserRepository(BaseRepository):
             except Exception as e:
                 logger.critical(f"Error inesperado al generar clave Fernet: {e}")
                 raise 
+            keys = [key]
         else:
             with open(key_file_path, "rb") as key_file:
-                key = key_file.read()
-            logger.info(f"Clave Fernet cargada exitosamente desde: {key_file_path}")
+                keys = [line.strip() for line in key_file.read().splitlines() if line.strip()]
+            if not keys:
+                raise ValueError(f"El archivo de claves Fernet {key_file_path} está vacío.")
+            logger.info(f"{len(keys)} clave(s) Fernet cargada(s) exitosamente desde: {key_file_path}")
         
-        return Fernet(key)
+        return [Fernet(key) for key in keys]
+
+    def _load_email_index_key_from_file(self) -> bytes:
+        """
+        Carga la clave HMAC del índice ciego desde 'backend/email_index.key' o la genera si no existe.
+        Es independiente de la clave Fernet para que rotar esta última no invalide el índice.
+        """
+        key_file_path = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '..', 
+            'email_index.key' 
+        )
+
+        if not os.path.exists(key_file_path):
+            logger.warning(f"No se encontró la clave del índice ciego en: {key_file_path}. Se generará una nueva.")
+            try:
+                key = os.urandom(32).hex().encode()
+                with open(key_file_path, "wb") as key_file:
+                    key_file.write(key)
+                logger.warning(f"Nueva clave de índice ciego generada y guardada en: {key_file_path}. ¡NO USAR EN PRODUCCIÓN SIN GESTIÓN DE CLAVES!")
+            except IOError as e:
+                logger.critical(f"No se pudo generar ni guardar la clave del índice ciego: {e}")
+                raise FileNotFoundError(f"Clave de índice ciego no encontrada y no se pudo generar en {key_file_path}. No se puede iniciar la aplicación.")
+        else:
+            with open(key_file_path, "rb") as key_file:
+                key = key_file.read().strip()
+            logger.info(f"Clave de índice ciego cargada exitosamente desde: {key_file_path}")
+
+        return key
+
+    def _email_blind_index(self, email: str) -> str:
+        """Calcula el índice ciego (HMAC-SHA256) del email normalizado."""
+        normalized_email = email.strip().lower()
+        return hmac.new(self._email_index_key, normalized_email.encode('utf-8'), hashlib.sha256).hexdigest()
 
     def _encrypt_email(self, email: str) -> str:
         """Encripta un email."""
@@ -88,10 +154,22 @@ class UserRepository(BaseRepository):
                 logger.error(f"Error al cargar usuario de datos crudos: {user_data.get('id', 'N/A')}. Error: {e}")
         return users
     
-    def get_user_by_id(self, user_id: str) -> Optional[User]:
+    def get_user_by_id(self, user_id: str, use_cache: bool = True) -> Optional[User]:
         """
-        Busca un usuario por su ID.
+        Busca un usuario por su ID. Los usuarios ya desencriptados se sirven desde la caché;
+        cada llamada devuelve un objeto User nuevo.
+
+        Args:
+            user_id (str): ID del usuario.
+            use_cache (bool): False lee siempre el almacenamiento (el resultado igual se guarda en la caché).
         """
+        # Antes de usar la caché: en modo multiproceso esto carga los cambios de otros procesos,
+        # cuyos avisos invalidan las entradas afectadas.
+        version = self.storage.get_version(self.entity_type)
+        cached_data = self._user_cache.get(user_id) if use_cache else None
+        if cached_data is not None:
+            return User.from_dict(dict(cached_data))
+
         user_data = self.storage.get_by_id(self.entity_type, user_id)
         if user_data:
             if 'email' in user_data and user_data['email']:
@@ -101,18 +179,77 @@ class UserRepository(BaseRepository):
                 else:
                     logger.warning(f"No se pudo desencriptar el email para el usuario ID: {user_id}. El email puede ser None o incorrecto en el objeto User.")
                     user_data['email'] = None 
-            return User.from_dict(user_data)
+            user = User.from_dict(user_data)
+            if self.storage.get_version(self.entity_type) == version:
+                # Si hubo una escritura mientras se leía, no se guarda un dato que podría estar desactualizado.
+                self._user_cache.set(user_id, user_data)
+            return user
         return None
+
+    def get_user_record_version(self, user_id: str) -> Optional[str]:
+        """
+        Devuelve la versión del registro de un usuario (su 'updated_at'), leída del
+        almacenamiento sin desencriptar nada ni pasar por la caché. Cambia con cada
+        modificación hecha a través de este repositorio.
+
+        Returns:
+            Optional[str]: La versión, o None si el usuario no existe.
+        """
+        user_data = self.storage.get_by_id(self.entity_type, user_id)
+        return user_data.get('updated_at') if user_data else None
+
+    def set_premium(self, user_id: str, is_premium: bool) -> bool:
+        """
+        Activa o desactiva el acceso premium de un usuario (y avanza la versión de su registro,
+        con lo que las sesiones abiertas lo revalidan).
+
+        Returns:
+            bool: True si el usuario existe y se guardó el cambio.
+        """
+        user_data = self.storage.get_by_id(self.entity_type, user_id)
+        if not user_data:
+            logger.warning(f"No se encontró el usuario con ID {user_id} para cambiar su acceso premium.")
+            return False
+        user_obj = User.from_dict(user_data)
+        user_obj.is_premium = bool(is_premium)
+        self._user_cache.invalidate(user_id)
+        self.storage.save_entity(self.entity_type, dict(user_data, **user_obj.to_dict()))
+        logger.info(f"Acceso premium del usuario {user_id}: {bool(is_premium)}.")
+        return True
+
+    def _on_users_changed(self, entity_type: str, version: int, ids: Optional[List[str]]):
+        """Invalida en la caché los usuarios modificados (o toda la caché si cambió todo el tipo)."""
+        if ids is None:
+            self._user_cache.clear()
+            return
+        for user_id in ids:
+            self._user_cache.invalidate(user_id)
     
     def find_user_by_email(self, email: str) -> Optional[User]:
         """
-        Busca un usuario por su dirección de correo electrónico (desencriptando los almacenados).
-        Retorna un objeto User.
+        Busca un usuario por su dirección de correo electrónico mediante el índice ciego
+        (un HMAC y una consulta al índice). Los usuarios aún no migrados se recorren
+        desencriptando sus emails. Retorna un objeto User.
         """
-        all_users_data = self.storage.get_all(self.entity_type) 
-        logger.info(f"Obtenidos {len(all_users_data)} usuarios en formato dict para buscar por email.") 
+        if not email:
+            return None
+
+        for user_data in self.storage.find_by_attribute(self.entity_type, "email_hash", self._email_blind_index(email)):
+            decrypted_stored_email = self._decrypt_email(user_data.get('email'))
+            if decrypted_stored_email and decrypted_stored_email.strip().lower() == email.strip().lower():
+                user_obj = User.from_dict(user_data)
+                user_obj.email = decrypted_stored_email 
+                logger.info(f"Usuario con email '{email}' encontrado mediante el índice ciego.")
+                return user_obj
 
-        for user_data in all_users_data: 
+        if not self._legacy_email_scan:
+            logger.info(f"Usuario con email '{email}' no encontrado.")
+            return None
+
+        legacy_users_data = self.storage.find_by_attribute(self.entity_type, "email_hash", None) 
+        logger.info(f"Revisando {len(legacy_users_data)} usuarios sin índice ciego para buscar por email.") 
+
+        for user_data in legacy_users_data: 
             stored_encrypted_email = user_data.get('email')
             
             if stored_encrypted_email:
@@ -141,13 +278,92 @@ class UserRepository(BaseRepository):
             return None
 
         logger.info("Email no encontrado en el repositorio. Procediendo con el registro.") 
+        user_data = self._prepare_user_data(user)
+        if user_data is None:
+            return None
+
+        try:
+            saved_data = self.storage.save_entity(self.entity_type, user_data)
+            logger.info("save_entity en JSONStorage completado.") 
+        except Exception as e:
+            logger.error(f"ERROR CRÍTICO: Fallo en self.storage.save_entity: {e}") 
+            return None
 
-        if user.password and not user.password.startswith('$2b$'): 
+        if saved_data:
+            logger.info(f"Usuario {saved_data.get('email', '[email encriptado]')} añadido al repositorio. Desencriptando para retorno.")
+            saved_user_obj = User.from_dict(saved_data)
+            saved_user_obj.email = self._decrypt_email(saved_user_obj.email) 
+            logger.info(f"Usuario {saved_user_obj.email} guardado y desencriptado para retorno.")
+            return saved_user_obj
+        else:
+            logger.error(f"Fallo al guardar el usuario {user.email}.")
+            return None
+
+    def add_users(self, users: List[User]) -> List[Optional[User]]:
+        """
+        Añade muchos usuarios con una única escritura en el almacenamiento.
+        Cada usuario se procesa como en `add_user` (hash de contraseña, cifrado del email).
+
+        Returns:
+            List[Optional[User]]: Un resultado por usuario, en el mismo orden: el User guardado
+            (con el email desencriptado) o None si su email ya existía o no se pudo guardar.
+        """
+        results: List[Optional[User]] = [None] * len(users)
+        candidates = [] # (posición en `users`, usuario nuevo)
+        for position, user in enumerate(users):
+            if self.find_user_by_email(user.email):
+                logger.warning(f"Carga masiva: se omite el email existente {user.email}")
+                continue
+            candidates.append((position, user))
+
+        # Las contraseñas se hashean en paralelo en el pool antes de la única escritura.
+        to_hash = [(position, user.password) for position, user in candidates if self._needs_password_hash(user.password)]
+        hash_futures = self.password_hasher.hash_passwords([password for _, password in to_hash])
+        password_hashes = {position: future for (position, _), future in zip(to_hash, hash_futures)}
+
+        pending = [] # (posición en `users`, diccionario a guardar)
+        for position, user in candidates:
+            user_data = self._prepare_user_data(user, password_hashes.get(position))
+            if user_data is not None:
+                pending.append((position, user_data))
+
+        saved = self.storage.save_entities(self.entity_type, [user_data for _, user_data in pending])
+        for (position, _), result in zip(pending, saved):
+            if not result["ok"]:
+                logger.warning(f"Carga masiva: no se pudo guardar el usuario en la posición {position}: {result['error']}")
+                continue
+            saved_user_obj = User.from_dict(result["entity"])
+            saved_user_obj.email = self._decrypt_email(saved_user_obj.email)
+            results[position] = saved_user_obj
+        logger.info(f"Carga masiva de usuarios: {sum(r is not None for r in results)} de {len(users)} guardados.")
+        return results
+
+    def _prepare_user_data(self, user: User, password_hash: Optional[Future] = None) -> Optional[dict]:
+        """
+        Hashea la contraseña y encripta el email de un usuario nuevo, y devuelve el
+        diccionario listo para guardar (con su índice ciego). Retorna None si falla.
+
+        Args:
+            user (User): Usuario a preparar.
+            password_hash (Future, optional): Hash de su contraseña ya encolado en el pool
+                                              (carga masiva); si no se da, se calcula aquí.
+
+        Raises:
+            PasswordHashingOverloadedError: Si el servicio de hashing está sobrecargado.
+        """
+        email_hash = self._email_blind_index(user.email) if user.email and not self._is_encrypted(user.email) else None
+
+        if self._needs_password_hash(user.password):
             logger.info("Hasheando contraseña...") 
             try:
-                hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                if password_hash is not None:
+                    hashed_password = password_hash.result()
+                else:
+                    hashed_password = self.password_hasher.hash_password(user.password)
                 user.password = hashed_password
                 logger.info("Contraseña hasheada exitosamente.") 
+            except PasswordHashingOverloadedError:
+                raise
             except Exception as e:
                 logger.error(f"Error al hashear la contraseña: {e}")
                 return None 
@@ -172,25 +388,15 @@ class UserRepository(BaseRepository):
 
         logger.info("Convirtiendo objeto User a diccionario para guardar...") 
         user_data = user.to_dict()
+        user_data['email_hash'] = email_hash
         logger.info("Objeto User convertido a diccionario. Procediendo a guardar en JSONStorage.") 
-
-        try:
-            saved_data = self.storage.save_entity(self.entity_type, user_data)
-            logger.info("save_entity en JSONStorage completado.") 
-        except Exception as e:
-            logger.error(f"ERROR CRÍTICO: Fallo en self.storage.save_entity: {e}") 
-            return None
-
-        if saved_data:
-            logger.info(f"Usuario {saved_data.get('email', '[email encriptado]')} añadido al repositorio. Desencriptando para retorno.")
-            saved_user_obj = User.from_dict(saved_data)
-            saved_user_obj.email = self._decrypt_email(saved_user_obj.email) 
-            logger.info(f"Usuario {saved_user_obj.email} guardado y desencriptado para retorno.")
-            return saved_user_obj
-        else:
-            logger.error(f"Fallo al guardar el usuario {user.email}.")
-            return None
+        return user_data
         
+    @staticmethod
+    def _needs_password_hash(password: Optional[str]) -> bool:
+        """Indica si la contraseña viene en texto plano (no es ya un hash bcrypt)."""
+        return bool(password) and not password.startswith('$2b$')
+
     def _is_encrypted(self, text: str) -> bool:
         """Heurística para intentar determinar si un texto podría ser un email encriptado por Fernet."""
         return len(text) > 30 and '-' in text and '=' in text
@@ -204,9 +410,11 @@ class UserRepository(BaseRepository):
         
         if user_obj and user_obj.password: 
             try:
-                if bcrypt.checkpw(password.encode('utf-8'), user_obj.password.encode('utf-8')):
+                if self.password_hasher.check_password(password, user_obj.password):
                     logger.info(f"Usuario {email} encontrado y autenticado.")
                     return user_obj
+            except PasswordHashingOverloadedError:
+                raise
             except ValueError: 
                 logger.warning(f"Contraseña almacenada para {email} no es un hash bcrypt válido.")
             except Exception as e:
@@ -248,6 +456,7 @@ class UserRepository(BaseRepository):
             return None
         
         user_obj = User.from_dict(existing_user_data)
+        email_hash = existing_user_data.get('email_hash')
 
         if 'email' in new_data and new_data['email'] != user_obj.email: 
             current_decrypted_email = self._decrypt_email(user_obj.email)
@@ -257,13 +466,14 @@ class UserRepository(BaseRepository):
                     logger.warning(f"Intento de actualizar a un email ya existente para otro usuario: {new_data['email']}")
                     return None
                 user_obj.email = self._encrypt_email(new_data['email']) 
+                email_hash = self._email_blind_index(new_data['email'])
             else: 
                 logger.info("El nuevo email es el mismo que el actual; no se actualiza.")
 
 
         if 'password' in new_data and new_data['password'] and not new_data['password'].startswith('$2b$'):
             logger.info("Hasheando nueva contraseña para actualización...")
-            user_obj.password = bcrypt.hashpw(new_data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            user_obj.password = self.password_hasher.hash_password(new_data['password'])
         
         if 'name' in new_data:
             user_obj.name = new_data['name']
@@ -277,7 +487,12 @@ class UserRepository(BaseRepository):
             user_obj.google_id = new_data['google_id']
 
         updated_user_data = user_obj.to_dict()
+        if email_hash is None and user_obj.email:
+            current_decrypted_email = self._decrypt_email(user_obj.email)
+            email_hash = self._email_blind_index(current_decrypted_email) if current_decrypted_email else None
+        updated_user_data['email_hash'] = email_hash
         
+        self._user_cache.invalidate(user_id)
         saved_data = self.storage.save_entity(self.entity_type, updated_user_data)
         if saved_data:
             logger.info(f"Usuario con ID {user_id} actualizado.")
@@ -292,6 +507,101 @@ class UserRepository(BaseRepository):
         """
         Elimina un usuario por su ID.
         """
+        self._user_cache.invalidate(user_id)
         return self.storage.delete_entity(self.entity_type, user_id)
-        
-    
\ No newline at end of file
+
+    def backfill_email_index(self) -> int:
+        """
+        Migración única: calcula y guarda el índice ciego de email de los usuarios
+        que aún no lo tienen. Retorna la cantidad de usuarios actualizados.
+        """
+        updated = 0
+        for user_data in self.storage.find_by_attribute(self.entity_type, "email_hash", None):
+            decrypted_email = self._decrypt_email(user_data.get('email'))
+            if not decrypted_email:
+                logger.warning(f"No se pudo desencriptar el email del usuario ID: {user_data.get('id', 'N/A')}. Se omite en la migración.")
+                continue
+            user_data['email_hash'] = self._email_blind_index(decrypted_email)
+            try:
+                self.storage.save_entity(self.entity_type, user_data)
+                updated += 1
+            except ValueError as e:
+                logger.error(f"No se pudo migrar el usuario ID: {user_data.get('id', 'N/A')}: {e}")
+
+        self._legacy_email_scan = bool(self.storage.find_by_attribute(self.entity_type, "email_hash", None))
+        logger.info(f"Índice ciego de email calculado para {updated} usuarios.")
+        return updated
+
+    def reencrypt_emails(self, batch_size: int = 500, after_id: Optional[str] = None,
+                         pause_seconds: float = 0.0,
+                         progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Vuelve a cifrar con la clave principal los emails cifrados con claves anteriores
+        (rotación de claves). Recorre los usuarios por lotes en orden de ID y guarda cada
+        lote con una sola escritura, sin mantener el lock entre lotes, así los logins siguen
+        atendiéndose mientras corre.
+
+        Es reanudable: los emails que ya usan la clave principal se omiten, y `after_id`
+        permite continuar desde el último ID informado si el proceso se interrumpió.
+
+        Args:
+            batch_size (int): Usuarios por lote (y por escritura).
+            after_id (Optional[str]): Cursor desde el que continuar (exclusivo).
+            pause_seconds (float): Pausa entre lotes para ceder capacidad a las peticiones.
+            progress_callback (Optional[Callable]): Se llama tras cada lote con el progreso acumulado.
+        Returns:
+            dict: {'processed', 'reencrypted', 'skipped', 'failed', 'last_id'}.
+        """
+        progress = {"processed": 0, "reencrypted": 0, "skipped": 0, "failed": 0, "last_id": after_id}
+        batch_size = max(1, int(batch_size))
+        while True:
+            batch, next_cursor = self.storage.get_page(self.entity_type, after_id=progress["last_id"], limit=batch_size)
+            if not batch:
+                break
+
+            swaps = self._rotate_batch(batch, progress)
+            if swaps:
+                # Solo se reemplaza el email, y solo si sigue siendo el que se leyó: un cambio hecho
+                # mientras tanto (contraseña, premium o el propio email) no se pisa.
+                results = self.storage.compare_and_set(self.entity_type, 'email', swaps)
+                swapped = sum(results)
+                progress["reencrypted"] += swapped
+                progress["skipped"] += len(results) - swapped # Cambiado o eliminado desde la lectura
+
+            progress["processed"] += len(batch)
+            progress["last_id"] = batch[-1]['id']
+            logger.info(f"Re-cifrado de emails: {progress['processed']} usuarios procesados (último ID: {progress['last_id']}).")
+            if progress_callback:
+                progress_callback(dict(progress))
+            if next_cursor is None:
+                break
+            if pause_seconds > 0:
+                time.sleep(pause_seconds)
+
+        logger.info(f"Re-cifrado de emails finalizado: {progress['reencrypted']} re-cifrados, "
+                    f"{progress['skipped']} ya usaban la clave principal, {progress['failed']} con error.")
+        return progress
+
+    def _rotate_batch(self, batch: List[dict], progress: Dict[str, Any]) -> List[tuple]:
+        """
+        Devuelve (id, email_actual, email_re_cifrado) para los usuarios del lote cuyo email no
+        usa la clave principal. Acumula en `progress` los omitidos y los errores.
+        """
+        rotated = []
+        for user_data in batch:
+            token = user_data.get('email')
+            if not token:
+                progress["skipped"] += 1
+                continue
+            try:
+                self._primary_fernet.decrypt(token.encode())
+                progress["skipped"] += 1
+                continue
+            except InvalidToken:
+                pass
+            try:
+                rotated.append((user_data['id'], token, self.fernet.rotate(token.encode()).decode()))
+            except InvalidToken:
+                logger.error(f"El email del usuario ID: {user_data.get('id', 'N/A')} no se puede descifrar con ninguna clave cargada.")
+                progress["failed"] += 1
+        return rotated
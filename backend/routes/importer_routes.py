@@ -2,42 +2,46 @@
 from flask import Blueprint, jsonify, request, session, render_template # Asegúrate de importar render_template
 import logging
 
+from backend.services.entitlement_service import EntitlementService
+
 logger = logging.getLogger(__name__)
 
 importer_bp = Blueprint('importer_bp', __name__)
 
 _importer_ranking_service = None
 _user_repository = None # Guardaremos el repositorio de usuarios aquí
+_entitlement_service = None
 
-def init_importer_routes(ranking_service, user_repo):
+def init_importer_routes(ranking_service, user_repo, entitlement_service=None):
     """
     Inicializa las rutas de importadores con sus dependencias.
     Esta función debe ser llamada desde app.py.
+    Si no se pasa `entitlement_service`, se crea uno sobre `user_repo`.
     """
-    global _importer_ranking_service, _user_repository
+    global _importer_ranking_service, _user_repository, _entitlement_service
     _importer_ranking_service = ranking_service
     _user_repository = user_repo
+    _entitlement_service = entitlement_service or (EntitlementService(user_repo) if user_repo else None)
     logger.info("Rutas de importadores inicializadas con el servicio de ranking y repositorio de usuarios.")
 
 # Función auxiliar para verificar si el usuario es premium
 def is_premium_user_check():
     """
     Verifica si el usuario actual en sesión es premium.
-    Requiere que _user_repository esté inyectado.
+    El resultado se guarda en la sesión y solo se revalida contra el UserRepository
+    cuando cambia el registro del usuario o vence su expiración (ver EntitlementService).
     """
     user_id = session.get('user_id')
     if not user_id:
         logger.warning("Intento de acceso a funcionalidad premium sin usuario en sesión.")
         return False
     
-    if not _user_repository:
+    if not _entitlement_service:
         logger.error("UserRepository no inicializado en rutas de importadores. Fallo en verificación premium.")
         return False
 
-    # Asumiendo que get_user_by_id devuelve un objeto User con un atributo is_premium
-    user = _user_repository.get_user_by_id(user_id)
-    if user and hasattr(user, 'is_premium') and user.is_premium: # Verificar si tiene el atributo antes de accederlo
-        logger.info(f"Usuario {user_id} ({user.email if hasattr(user, 'email') else 'N/A'}) es premium. Acceso concedido.")
+    if _entitlement_service.is_premium(session):
+        logger.debug(f"Usuario {user_id} es premium. Acceso concedido.")
         return True
     
     logger.warning(f"Usuario {user_id} no es premium o no encontrado. Acceso denegado.")
@@ -107,15 +111,30 @@ def get_top_10_chinese_importers():
     top_10_importers = _importer_ranking_service.get_top_10_chinese_importers(criteria=criteria)
     return jsonify(top_10_importers), 200
 
+MAX_PAGE_SIZE = 500
+
 @importer_bp.route('/api/importers', methods=['GET'])
 def get_all_importers_api():
     """
     Endpoint para obtener todos los importadores sin ranking ni filtro,
     accesible para todos.
+    Con los parámetros 'limit', 'after' (cursor) y/o 'fields' (lista separada por comas)
+    devuelve una página: {"items": [...], "next_cursor": "<id>" | null}.
     """
     if not _importer_ranking_service or not _importer_ranking_service.importer_repo:
         logger.error("ImporterRepository no inicializado.")
         return jsonify({"error": "Repositorio de importadores no disponible"}), 500
 
+    if any(param in request.args for param in ('limit', 'after', 'fields')):
+        try:
+            limit = min(max(1, int(request.args.get('limit', 50))), MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"error": "El parámetro 'limit' debe ser un número entero."}), 400
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()] if request.args.get('fields') else None
+        items, next_cursor = _importer_ranking_service.importer_repo.get_importers_page(
+            after_id=request.args.get('after'), limit=limit, fields=fields
+        )
+        return jsonify({"items": items, "next_cursor": next_cursor}), 200
+
     importers = _importer_ranking_service.importer_repo.get_all_importers() # Accede al repo a través del servicio
     return jsonify([imp.to_dict() for imp in importers]), 200 # Asegura que se devuelven diccionarios
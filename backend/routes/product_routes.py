@@ -9,6 +9,7 @@ logger = logging.getLogger(__name__)
 _product_controller_instance = None 
 
 def init_product_routes(product_controller):
+    """Inyecta el controlador de productos."""
     global _product_controller_instance
     _product_controller_instance = product_controller
     logger.info("product_routes: Controlador de productos inyectado.")
@@ -42,7 +43,9 @@ def get_products_api():
     products_data, total_filtered_products = _product_controller_instance.get_products(
         query=query, user_category=category, page=page, limit=limit
     )
-    
+    return _products_page_response(products_data, total_filtered_products, page, limit)
+
+def _products_page_response(products_data, total_filtered_products, page, limit):
     total_pages = 0
     if limit > 0:
         total_pages = (total_filtered_products + limit - 1) // limit 
@@ -68,8 +71,10 @@ def get_product_by_id_api(product_id):
     logger.info(f"API Request: get_product_by_id_api - ID: {product_id} (Tipo: {type(product_id)})")
     
     # Llama al método del controlador para obtener el producto
-    product_data = _product_controller_instance.get_product_by_id(product_id) 
-    
+    product_data = _product_controller_instance.get_product_details(product_id)
+    return _product_detail_response(product_id, product_data)
+
+def _product_detail_response(product_id, product_data):
     if product_data:
         return jsonify(product_data), 200
     else:
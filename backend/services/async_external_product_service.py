@@ -0,0 +1,195 @@
+# backend/services/async_external_product_service.py
+import asyncio
+import random
+import logging
+import threading
+import weakref
+from typing import List, Dict, Optional, Any, Tuple
+
+from backend.services.external_product_service import ExternalProductService
+
+# httpx es opcional: solo hace falta para usar este servicio.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+class AsyncExternalProductService:
+    """
+    Variante asyncio de ExternalProductService: mismos métodos (con `async def`), mismos
+    endpoints, timeouts y manejo de errores. Las páginas de una carga completa se piden
+    concurrentemente en el loop de la llamada, sin un hilo por petición pendiente.
+
+    Pensado para un servidor con un event loop de larga duración (ASGI): cada loop tiene su
+    propio cliente HTTP, que se conserva entre llamadas para reutilizar las conexiones
+    keep-alive, y se cierra con `aclose()`. La aplicación Flask (WSGI) no lo usa: Flask crea un
+    loop por cada vista async, así que no se reutilizarían las conexiones entre peticiones.
+    """
+    PAGE_SIZE = ExternalProductService.PAGE_SIZE
+    DEFAULT_TIMEOUTS = ExternalProductService.DEFAULT_TIMEOUTS
+    RETRY_STATUSES = ExternalProductService.RETRY_STATUSES
+
+    def __init__(self, base_url: str, max_page_workers: int = 4, pool_size: int = 10,
+                 max_retries: int = 2, backoff_factor: float = 0.3,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 transport: Optional["httpx.AsyncBaseTransport"] = None):
+        """
+        Args:
+            base_url (str): URL base de la API externa.
+            max_page_workers (int): Páginas que se piden a la vez al cargar un catálogo completo.
+            pool_size (int): Conexiones keep-alive que se mantienen abiertas con la API externa.
+            max_retries (int): Reintentos de un GET ante errores de conexión o respuestas 429/5xx.
+            backoff_factor (float): Base de la espera exponencial entre reintentos (con jitter).
+            timeouts (dict, optional): Reemplaza los timeouts de DEFAULT_TIMEOUTS por tipo de endpoint.
+            transport (httpx.AsyncBaseTransport, optional): Transporte alternativo (p. ej. httpx.MockTransport en pruebas).
+        Raises:
+            RuntimeError: Si httpx no está instalado.
+        """
+        if httpx is None:
+            raise RuntimeError("AsyncExternalProductService requiere httpx. Instálalo con 'pip install httpx'.")
+        if not base_url:
+            raise ValueError("The base URL for the AsyncExternalProductService cannot be empty.")
+        self.base_url = base_url.rstrip('/')
+        self.max_page_workers = max(1, int(max_page_workers))
+        self.pool_size = max(int(pool_size), self.max_page_workers)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_factor = backoff_factor
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self._transport = transport
+        # Un cliente de httpx queda ligado al loop en el que abrió sus conexiones.
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._clients_lock = threading.Lock()
+        logger.info(f"AsyncExternalProductService initialized with base_url: {self.base_url}")
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Devuelve el cliente HTTP del event loop actual, creándolo la primera vez."""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                    transport=self._transport,
+                )
+        return client
+
+    async def aclose(self):
+        """Cierra el cliente del event loop actual y sus conexiones (p. ej. al apagar el servidor)."""
+        with self._clients_lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _timeout_for(self, endpoint: str) -> "httpx.Timeout":
+        parts = endpoint.split('/')
+        is_detail = len(parts) == 2 and parts[0] == "products" and parts[1] not in ("search", "categories")
+        connect, read = self.timeouts["detail" if is_detail else "catalog"]
+        return httpx.Timeout(read, connect=connect)
+
+    async def _get_with_retries(self, client: "httpx.AsyncClient", endpoint: str,
+                                params: Optional[Dict[str, Any]] = None) -> "httpx.Response":
+        """GET con reintentos acotados ante errores de red y respuestas 429/5xx, con espera exponencial y jitter."""
+        for attempt in range(self.max_retries + 1):
+            is_last = attempt == self.max_retries
+            try:
+                response = await client.get(f"/{endpoint}", params=params, timeout=self._timeout_for(endpoint))
+                if response.status_code not in self.RETRY_STATUSES or is_last:
+                    return response
+            except httpx.TransportError:
+                if is_last:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_factor))
+
+    async def _make_request(self, client: "httpx.AsyncClient", endpoint: str,
+                            params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        url = f"{self.base_url}/{endpoint}"
+        try:
+            response = await self._get_with_retries(client, endpoint, params)
+            response.raise_for_status()
+            return response.json()
+        except httpx.TimeoutException:
+            logger.error(f"Tiempo de espera agotado al conectar con {url} (params: {params}).")
+            return None
+        except httpx.TransportError:
+            logger.error(f"Error de conexión al intentar alcanzar {url}.")
+            return None
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Error HTTP al obtener {url} (params: {params}): {e} - Respuesta: {e.response.text}")
+            if e.response.status_code == 404 and "category/" in endpoint:
+                return {"products": [], "total": 0}
+            return None
+        except ValueError as e:
+            logger.error(f"Error de decodificación JSON desde {url}: {e}")
+            return None
+
+    async def _fetch_page(self, client: "httpx.AsyncClient", endpoint: str, params_base: Dict[str, Any],
+                          skip: int, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+        """Pide una página de productos; registra el error y devuelve None si falla."""
+        params = {**params_base, 'limit': self.PAGE_SIZE, 'skip': skip}
+        async with semaphore:
+            data = await self._make_request(client, endpoint, params)
+        if data is None:
+            logger.error(f"Fallo al obtener datos de la API externa para {endpoint} con params {params}. Interrumpiendo la carga de todos los productos.")
+        return data
+
+    async def get_all_products(self, query: Optional[str] = None, category: Optional[str] = None,
+                               limit: int = 0, skip: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Obtiene *todos* los productos que coincidan con la búsqueda/categoría, igual que
+        ExternalProductService.get_all_products: tras la primera página (que informa el total)
+        el resto se pide concurrentemente, con hasta `max_page_workers` peticiones a la vez,
+        y se reensambla en orden cortando en la primera página que falla o llega vacía.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: Los productos y el total informado por la API externa.
+        """
+        endpoint_base = "products"
+        params_base = {}
+
+        if query:
+            endpoint_base = "products/search"
+            params_base['q'] = query
+        elif category:
+            endpoint_base = f"products/category/{category}"
+
+        client = self._get_client()
+        semaphore = asyncio.Semaphore(self.max_page_workers)
+        first_page = await self._fetch_page(client, endpoint_base, params_base, 0, semaphore)
+        if first_page is None:
+            return [], 0
+
+        all_fetched_products = list(first_page.get('products', []))
+        total_from_api = first_page.get('total', 0)
+        remaining_skips = list(range(self.PAGE_SIZE, total_from_api, self.PAGE_SIZE)) if all_fetched_products else []
+
+        tasks = [asyncio.ensure_future(self._fetch_page(client, endpoint_base, params_base, page_skip, semaphore))
+                 for page_skip in remaining_skips]
+        try:
+            for task in tasks:
+                data = await task
+                if data is None or not data.get('products'):
+                    break
+                all_fetched_products.extend(data['products'])
+        finally:
+            for task in tasks:
+                task.cancel() # No tiene efecto en las ya terminadas
+
+        logger.info(f"AsyncExternalProductService: Total de productos recolectados para query='{query}', category='{category}': {len(all_fetched_products)} de un total API de {total_from_api}.")
+        return all_fetched_products, total_from_api
+
+    async def get_product_by_id(self, product_id) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un producto específico por su ID desde la API externa.
+        """
+        product_data = await self._make_request(self._get_client(), f"products/{product_id}")
+        if product_data is None:
+            logger.warning(f"AsyncExternalProductService: Producto con ID {product_id} no encontrado o no disponible.")
+            return None
+        logger.info(f"AsyncExternalProductService: Obtenido producto con ID {product_id}.")
+        return product_data
+
+    async def get_categories(self) -> Optional[List[str]]:
+        return await self._make_request(self._get_client(), "products/categories")
@@ -0,0 +1,76 @@
+# backend/services/entitlement_service.py
+import time
+import logging
+from typing import Any, MutableMapping, Optional
+
+from backend.repositories.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'premium_entitlement'
+
+class EntitlementService:
+    """
+    Resuelve si el usuario en sesión tiene acceso premium sin desencriptar ni construir
+    el usuario en cada petición. El resultado se guarda en la sesión junto con la versión
+    del registro del usuario ('updated_at') y una expiración; solo se revalida contra el
+    UserRepository cuando cambió ese registro o venció la expiración.
+    """
+    def __init__(self, user_repository: UserRepository, ttl_seconds: float = 300.0):
+        """
+        Args:
+            user_repository (UserRepository): Repositorio con el que se revalida el acceso.
+            ttl_seconds (float): Segundos máximos que se confía en el valor guardado en la sesión.
+                                 Acota el retraso ante cambios que no avanzan la versión del
+                                 registro (p. ej. ediciones directas del almacenamiento).
+        """
+        self.user_repository = user_repository
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+
+    def is_premium(self, session: MutableMapping[str, Any]) -> bool:
+        """
+        Indica si el usuario de la sesión es premium, revalidando solo si hace falta.
+
+        Args:
+            session (MutableMapping): Sesión de Flask (o cualquier diccionario equivalente).
+
+        Returns:
+            bool: True si el usuario existe y es premium.
+        """
+        user_id = session.get('user_id')
+        if not user_id:
+            return False
+
+        entitlement = session.get(SESSION_KEY)
+        record_version = self.user_repository.get_user_record_version(user_id)
+        if record_version is not None and self._is_valid(entitlement, user_id, record_version):
+            return entitlement['is_premium']
+
+        # Se lee sin la caché de usuarios: con varios procesos podría tener un valor anterior.
+        user = self.user_repository.get_user_by_id(user_id, use_cache=False) if record_version is not None else None
+        is_premium = bool(user and getattr(user, 'is_premium', False))
+        if user is None:
+            session.pop(SESSION_KEY, None)
+        else:
+            session[SESSION_KEY] = {
+                'user_id': user_id,
+                'is_premium': is_premium,
+                'record_version': user.to_dict().get('updated_at'),
+                'expires_at': time.time() + self.ttl_seconds,
+            }
+        logger.info(f"Acceso premium revalidado para el usuario {user_id}: {is_premium}.")
+        return is_premium
+
+    @staticmethod
+    def _is_valid(entitlement: Optional[dict], user_id: str, record_version: str) -> bool:
+        return (
+            isinstance(entitlement, dict)
+            and entitlement.get('user_id') == user_id
+            and entitlement.get('record_version') == record_version
+            and entitlement.get('expires_at', 0) > time.time()
+        )
+
+    @staticmethod
+    def clear(session: MutableMapping[str, Any]):
+        """Elimina el acceso guardado en la sesión (p. ej. al cerrar sesión)."""
+        session.pop(SESSION_KEY, None)
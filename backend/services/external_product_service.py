@@ -1,7 +1,10 @@
 # backend/services/external_product_service.py
 import requests
 import logging
-from typing import List, Dict, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Any, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -10,16 +13,87 @@ class ExternalProductService:
     Servicio para interactuar con la API externa de productos (DummyJSON.com).
     Encapsula la lógica de las solicitudes HTTP y el manejo básico de errores.
     """
-    def __init__(self, base_url: str):
+    PAGE_SIZE = 100 # DummyJSON tiene un máximo de 100 productos por request.
+    # Timeouts (conexión, lectura) en segundos por tipo de endpoint.
+    DEFAULT_TIMEOUTS = {
+        "detail": (3.05, 5),     # products/<id>
+        "catalog": (3.05, 10),   # listados, búsquedas y categorías: respuestas más grandes
+    }
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url: str, max_page_workers: int = 4, pool_size: int = 10,
+                 max_retries: int = 2, backoff_factor: float = 0.3,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Args:
+            base_url (str): URL base de la API externa.
+            max_page_workers (int): Páginas que se piden en paralelo al cargar un catálogo completo.
+                                    1 equivale a pedirlas una detrás de otra.
+            pool_size (int): Conexiones keep-alive que se mantienen abiertas con la API externa.
+            max_retries (int): Reintentos de un GET ante errores de conexión o respuestas 429/5xx.
+            backoff_factor (float): Base de la espera exponencial entre reintentos (con jitter).
+            timeouts (dict, optional): Reemplaza los timeouts de DEFAULT_TIMEOUTS por tipo de endpoint.
+        """
         if not base_url:
             raise ValueError("The base URL for the ExternalProductService cannot be empty.")
         self.base_url = base_url.rstrip('/')
+        self.max_page_workers = max(1, int(max_page_workers))
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        # Pool compartido por todas las cargas: acota las conexiones simultáneas a la API externa.
+        self._page_executor = ThreadPoolExecutor(max_workers=self.max_page_workers, thread_name_prefix="product-pages")
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(int(pool_size), self.max_page_workers),
+            max_retries=self._build_retry(max_retries, backoff_factor)
+        )
+        # La sesión reutiliza conexiones TCP/TLS entre peticiones en lugar de abrir una por llamada.
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
         logger.info(f"ExternalProductService initialized with base_url: {self.base_url}")
 
+    def _build_retry(self, max_retries: int, backoff_factor: float) -> Retry:
+        """Reintentos acotados solo para métodos idempotentes, con espera exponencial y jitter."""
+        retry_options = dict(
+            total=max(0, int(max_retries)),
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False, # Tras el último intento se devuelve la respuesta y la maneja raise_for_status
+        )
+        try:
+            return Retry(backoff_jitter=backoff_factor, **retry_options)
+        except TypeError: # urllib3 < 2 no admite jitter
+            return Retry(**retry_options)
+
+    def _timeout_for(self, endpoint: str) -> Union[float, Tuple[float, float]]:
+        parts = endpoint.split('/')
+        is_detail = len(parts) == 2 and parts[0] == "products" and parts[1] not in ("search", "categories")
+        return self.timeouts["detail" if is_detail else "catalog"]
+
+    def get_connection_stats(self) -> Dict[str, int]:
+        """
+        Contadores del pool HTTP: peticiones enviadas (incluidos reintentos), conexiones
+        abiertas y peticiones que reutilizaron una conexión existente.
+        """
+        requests_sent = connections_opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        return {
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "reused": max(0, requests_sent - connections_opened),
+        }
+
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         url = f"{self.base_url}/{endpoint}"
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=self._timeout_for(endpoint))
             response.raise_for_status()
             return response.json()
         except requests.exceptions.Timeout:
@@ -46,7 +120,9 @@ class ExternalProductService:
                              limit: int = 0, skip: int = 0) -> Tuple[List[Dict[str, Any]], int]: # Limit y skip son ignorados si se va a traer todo
         """
         Obtiene *todos* los productos de DummyJSON.com que coincidan con la búsqueda/categoría.
-        Realiza múltiples llamadas a la API si el total excede el límite de una sola petición (100).
+        Realiza múltiples llamadas a la API si el total excede el límite de una sola petición (100):
+        tras la primera página (que informa el total) el resto se pide en paralelo, con
+        hasta `max_page_workers` peticiones simultáneas.
         
         Args:
             query (str, optional): Término de búsqueda.
@@ -58,11 +134,6 @@ class ExternalProductService:
             Tuple[List[Dict[str, Any]], int]: Una tupla con la lista de diccionarios de productos
                                                 y el total de productos *filtrados* disponibles por la API externa.
         """
-        all_fetched_products = []
-        current_skip = 0
-        total_from_api = 0 
-        single_request_limit = 100 # DummyJSON tiene un máximo de 100 productos por request.
-
         endpoint_base = "products"
         params_base = {}
 
@@ -71,42 +142,48 @@ class ExternalProductService:
             params_base['q'] = query
         elif category:
             endpoint_base = f"products/category/{category}"
-        
-        # Bucle para obtener todas las páginas de resultados de la API externa
-        # Se asegura de obtener todos los productos que cumplan la condición de búsqueda/categoría
-        while True:
-            params = {**params_base, 'limit': single_request_limit, 'skip': current_skip}
-            data = self._make_request(endpoint_base, params)
-            
-            if data is None:
-                logger.error(f"Fallo al obtener datos de la API externa para {endpoint_base} con params {params}. Interrumpiendo la carga de todos los productos.")
-                break
-
-            products_batch = data.get('products', [])
-            total_current_query = data.get('total', 0)
 
-            # Si es la primera iteración, establecemos el total de la API
-            if current_skip == 0:
-                total_from_api = total_current_query
+        # La primera página informa el total; el resto de páginas se piden en paralelo.
+        first_page = self._fetch_page(endpoint_base, params_base, 0)
+        if first_page is None:
+            return [], 0
 
-            all_fetched_products.extend(products_batch)
-            current_skip += single_request_limit
+        all_fetched_products = list(first_page.get('products', []))
+        total_from_api = first_page.get('total', 0)
+        remaining_skips = list(range(self.PAGE_SIZE, total_from_api, self.PAGE_SIZE)) if all_fetched_products else []
 
-            # Si ya hemos obtenido todos los productos para la consulta o no hay más, salimos
-            if current_skip >= total_from_api or not products_batch:
+        # Se reensamblan en orden y, como en la carga secuencial, se corta en la primera página
+        # que falla o llega vacía (los productos posteriores se descartan).
+        futures = [self._page_executor.submit(self._fetch_page, endpoint_base, params_base, page_skip)
+                   for page_skip in remaining_skips]
+        for index, future in enumerate(futures):
+            data = future.result()
+            if data is None or not data.get('products'):
+                for pending in futures[index + 1:]:
+                    pending.cancel() # Las que aún no empezaron no se piden
                 break
-        
+            all_fetched_products.extend(data['products'])
+
         logger.info(f"ExternalProductService: Total de productos recolectados para query='{query}', category='{category}': {len(all_fetched_products)} de un total API de {total_from_api}.")
         return all_fetched_products, total_from_api
 
 
+    def _fetch_page(self, endpoint: str, params_base: Dict[str, Any], skip: int) -> Optional[Dict[str, Any]]:
+        """Pide una página de productos; registra el error y devuelve None si falla."""
+        params = {**params_base, 'limit': self.PAGE_SIZE, 'skip': skip}
+        data = self._make_request(endpoint, params)
+        if data is None:
+            logger.error(f"Fallo al obtener datos de la API externa para {endpoint} con params {params}. Interrumpiendo la carga de todos los productos.")
+        return data
+
+
     def get_product_by_id(self, product_id):
         """
         Obtiene un producto específico por su ID desde la API externa.
         """
         endpoint = f"{self.base_url}/products/{product_id}"
         try:
-            response = requests.get(endpoint)
+            response = self.session.get(endpoint, timeout=self.timeouts["detail"])
             response.raise_for_status()
             product_data = response.json()
             logger.info(f"ExternalProductService: Obtenido producto con ID {product_id}.")
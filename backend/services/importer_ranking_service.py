@@ -173,15 +173,11 @@ class ImporterRankingService:
         Por defecto, clasifica por 'import_volume_usd' de mayor a menor.
         Retorna una lista de diccionarios (la representación to_dict de los importadores).
         """
-        importers = self.importer_repo.get_all_importers()
-
-        if not importers:
-            return []
-
-        # Filtrar por país si se especifica
+        # Filtrar por país si se especifica: el repositorio usa un índice insensible a mayúsculas/minúsculas
         if country:
-            # Aseguramos que la comparación sea insensible a mayúsculas/minúsculas
-            importers = [imp for imp in importers if imp.country_of_origin.lower() == country.lower()]
+            importers = self.importer_repo.find_importers_by_country(country)
+        else:
+            importers = self.importer_repo.get_all_importers()
 
         if not importers: # Si no quedan importadores después de filtrar por país
             return []
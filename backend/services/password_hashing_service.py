@@ -0,0 +1,147 @@
+# backend/services/password_hashing_service.py
+import time
+import logging
+import bcrypt
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class PasswordHashingOverloadedError(Exception):
+    """
+    Se lanza cuando la cola de hashing de contraseñas está llena.
+    Los controladores la traducen a un 503 para fallar rápido bajo sobrecarga.
+    """
+    pass
+
+class PasswordHashingService:
+    """
+    Servicio que ejecuta bcrypt (hashpw/checkpw) en un pool acotado de hilos.
+    bcrypt libera el GIL mientras calcula, por lo que los hilos trabajan en paralelo.
+    Limita la cantidad de operaciones en curso más en espera y registra métricas
+    de tiempo en cola frente a tiempo de hashing.
+    """
+    def __init__(self, max_workers: int = 4, max_queue_depth: int = 32):
+        """
+        Args:
+            max_workers (int): Cantidad de hilos que calculan hashes en paralelo.
+            max_queue_depth (int): Operaciones que pueden esperar un hilo libre antes de rechazar nuevas.
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue_depth = max(0, int(max_queue_depth))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self._slots = BoundedSemaphore(self.max_workers + self.max_queue_depth)
+        self._metrics_lock = Lock()
+        self._metrics = {
+            "completed": 0,
+            "rejected": 0,
+            "in_flight": 0,
+            "queue_wait_total_s": 0.0,
+            "queue_wait_max_s": 0.0,
+            "hash_time_total_s": 0.0,
+            "hash_time_max_s": 0.0,
+        }
+        logger.info(f"PasswordHashingService inicializado con {self.max_workers} hilos y cola máxima de {self.max_queue_depth}.")
+
+    def hash_password(self, password: str) -> str:
+        """Genera el hash bcrypt de una contraseña."""
+        return self._run(partial(self._hash, password))
+
+    def hash_passwords(self, passwords: List[str]) -> List[Future]:
+        """
+        Genera los hashes bcrypt de muchas contraseñas en paralelo. Mantiene a lo sumo
+        `max_workers` operaciones propias en curso, de modo que una carga masiva no
+        ocupa los lugares de la cola que usan las peticiones individuales.
+
+        Args:
+            passwords (List[str]): Contraseñas en texto plano.
+
+        Returns:
+            List[Future]: Un Future por contraseña, en el mismo orden, con su hash o su excepción.
+
+        Raises:
+            PasswordHashingOverloadedError: Si no queda lugar en la cola.
+        """
+        futures: List[Future] = []
+        for password in passwords:
+            running = [future for future in futures if not future.done()]
+            if len(running) >= self.max_workers:
+                wait(running, return_when=FIRST_COMPLETED)
+            futures.append(self._submit(partial(self._hash, password)))
+        return futures
+
+    @staticmethod
+    def _hash(password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    def check_password(self, password: str, hashed_password: str) -> bool:
+        """
+        Verifica una contraseña contra su hash bcrypt.
+
+        Raises:
+            ValueError: Si el hash almacenado no es un hash bcrypt válido.
+        """
+        return self._run(lambda: bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8')))
+
+    def _run(self, operation: Callable[[], Any]) -> Any:
+        """
+        Encola la operación en el pool y espera su resultado.
+
+        Raises:
+            PasswordHashingOverloadedError: Si no queda lugar en la cola.
+        """
+        return self._submit(operation).result()
+
+    def _submit(self, operation: Callable[[], Any]) -> Future:
+        """
+        Encola la operación en el pool sin esperar su resultado.
+
+        Raises:
+            PasswordHashingOverloadedError: Si no queda lugar en la cola.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._metrics_lock:
+                self._metrics["rejected"] += 1
+            logger.warning("Cola de hashing de contraseñas llena. Se rechaza la operación.")
+            raise PasswordHashingOverloadedError("El servicio de hashing de contraseñas está sobrecargado.")
+
+        enqueued_at = time.perf_counter()
+        with self._metrics_lock:
+            self._metrics["in_flight"] += 1
+
+        def task():
+            started_at = time.perf_counter()
+            try:
+                return operation()
+            finally:
+                self._record(queue_wait=started_at - enqueued_at, hash_time=time.perf_counter() - started_at)
+                self._slots.release()
+
+        return self._executor.submit(task)
+
+    def _record(self, queue_wait: float, hash_time: float):
+        with self._metrics_lock:
+            self._metrics["in_flight"] -= 1
+            self._metrics["completed"] += 1
+            self._metrics["queue_wait_total_s"] += queue_wait
+            self._metrics["queue_wait_max_s"] = max(self._metrics["queue_wait_max_s"], queue_wait)
+            self._metrics["hash_time_total_s"] += hash_time
+            self._metrics["hash_time_max_s"] = max(self._metrics["hash_time_max_s"], hash_time)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Devuelve una copia de las métricas acumuladas, con los promedios de
+        tiempo en cola y de hashing por operación completada.
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        completed = metrics["completed"] or 1
+        metrics["queue_wait_avg_s"] = metrics["queue_wait_total_s"] / completed
+        metrics["hash_time_avg_s"] = metrics["hash_time_total_s"] / completed
+        return metrics
+
+    def shutdown(self):
+        """Detiene el pool esperando las operaciones en curso."""
+        self._executor.shutdown(wait=True)
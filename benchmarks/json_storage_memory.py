@@ -0,0 +1,68 @@
+# benchmarks/json_storage_memory.py
+"""
+Compara la memoria por registro de JSONStorage con diccionarios (modo por defecto)
+frente a filas compactas (compact_rows=True con el esquema de usuarios).
+
+Uso:
+    python -m benchmarks.json_storage_memory [cantidad_de_usuarios]
+"""
+import gc
+import os
+import sys
+import time
+import uuid
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.repositories.json_storage import JSONStorage, serialize_snapshot
+
+USER_FIELDS = ["id", "email", "password", "name", "profile_picture_url", "google_id", "phone_number",
+               "dni", "is_premium", "created_at", "updated_at", "email_hash"]
+
+def make_users(count: int) -> list:
+    """Genera usuarios con el tamaño típico de los guardados por UserRepository."""
+    return [{
+        "id": str(uuid.uuid4()),
+        "email": "gAAAAAB" + uuid.uuid4().hex * 3,
+        "password": "$2b$12$" + uuid.uuid4().hex + uuid.uuid4().hex[:21],
+        "name": f"Usuario {i}",
+        "profile_picture_url": None,
+        "google_id": None,
+        "phone_number": None,
+        "dni": None,
+        "is_premium": i % 10 == 0,
+        "created_at": "2025-01-01T00:00:00",
+        "updated_at": "2025-01-01T00:00:00",
+        "email_hash": uuid.uuid4().hex * 2,
+    } for i in range(count)]
+
+def measure(snapshot_path: str, compact_rows: bool) -> tuple:
+    """Carga el snapshot y devuelve (bytes retenidos por JSONStorage, segundos de carga)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    storage = JSONStorage(data_file=snapshot_path, compact_rows=compact_rows)
+    storage.register_schema("users", USER_FIELDS)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del storage
+    return retained, elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = os.path.join(tmp_dir, "users.json")
+        with open(snapshot_path, 'wb') as f:
+            f.write(serialize_snapshot({"users": make_users(count)}, 'compact'))
+
+        print(f"{count} usuarios")
+        for label, compact_rows in (("diccionarios", False), ("filas compactas", True)):
+            retained, elapsed = measure(snapshot_path, compact_rows)
+            print(f"  {label:16} {retained / count:8.0f} bytes/registro  {retained / 2**20:8.1f} MiB  carga {elapsed:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -19,9 +19,51 @@ class Config:
     # Configuración de la API externa de productos (ej. FakeStoreAPI)
     EXTERNAL_PRODUCTS_API_BASE_URL = os.environ.get('EXTERNAL_PRODUCTS_API_BASE_URL', 'https://dummyjson.com')
     EXTERNAL_PRODUCTS_API_KEY = os.environ.get('EXTERNAL_PRODUCTS_API_KEY', 'your_external_api_key_if_needed') 
+    # Páginas de la API externa que se piden en paralelo al cargar el catálogo completo
+    EXTERNAL_PRODUCTS_PAGE_WORKERS = int(os.environ.get('EXTERNAL_PRODUCTS_PAGE_WORKERS', '4'))
+    # Conexiones keep-alive con la API externa y reintentos de GET ante errores de red o 429/5xx
+    EXTERNAL_PRODUCTS_POOL_SIZE = int(os.environ.get('EXTERNAL_PRODUCTS_POOL_SIZE', '10'))
+    EXTERNAL_PRODUCTS_MAX_RETRIES = int(os.environ.get('EXTERNAL_PRODUCTS_MAX_RETRIES', '2'))
+    # Antigüedad (segundos) tras la que el catálogo de productos se refresca en segundo plano. 0 = nunca.
+    PRODUCT_CATALOG_TTL_SECONDS = float(os.environ.get('PRODUCT_CATALOG_TTL_SECONDS', '600'))
+    # Copia en disco del catálogo (carpeta 'database') para arrancar workers sin recorrer la API. Vacío = desactivado.
+    PRODUCT_CATALOG_SNAPSHOT_PATH = os.environ.get('PRODUCT_CATALOG_SNAPSHOT_PATH', 'product_catalog.json')
 
     # Configuración de la base de datos JSON (para JSONStorage)
+    # Motor de almacenamiento: 'json' (JSONStorage) o 'sqlite' (SQLiteStorage).
+    STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'json')
     JSON_DATABASE_PATH = os.environ.get('JSON_DATABASE_PATH', 'data.json')
+    SQLITE_DATABASE_PATH = os.environ.get('SQLITE_DATABASE_PATH', 'data.sqlite3')
+    # Log de escritura anticipada (WAL): cada escritura se añade al log en lugar de reescribir todo el archivo.
+    JSON_STORAGE_WAL_ENABLED = os.environ.get('JSON_STORAGE_WAL_ENABLED', 'False').lower() in ('true', '1', 'yes')
+    # Cantidad de registros en el WAL tras la cual se reescribe el snapshot principal (checkpoint).
+    JSON_STORAGE_CHECKPOINT_INTERVAL = int(os.environ.get('JSON_STORAGE_CHECKPOINT_INTERVAL', '1000'))
+    # Sincronizar cada escritura a disco (fsync) antes de confirmarla.
+    JSON_STORAGE_FSYNC = os.environ.get('JSON_STORAGE_FSYNC', 'True').lower() in ('true', '1', 'yes')
+    # Ventana (en milisegundos) para agrupar escrituras concurrentes en un único volcado a disco (group commit).
+    JSON_STORAGE_GROUP_COMMIT_MS = int(os.environ.get('JSON_STORAGE_GROUP_COMMIT_MS', '0'))
+    # Coordina varios procesos (p. ej. workers de gunicorn) sobre el mismo archivo mediante bloqueos fcntl.
+    JSON_STORAGE_PROCESS_SHARED = os.environ.get('JSON_STORAGE_PROCESS_SHARED', 'False').lower() in ('true', '1', 'yes')
+    # Guarda cada tipo de entidad en su propio archivo ('data.users.json', ...) en lugar de un único data.json.
+    JSON_STORAGE_SHARDED = os.environ.get('JSON_STORAGE_SHARDED', 'False').lower() in ('true', '1', 'yes')
+    # Formato del snapshot: 'json' (indentado, legible), 'compact' (JSON minificado) o 'marshal' (carga más rápida).
+    # Al leer se detecta automáticamente; para convertir los archivos existentes: flask convert-json-storage <formato>.
+    JSON_STORAGE_SNAPSHOT_FORMAT = os.environ.get('JSON_STORAGE_SNAPSHOT_FORMAT', 'json')
+    # Guarda en memoria los usuarios e importadores como filas compactas según su esquema (menos memoria por worker).
+    JSON_STORAGE_COMPACT_ROWS = os.environ.get('JSON_STORAGE_COMPACT_ROWS', 'False').lower() in ('true', '1', 'yes')
+
+    # Caché de usuarios desencriptados por ID (sesión y verificación premium). Tamaño 0 la desactiva.
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '1024'))
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '300'))
+    # Segundos que se confía en el acceso premium guardado en la sesión sin revalidarlo.
+    ENTITLEMENT_TTL_SECONDS = float(os.environ.get('ENTITLEMENT_TTL_SECONDS', '300'))
+
+    # Pool de hashing de contraseñas (bcrypt): hilos en paralelo y operaciones en espera antes de responder 503
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '32'))
+
+    # Expone GET /api/metrics (catálogo de productos, pool HTTP y hashing de contraseñas). Solo para uso interno.
+    METRICS_ENDPOINT_ENABLED = os.environ.get('METRICS_ENDPOINT_ENABLED', 'False').lower() in ('true', '1', 'yes')
 
     # Configuración de sesión (por defecto para Flask-Session)
     SESSION_TYPE = "filesystem"
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from backend.services.async_external_product_service import AsyncExternalProductService
+
+
+def _service(handler, **kwargs):
+    """Servicio async contra un transporte simulado (sin red)."""
+    kwargs.setdefault('backoff_factor', 0)
+    return AsyncExternalProductService(base_url="http://fakestoreapi.com",
+                                       transport=httpx.MockTransport(handler), **kwargs)
+
+def test_retries_server_errors_then_returns_the_product():
+    """Un 503 se reintenta y la respuesta correcta posterior se devuelve."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"id": 1, "title": "Product A"})
+
+    product = asyncio.run(_service(handler, max_retries=2).get_product_by_id(1))
+
+    assert product == {"id": 1, "title": "Product A"}
+    assert calls == ["/products/1", "/products/1"]
+
+def test_gives_up_after_max_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    assert asyncio.run(_service(handler, max_retries=2).get_product_by_id(1)) is None
+    assert len(calls) == 3
+
+def test_product_not_found_returns_none():
+    service = _service(lambda request: httpx.Response(404, json={"message": "not found"}))
+
+    assert asyncio.run(service.get_product_by_id(999)) is None
+
+def test_unknown_category_returns_empty_catalog():
+    """Un 404 en products/category/<x> equivale a una categoría sin productos."""
+    service = _service(lambda request: httpx.Response(404, json={"message": "not found"}))
+
+    assert asyncio.run(service.get_all_products(category="nonexistent")) == ([], 0)
+
+def test_get_all_products_reassembles_pages_in_order_and_stops_at_first_failure():
+    """Las páginas se devuelven en orden de `skip` y se corta en la primera que falla."""
+    page_size = AsyncExternalProductService.PAGE_SIZE
+    total = page_size * 4
+
+    async def handler(request):
+        skip = int(request.url.params['skip'])
+        if skip == page_size * 2:
+            return httpx.Response(500)
+        # Las páginas tempranas tardan más: el orden no depende de cuál responde antes
+        await asyncio.sleep(0.01 * (4 - skip // page_size))
+        products = [{"id": i} for i in range(skip, skip + page_size)]
+        return httpx.Response(200, json={"products": products, "total": total})
+
+    products, total_from_api = asyncio.run(
+        _service(handler, max_retries=0, max_page_workers=4).get_all_products()
+    )
+
+    assert total_from_api == total
+    assert [p["id"] for p in products] == list(range(page_size * 2))
+
+def test_reuses_one_client_per_event_loop_until_closed():
+    """Las llamadas hechas en el mismo loop comparten el cliente (y sus conexiones) hasta `aclose()`."""
+    service = _service(lambda request: httpx.Response(200, json={"id": 1}))
+
+    async def two_calls_then_close():
+        await service.get_product_by_id(1)
+        client = service._get_client()
+        await service.get_product_by_id(2)
+        assert service._get_client() is client
+        await service.aclose()
+        return client
+
+    client = asyncio.run(two_calls_then_close())
+    assert client.is_closed
+    assert len(service._clients) == 0
@@ -83,3 +83,14 @@ def test_login_user_invalid_credentials(auth_controller_instance, user_repositor
         assert result == {'message': 'Email o contraseña incorrectos.'}
         user_repository_mock.find_user_by_email_and_password.assert_called_once_with(email, password)
         assert 'user_id' not in session
+
+def test_login_user_returns_503_when_hashing_is_overloaded(auth_controller_instance, user_repository_mock, app):
+    """Verifica que login_user responde 503 si el pool de bcrypt está saturado."""
+    from backend.services.password_hashing_service import PasswordHashingOverloadedError
+    user_repository_mock.find_user_by_email_and_password.side_effect = PasswordHashingOverloadedError()
+
+    with app.test_request_context():
+        _, status_code = auth_controller_instance.login_user("test@example.com", "Password123")
+
+        assert status_code == 503
+        assert 'user_id' not in session
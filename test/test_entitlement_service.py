@@ -0,0 +1,54 @@
+import pytest
+from unittest.mock import MagicMock
+from cryptography.fernet import Fernet
+
+from backend.models.user import User
+from backend.repositories.json_storage import JSONStorage
+from backend.repositories.user_repository import UserRepository
+from backend.services.entitlement_service import EntitlementService, SESSION_KEY
+
+@pytest.fixture
+def user_repo(tmp_path, mocker):
+    mocker.patch.object(UserRepository, '_load_fernet_keys_from_file', return_value=[Fernet(Fernet.generate_key())])
+    mocker.patch.object(UserRepository, '_load_email_index_key_from_file', return_value=b'clave-de-prueba')
+    return UserRepository(storage=JSONStorage(data_file=str(tmp_path / "users_db.json")))
+
+def test_entitlement_is_revalidated_only_when_that_user_changes(user_repo, mocker):
+    """Verifica que el acceso se revalida al cambiar el registro del usuario y no por cambios de otros usuarios."""
+    ana = user_repo.add_user(User(email="ana@example.com", password=None, name="Ana"))
+    user_repo.set_premium(ana.id, True)
+    service = EntitlementService(user_repo, ttl_seconds=60)
+    session = {"user_id": ana.id}
+    lookup_spy = mocker.spy(user_repo, "get_user_by_id")
+
+    assert service.is_premium(session) is True
+    user_repo.add_user(User(email="beto@example.com", password=None, name="Beto"))
+    assert service.is_premium(session) is True
+    assert lookup_spy.call_count == 1
+
+    user_repo.set_premium(ana.id, False)
+    assert service.is_premium(session) is False
+    assert lookup_spy.call_count == 2
+
+def test_entitlement_expires_and_is_bound_to_user(mocker):
+    """Verifica que el valor guardado vence con el TTL y no se reutiliza para otro usuario."""
+    clock = mocker.patch("backend.services.entitlement_service.time.time", return_value=1000.0)
+    repo = MagicMock()
+    repo.get_user_record_version.return_value = "2025-01-01T10:00:00"
+    repo.get_user_by_id.return_value = User(email="ana@example.com", password=None, _id="u1", is_premium=True,
+                                            updated_at="2025-01-01T10:00:00")
+    service = EntitlementService(repo, ttl_seconds=60)
+    session = {"user_id": "u1"}
+    service.is_premium(session)
+    service.is_premium(session)
+    assert repo.get_user_by_id.call_count == 1
+
+    clock.return_value = 1061.0
+    service.is_premium(session)
+    session["user_id"] = "u2"
+    service.is_premium(session)
+    assert repo.get_user_by_id.call_count == 3
+
+    EntitlementService.clear(session)
+    assert SESSION_KEY not in session
+    assert EntitlementService(repo).is_premium({}) is False
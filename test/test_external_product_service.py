@@ -1,16 +1,16 @@
 import pytest
-import requests # Importa la librería real requests para mockearla
+import requests # Para las excepciones que lanza la sesión simulada
 from backend.services.external_product_service import ExternalProductService
 
-# Datos de productos simulados de la API externa
-MOCK_API_RESPONSE_ALL_PRODUCTS = [
+# Datos de productos simulados de la API externa (formato DummyJSON: una página con su total)
+MOCK_API_RESPONSE_ALL_PRODUCTS = {"products": [
     {"id": 1, "title": "Product A", "price": 10.0, "category": "electronics", "image": "url_a", "description": "Desc A", "rating": {"rate": 4.0, "count": 10}},
     {"id": 2, "title": "Product B", "price": 20.0, "category": "jewelery", "image": "url_b", "description": "Desc B", "rating": {"rate": 3.5, "count": 20}}
-]
+], "total": 2}
 
-MOCK_API_RESPONSE_ELECTRONICS = [
+MOCK_API_RESPONSE_ELECTRONICS = {"products": [
     {"id": 1, "title": "Product A", "price": 10.0, "category": "electronics", "image": "url_a", "description": "Desc A", "rating": {"rate": 4.0, "count": 10}}
-]
+], "total": 1}
 
 MOCK_API_RESPONSE_SINGLE_PRODUCT = {"id": 1, "title": "Product A", "price": 10.0, "category": "electronics", "image": "url_a", "description": "Desc A", "rating": {"rate": 4.0, "count": 10}}
 
@@ -20,101 +20,143 @@ def external_product_service():
     """Fixture que proporciona una instancia de ExternalProductService."""
     return ExternalProductService(base_url="http://fakestoreapi.com")
 
-def test_get_all_products_success(external_product_service, mocker):
-    """Verifica que get_all_products obtiene todos los productos correctamente."""
+def _mock_response(mocker, status_code=200, json_data=None):
+    """Respuesta simulada de la sesión HTTP; los códigos >= 400 hacen fallar raise_for_status."""
     mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = MOCK_API_RESPONSE_ALL_PRODUCTS
-    mock_response.raise_for_status.return_value = None # Simula una respuesta HTTP exitosa
+    mock_response.status_code = status_code
+    mock_response.json.return_value = json_data
+    if status_code >= 400:
+        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=mock_response)
+    else:
+        mock_response.raise_for_status.return_value = None # Simula una respuesta HTTP exitosa
+    return mock_response
 
-    mocker.patch('requests.get', return_value=mock_response) # Mockea requests.get
+def test_get_all_products_success(external_product_service, mocker):
+    """Verifica que get_all_products obtiene todos los productos correctamente."""
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      return_value=_mock_response(mocker, json_data=MOCK_API_RESPONSE_ALL_PRODUCTS))
 
-    products = external_product_service.get_all_products()
+    products, total = external_product_service.get_all_products()
 
+    assert total == 2
     assert len(products) == 2
     assert products[0]['title'] == "Product A"
-    requests.get.assert_called_once_with("http://fakestoreapi.com/products", timeout=10)
+    session_get.assert_called_once_with("http://fakestoreapi.com/products", params={'limit': 100, 'skip': 0},
+                                        timeout=ExternalProductService.DEFAULT_TIMEOUTS["catalog"])
 
 def test_get_all_products_http_error(external_product_service, mocker):
     """Verifica que get_all_products maneja errores HTTP."""
-    mock_response = mocker.Mock()
-    mock_response.status_code = 404
-    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError # Simula un error HTTP
-    
-    mocker.patch('requests.get', return_value=mock_response)
-
-    products = external_product_service.get_all_products()
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      return_value=_mock_response(mocker, status_code=500))
 
-    assert products is None
-    requests.get.assert_called_once()
+    assert external_product_service.get_all_products() == ([], 0)
+    session_get.assert_called_once()
 
 def test_get_all_products_connection_error(external_product_service, mocker):
     """Verifica que get_all_products maneja errores de conexión."""
-    mocker.patch('requests.get', side_effect=requests.exceptions.ConnectionError) # Simula error de conexión
-
-    products = external_product_service.get_all_products()
-
-    assert products is None
-    requests.get.assert_called_once()
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      side_effect=requests.exceptions.ConnectionError) # Simula error de conexión
 
-def test_get_products_by_category_success(external_product_service, mocker):
-    """Verifica que get_products_by_category obtiene productos por categoría correctamente."""
-    mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = MOCK_API_RESPONSE_ELECTRONICS
-    mock_response.raise_for_status.return_value = None
+    assert external_product_service.get_all_products() == ([], 0)
+    session_get.assert_called_once()
 
-    mocker.patch('requests.get', return_value=mock_response)
+def test_get_all_products_by_category_success(external_product_service, mocker):
+    """Verifica que get_all_products filtra por categoría correctamente."""
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      return_value=_mock_response(mocker, json_data=MOCK_API_RESPONSE_ELECTRONICS))
 
-    products = external_product_service.get_products_by_category("electronics")
+    products, total = external_product_service.get_all_products(category="electronics")
 
-    assert len(products) == 1
+    assert total == 1
     assert products[0]['category'] == "electronics"
-    requests.get.assert_called_once_with("http://fakestoreapi.com/products/category/electronics", timeout=10)
+    session_get.assert_called_once_with("http://fakestoreapi.com/products/category/electronics",
+                                        params={'limit': 100, 'skip': 0},
+                                        timeout=ExternalProductService.DEFAULT_TIMEOUTS["catalog"])
 
-def test_get_products_by_category_404_returns_empty_list(external_product_service, mocker):
+def test_get_all_products_by_category_404_returns_empty_list(external_product_service, mocker):
     """Verifica que 404 para categoría devuelve una lista vacía."""
-    mock_response = mocker.Mock()
-    mock_response.status_code = 404
-    mock_response.json.return_value = [] # Algunas APIs devuelven lista vacía con 404
-    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError # Raise for 404
-
-    mocker.patch('requests.get', return_value=mock_response)
-
-    products = external_product_service.get_products_by_category("nonexistent")
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      return_value=_mock_response(mocker, status_code=404, json_data={"message": "not found"}))
 
-    assert products == [] # Debe devolver una lista vacía, no None
-    requests.get.assert_called_once()
+    assert external_product_service.get_all_products(category="nonexistent") == ([], 0) # Lista vacía, no None
+    session_get.assert_called_once()
 
 
 def test_get_product_by_id_success(external_product_service, mocker):
     """Verifica que get_product_by_id obtiene un solo producto correctamente."""
-    mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = MOCK_API_RESPONSE_SINGLE_PRODUCT
-    mock_response.raise_for_status.return_value = None
-
-    mocker.patch('requests.get', return_value=mock_response)
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      return_value=_mock_response(mocker, json_data=MOCK_API_RESPONSE_SINGLE_PRODUCT))
 
     product = external_product_service.get_product_by_id("1")
 
     assert product['title'] == "Product A"
-    requests.get.assert_called_once_with("http://fakestoreapi.com/products/1", timeout=10)
+    session_get.assert_called_once_with("http://fakestoreapi.com/products/1",
+                                        timeout=ExternalProductService.DEFAULT_TIMEOUTS["detail"])
 
 def test_get_product_by_id_not_found(external_product_service, mocker):
     """Verifica que get_product_by_id devuelve None si no se encuentra el producto."""
-    mock_response = mocker.Mock()
-    mock_response.status_code = 404
-    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError # Simula 404
-    
-    mocker.patch('requests.get', return_value=mock_response)
+    session_get = mocker.patch.object(external_product_service.session, 'get',
+                                      return_value=_mock_response(mocker, status_code=404)) # Simula 404
 
     product = external_product_service.get_product_by_id("999")
 
     assert product is None
-    requests.get.assert_called_once()
+    session_get.assert_called_once()
 
 def test_external_product_service_init_no_base_url():
     """Verifica que el servicio lanza un error si la base_url está vacía."""
     with pytest.raises(ValueError, match="The base URL for the ExternalProductService cannot be empty."):
         ExternalProductService(base_url="")
+
+def test_get_all_products_fetches_remaining_pages_in_order(mocker):
+    """Verifica que las páginas siguientes a la primera se reensamblan en orden y se corta en la primera que falla."""
+    service = ExternalProductService(base_url="https://dummyjson.com", max_page_workers=3)
+
+    def fake_request(endpoint, params):
+        if params['skip'] == 300:
+            return None
+        return {"products": [{"id": params['skip'] + i} for i in range(100)], "total": 450}
+    request_mock = mocker.patch.object(service, '_make_request', side_effect=fake_request)
+
+    products, total = service.get_all_products(category="smartphones")
+
+    assert total == 450
+    assert [p["id"] for p in products] == list(range(300))
+    assert request_mock.call_args_list[0] == mocker.call("products/category/smartphones", {'limit': 100, 'skip': 0})
+
+def test_session_reuses_connections_and_retries_server_errors():
+    """Verifica que las peticiones comparten una conexión keep-alive y que un 503 se reintenta."""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Mantiene la conexión abierta entre peticiones
+
+        def do_GET(self):
+            calls.append(self.path)
+            status = 503 if len(calls) == 1 else 200
+            body = json.dumps({"id": 1}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        service = ExternalProductService(base_url=f"http://127.0.0.1:{server.server_port}", backoff_factor=0)
+        for _ in range(3):
+            assert service.get_product_by_id(1) == {"id": 1}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(calls) == 4 # El primer 503 se reintentó
+    assert service.get_connection_stats() == {"requests": 4, "connections_opened": 1, "reused": 3}
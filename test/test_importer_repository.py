@@ -0,0 +1,46 @@
+import pytest
+from backend.repositories.json_storage import JSONStorage
+from backend.repositories.importer_repository import ImporterRepository
+from backend.models.importer import Importer
+
+@pytest.fixture
+def importer_repo(tmp_path):
+    """ImporterRepository sobre un JSONStorage temporal."""
+    return ImporterRepository(storage=JSONStorage(data_file=str(tmp_path / "importers_db.json")))
+
+def make_importer(company_name, country="China"):
+    return Importer(
+        company_name=company_name, ruc="123", country_of_origin=country,
+        contact_email="contacto@example.com", contact_phone="555", fiscal_address="Calle 1",
+        registration_date="2024-01-01"
+    )
+
+def test_add_importers_saves_all_in_one_write(importer_repo, mocker):
+    """Verifica que la carga masiva guarda todos los importadores con un único volcado."""
+    save_spy = mocker.spy(importer_repo.storage, "_save_data")
+
+    saved = importer_repo.add_importers([make_importer("Uno"), make_importer("Dos", "Chile")])
+
+    assert [i.company_name for i in saved] == ["Uno", "Dos"]
+    assert save_spy.call_count == 1
+    assert [i.company_name for i in importer_repo.find_importers_by_country("chile")] == ["Dos"]
+
+def test_single_importer_crud(importer_repo):
+    """Verifica alta, lectura, actualización y baja de un importador."""
+    importer = importer_repo.add_importer(make_importer("Uno"))
+
+    assert importer_repo.get_importer_by_id(importer.id).company_name == "Uno"
+    assert importer_repo.update_importer(importer.id, {"company_name": "Uno SA"}).company_name == "Uno SA"
+    assert importer_repo.delete_importer(importer.id) is True
+    assert importer_repo.get_importer_by_id(importer.id) is None
+
+def test_get_importers_page(importer_repo):
+    """Verifica que el repositorio pagina los importadores con cursor."""
+    importer_repo.add_importers([make_importer(name) for name in ("Uno", "Dos", "Tres")])
+
+    first, cursor = importer_repo.get_importers_page(limit=2, fields=["company_name"])
+    rest, end = importer_repo.get_importers_page(after_id=cursor, limit=2, fields=["company_name"])
+
+    assert len(first) == 2 and len(rest) == 1 and end is None
+    assert sorted(i["company_name"] for i in first + rest) == ["Dos", "Tres", "Uno"]
+    assert len(list(importer_repo.iter_importers())) == 3
@@ -0,0 +1,411 @@
+import os
+import json
+import threading
+import pytest
+from backend.repositories.json_storage import JSONStorage
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Ruta absoluta a un archivo de base de datos temporal."""
+    return str(tmp_path / "test_db.json")
+
+def test_save_and_get_by_id(data_file):
+    """Verifica que una entidad guardada se puede recuperar por su ID."""
+    storage = JSONStorage(data_file=data_file)
+    saved = storage.save_entity("users", {"name": "Ana"})
+
+    assert saved["id"]
+    assert storage.get_by_id("users", saved["id"])["name"] == "Ana"
+
+def test_wal_appends_records_instead_of_rewriting_snapshot(data_file):
+    """Verifica que con el WAL activado las escrituras van al log y no al snapshot."""
+    storage = JSONStorage(data_file=data_file, wal_enabled=True, checkpoint_interval=100)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+    storage.save_entity("users", {"id": "u2", "name": "Beto"})
+    storage.delete_entity("users", "u1")
+
+    with open(data_file, encoding='utf-8') as f:
+        assert json.load(f) == {}
+    with open(f"{data_file}.wal", encoding='utf-8') as f:
+        assert len(f.readlines()) == 3
+
+def test_wal_is_replayed_on_startup(data_file):
+    """Verifica que al reiniciar se reconstruye el estado a partir del snapshot y el WAL."""
+    storage = JSONStorage(data_file=data_file, wal_enabled=True, checkpoint_interval=100)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+    storage.save_entity("users", {"id": "u1", "name": "Ana María"})
+    storage.save_entity("users", {"id": "u2", "name": "Beto"})
+    storage.delete_entity("users", "u2")
+
+    reopened = JSONStorage(data_file=data_file, wal_enabled=True)
+    assert reopened.get_all("users") == [{"id": "u1", "name": "Ana María"}]
+
+def test_wal_ignores_truncated_last_record(data_file):
+    """Verifica que una última línea incompleta del WAL (escritura interrumpida) se descarta."""
+    storage = JSONStorage(data_file=data_file, wal_enabled=True)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+    with open(f"{data_file}.wal", 'a', encoding='utf-8') as f:
+        f.write('{"op":"put","type":"users","ent')
+
+    reopened = JSONStorage(data_file=data_file, wal_enabled=True)
+    assert [u["id"] for u in reopened.get_all("users")] == ["u1"]
+
+    # Lo escrito tras el arranque no queda pegado a la línea incompleta
+    reopened.save_entity("users", {"id": "u2", "name": "Beto"})
+    restarted = JSONStorage(data_file=data_file, wal_enabled=True)
+    assert [u["id"] for u in restarted.get_all("users")] == ["u1", "u2"]
+
+def test_checkpoint_folds_wal_into_snapshot(data_file):
+    """Verifica que el checkpoint reescribe el snapshot y vacía el WAL al alcanzar el intervalo."""
+    storage = JSONStorage(data_file=data_file, wal_enabled=True, checkpoint_interval=2)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+    storage.save_entity("users", {"id": "u2", "name": "Beto"})
+
+    with open(data_file, encoding='utf-8') as f:
+        assert len(json.load(f)["users"]) == 2
+    assert not os.path.exists(f"{data_file}.wal")
+
+def test_pending_wal_is_consolidated_when_wal_is_disabled(data_file):
+    """Verifica que un WAL pendiente se consolida en el snapshot si se arranca sin WAL."""
+    storage = JSONStorage(data_file=data_file, wal_enabled=True)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+
+    JSONStorage(data_file=data_file)
+
+    with open(data_file, encoding='utf-8') as f:
+        assert json.load(f)["users"] == [{"id": "u1", "name": "Ana"}]
+
+def test_save_entity_does_not_reload_unchanged_file(data_file, mocker):
+    """Verifica que save_entity no vuelve a leer el archivo si nadie más lo modificó."""
+    storage = JSONStorage(data_file=data_file)
+    load_spy = mocker.spy(storage, "_load_data")
+
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+    storage.save_entity("users", {"id": "u2", "name": "Beto"})
+
+    load_spy.assert_not_called()
+
+def test_save_entity_reloads_after_external_change(data_file):
+    """Verifica que los cambios hechos por otro proceso se detectan antes de escribir."""
+    storage = JSONStorage(data_file=data_file)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+
+    other_process = JSONStorage(data_file=data_file)
+    other_process.save_entity("users", {"id": "u2", "name": "Beto"})
+
+    storage.save_entity("users", {"id": "u3", "name": "Carla"})
+    assert [u["id"] for u in storage.get_all("users")] == ["u1", "u2", "u3"]
+
+def test_returned_entities_are_copies(data_file):
+    """Verifica que modificar una entidad devuelta no altera el estado interno."""
+    storage = JSONStorage(data_file=data_file)
+    storage.save_entity("users", {"id": "u1", "email": "cifrado"})
+
+    storage.get_by_id("users", "u1")["email"] = "texto plano"
+
+    assert storage.get_by_id("users", "u1")["email"] == "cifrado"
+
+def test_primary_key_index_stays_in_sync_after_deletes(data_file):
+    """Verifica que el índice por ID sigue siendo correcto tras borrar entidades intermedias."""
+    storage = JSONStorage(data_file=data_file)
+    for i in range(5):
+        storage.save_entity("users", {"id": f"u{i}", "name": f"Usuario {i}"})
+
+    assert storage.delete_entity("users", "u1") is True
+    assert storage.delete_entity("users", "u1") is False
+    storage.save_entity("users", {"id": "u4", "name": "Renombrado"})
+
+    assert storage.get_by_id("users", "u1") is None
+    assert storage.get_by_id("users", "u4")["name"] == "Renombrado"
+    assert sorted(u["id"] for u in storage.get_all("users")) == ["u0", "u2", "u3", "u4"]
+    for entity_id in ("u0", "u2", "u3"):
+        assert storage.get_by_id("users", entity_id)["id"] == entity_id
+
+def test_find_by_attribute_uses_secondary_index(data_file):
+    """Verifica que un atributo indexado se resuelve mediante el índice (insensible a mayúsculas)."""
+    storage = JSONStorage(data_file=data_file)
+    storage.register_index("importers", "country_of_origin", case_insensitive=True)
+    storage.save_entity("importers", {"id": "i1", "country_of_origin": "China"})
+    storage.save_entity("importers", {"id": "i2", "country_of_origin": "Chile"})
+    storage.save_entity("importers", {"id": "i3", "country_of_origin": "china"})
+
+    results = storage.find_by_attribute("importers", "country_of_origin", "CHINA")
+
+    assert [r["id"] for r in results] == ["i1", "i3"]
+    # Un atributo sin índice conserva la comparación exacta por recorrido.
+    assert storage.find_by_attribute("importers", "id", "I1") == []
+
+def test_secondary_index_follows_updates_and_deletes(data_file):
+    """Verifica que el índice secundario refleja actualizaciones y borrados."""
+    storage = JSONStorage(data_file=data_file)
+    storage.register_index("users", "google_id", unique=True)
+    storage.save_entity("users", {"id": "u1", "google_id": "g1"})
+    storage.save_entity("users", {"id": "u1", "google_id": "g2"})
+
+    assert storage.find_by_attribute("users", "google_id", "g1") == []
+    assert storage.find_by_attribute("users", "google_id", "g2")[0]["id"] == "u1"
+
+    storage.delete_entity("users", "u1")
+    assert storage.find_by_attribute("users", "google_id", "g2") == []
+
+def test_unique_index_rejects_duplicates(data_file):
+    """Verifica que un índice único impide que dos entidades compartan valor."""
+    storage = JSONStorage(data_file=data_file)
+    storage.register_index("users", "google_id", unique=True)
+    storage.save_entity("users", {"id": "u1", "google_id": "g1"})
+    storage.save_entity("users", {"id": "u2", "google_id": None})
+    storage.save_entity("users", {"id": "u3", "google_id": None})
+
+    with pytest.raises(ValueError):
+        storage.save_entity("users", {"id": "u4", "google_id": "g1"})
+    assert storage.get_by_id("users", "u4") is None
+
+def test_failed_write_keeps_previous_file_intact(data_file, mocker):
+    """Verifica que un fallo a mitad de escritura no deja el archivo truncado ni temporales."""
+    storage = JSONStorage(data_file=data_file)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+
+    mocker.patch("backend.repositories.json_storage.os.replace", side_effect=OSError("disco lleno"))
+    with pytest.raises(OSError):
+        storage.save_entity("users", {"id": "u2", "name": "Beto"})
+
+    with open(data_file, encoding='utf-8') as f:
+        assert json.load(f) == {"users": [{"id": "u1", "name": "Ana"}]}
+    assert os.listdir(os.path.dirname(data_file)) == [os.path.basename(data_file)]
+
+def test_group_commit_coalesces_concurrent_writes(data_file, mocker):
+    """Verifica que las escrituras que llegan dentro de la ventana se vuelcan juntas."""
+    storage = JSONStorage(data_file=data_file, group_commit_window=0.05)
+    save_spy = mocker.spy(storage, "_save_data")
+
+    threads = [
+        threading.Thread(target=storage.save_entity, args=("users", {"id": f"u{i}"}))
+        for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert save_spy.call_count < 10
+    reopened = JSONStorage(data_file=data_file)
+    assert len(reopened.get_all("users")) == 10
+
+def test_reads_run_in_parallel_and_wait_only_for_writers(data_file):
+    """Verifica que varias lecturas pueden compartir el lock y que las escrituras esperan su turno."""
+    storage = JSONStorage(data_file=data_file)
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+
+    results = {}
+    with storage._lock.read():
+        reader = threading.Thread(target=lambda: results.setdefault("read", storage.get_by_id("users", "u1")))
+        reader.start()
+        reader.join(timeout=2)
+        assert results["read"]["name"] == "Ana"
+
+        writer = threading.Thread(target=storage.save_entity, args=("users", {"id": "u1", "name": "Ana María"}))
+        writer.start()
+        writer.join(timeout=0.1)
+        assert writer.is_alive()
+    writer.join(timeout=2)
+
+    assert storage.get_by_id("users", "u1")["name"] == "Ana María"
+
+def _shared_writer(data_file, prefix, count):
+    storage = JSONStorage(data_file=data_file, wal_enabled=True, checkpoint_interval=7, process_shared=True)
+    for i in range(count):
+        storage.save_entity("users", {"id": f"{prefix}{i}"})
+
+def test_process_shared_readers_see_other_instances_writes(data_file, mocker):
+    """Verifica que un lector aplica solo la cola nueva del WAL escrita por otro proceso."""
+    reader = JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True)
+    writer = JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True)
+    writer.save_entity("users", {"id": "u1", "name": "Ana"})
+    assert reader.get_by_id("users", "u1")["name"] == "Ana"
+
+    load_spy = mocker.spy(reader, "_load_data")
+    writer.save_entity("users", {"id": "u1", "name": "Ana María"})
+    writer.delete_entity("users", "u1")
+    writer.save_entity("users", {"id": "u2", "name": "Beto"})
+
+    assert reader.get_by_id("users", "u1") is None
+    assert [u["id"] for u in reader.get_all("users")] == ["u2"]
+    load_spy.assert_not_called()
+
+def test_process_shared_writers_do_not_lose_updates(data_file):
+    """Verifica que varios procesos escribiendo a la vez no pisan los cambios de los demás."""
+    multiprocessing = pytest.importorskip("multiprocessing")
+    JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True)
+    processes = [
+        multiprocessing.Process(target=_shared_writer, args=(data_file, f"p{n}-", 20))
+        for n in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    reopened = JSONStorage(data_file=data_file, wal_enabled=True)
+    assert len(reopened.get_all("users")) == 60
+
+@pytest.mark.parametrize("snapshot_format", ["compact", "marshal"])
+def test_compact_snapshot_formats_are_detected_on_load(data_file, snapshot_format):
+    """Verifica que un snapshot compacto se lee sin configurar el formato y se puede volver a JSON."""
+    storage = JSONStorage(data_file=data_file, snapshot_format=snapshot_format)
+    storage.save_entity("users", {"id": "u1", "name": "Ana María"})
+    with open(data_file, 'rb') as f:
+        assert f.read().startswith(b"#JSONSTORAGE")
+
+    reopened = JSONStorage(data_file=data_file)
+    assert reopened.get_by_id("users", "u1")["name"] == "Ana María"
+
+    reopened.checkpoint()
+    with open(data_file, encoding='utf-8') as f:
+        assert json.load(f) == {"users": [{"id": "u1", "name": "Ana María"}]}
+
+def test_unknown_snapshot_format_is_rejected(data_file):
+    """Verifica que un formato de snapshot inexistente se rechaza al crear el almacenamiento."""
+    with pytest.raises(ValueError):
+        JSONStorage(data_file=data_file, snapshot_format="yaml")
+
+def test_save_entities_persists_batch_once_with_per_item_results(data_file, mocker):
+    """Verifica que la carga masiva hace un único volcado y reporta el resultado de cada entidad."""
+    storage = JSONStorage(data_file=data_file)
+    storage.register_index("users", "google_id", unique=True)
+    storage.save_entity("users", {"id": "u0", "google_id": "g0"})
+    save_spy = mocker.spy(storage, "_save_data")
+
+    results = storage.save_entities("users", [{"id": "u1", "google_id": "g1"}, {"google_id": "g0"}, {"id": "u2"}])
+
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert "google_id" in results[1]["error"]
+    assert save_spy.call_count == 1
+    assert sorted(u["id"] for u in JSONStorage(data_file=data_file).get_all("users")) == ["u0", "u1", "u2"]
+
+    assert storage.delete_entities("users", ["u1", "nadie", "u2"]) == [True, False, True]
+    assert save_spy.call_count == 2
+    assert [u["id"] for u in storage.get_all("users")] == ["u0"]
+
+def test_get_page_walks_collection_by_id_cursor(data_file):
+    """Verifica la paginación por cursor, la proyección de campos y que el orden sigue a las escrituras."""
+    storage = JSONStorage(data_file=data_file)
+    storage.save_entities("users", [{"id": f"u{i}", "name": f"Usuario {i}", "email": "x"} for i in (3, 1, 4, 2)])
+
+    page, cursor = storage.get_page("users", limit=2, fields=["name"])
+    assert page == [{"id": "u1", "name": "Usuario 1"}, {"id": "u2", "name": "Usuario 2"}]
+    assert cursor == "u2"
+
+    storage.delete_entity("users", "u3")
+    storage.save_entity("users", {"id": "u0", "name": "Usuario 0"})
+    storage.save_entity("users", {"id": "u5", "name": "Usuario 5"})
+    page, cursor = storage.get_page("users", after_id=cursor, limit=2)
+    assert [u["id"] for u in page] == ["u4", "u5"]
+    assert cursor is None
+
+    assert [u["id"] for u in storage.iter_entities("users", batch_size=2)] == ["u0", "u1", "u2", "u4", "u5"]
+    assert storage.get_page("importers") == ([], None)
+
+@pytest.mark.parametrize("snapshot_format", ["json", "marshal"])
+def test_compact_rows_behave_like_dicts(data_file, snapshot_format):
+    """Verifica que las filas compactas conservan atributos, ausencias, índices y persistencia."""
+    storage = JSONStorage(data_file=data_file, compact_rows=True, snapshot_format=snapshot_format, wal_enabled=True)
+    storage.save_entity("users", {"id": "u1", "email_hash": "h1", "name": None})
+    storage.register_schema("users", ["id", "email_hash", "name", "is_premium"])
+    storage.register_index("users", "email_hash", unique=True)
+    storage.save_entity("users", {"id": "u2", "email_hash": "h2", "nickname": "Beto"})
+
+    assert type(storage._data["users"][0]).__name__ == "_usersRow"
+    assert storage.get_by_id("users", "u1") == {"id": "u1", "email_hash": "h1", "name": None}
+    assert storage.get_by_id("users", "u2") == {"id": "u2", "email_hash": "h2", "nickname": "Beto"}
+    assert storage.find_by_attribute("users", "email_hash", "h2")[0]["id"] == "u2"
+    assert [u["id"] for u in storage.find_by_attribute("users", "is_premium", None)] == ["u1", "u2"]
+    assert storage.get_page("users", fields=["nickname"])[0] == [{"id": "u1"}, {"id": "u2", "nickname": "Beto"}]
+    with pytest.raises(ValueError):
+        storage.save_entity("users", {"id": "u3", "email_hash": "h1"})
+
+    storage.checkpoint()
+    reopened = JSONStorage(data_file=data_file)
+    assert reopened.get_all("users") == storage.get_all("users")
+
+def test_subscribers_are_notified_after_each_committed_mutation(data_file):
+    """Verifica las versiones por tipo y los avisos a suscriptores (con filtro de tipo y cancelación)."""
+    storage = JSONStorage(data_file=data_file)
+    events, user_events = [], []
+    unsubscribe = storage.subscribe(lambda *event: events.append(event))
+    storage.subscribe(lambda *event: user_events.append(event), entity_type="users")
+    storage.subscribe(lambda *event: 1 / 0) # Un suscriptor que falla no afecta a los demás
+
+    storage.save_entity("users", {"id": "u1"})
+    storage.save_entities("users", [{"id": "u2"}, {"id": "u3"}])
+    storage.save_entity("importers", {"id": "i1"})
+    storage.delete_entity("users", "u2")
+    storage.delete_entity("users", "nadie")
+
+    assert events == [("users", 1, ["u1"]), ("users", 2, ["u2", "u3"]), ("importers", 1, ["i1"]), ("users", 3, ["u2"])]
+    assert user_events == [e for e in events if e[0] == "users"]
+    assert storage.get_version("users") == 3 and storage.get_version("products") == 0
+
+    unsubscribe()
+    storage.delete_entity("users", "u1")
+    assert len(events) == 4 and len(user_events) == 4
+
+def test_subscribers_see_changes_loaded_from_other_processes(data_file):
+    """Verifica que los cambios de otro proceso se notifican al cargarse (por ID o recarga completa)."""
+    reader = JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True)
+    writer = JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True)
+    events = []
+    reader.subscribe(lambda *event: events.append(event))
+
+    writer.save_entity("users", {"id": "u1"})
+    reader.get_by_id("users", "u1")
+    writer.checkpoint()
+    writer.save_entity("users", {"id": "u2"})
+    reader.get_all("users")
+
+    assert events == [("users", 1, ["u1"]), ("users", 2, None)]
+
+def test_failed_checkpoint_rolls_back_other_writers_pending_records(data_file, mocker):
+    """Verifica que si falla un checkpoint, las mutaciones aún no volcadas se revierten y su escritor recibe el error."""
+    storage = JSONStorage(data_file=data_file, wal_enabled=True)
+    storage.save_entity("users", {"id": "u0", "name": "Eva"})
+    with storage._lock.write(): # Mutación de otro escritor: aplicada en memoria, todavía sin volcar
+        record = {"id": "u1", "name": "Ana"}
+        storage._apply_put("users", dict(record))
+        seq = storage._stage({"op": "put", "type": "users", "entity": record}, None)
+
+    save_data = mocker.patch.object(storage, "_save_data", side_effect=OSError("disco lleno"))
+    with pytest.raises(OSError):
+        storage.checkpoint()
+    save_data.side_effect = None
+    mocker.stopall()
+
+    with pytest.raises(OSError): # El otro escritor se entera al volcar su mutación
+        storage._flush(seq)
+    assert storage.get_by_id("users", "u1") is None
+    storage.save_entity("users", {"id": "u2", "name": "Beto"})
+
+    reopened = JSONStorage(data_file=data_file, wal_enabled=True)
+    assert sorted(u["id"] for u in reopened.get_all("users")) == ["u0", "u2"]
+
+def test_failed_write_is_not_visible_nor_saved_later(data_file, mocker):
+    """Verifica que una escritura que falla al volcarse se revierte en memoria (con sus índices) y no llega a disco."""
+    storage = JSONStorage(data_file=data_file)
+    storage.register_index("users", "email", unique=True)
+    storage.save_entity("users", {"id": "u1", "email": "ana@example.com"})
+
+    save_data = mocker.patch.object(storage, "_save_data", side_effect=OSError("disco lleno"))
+    with pytest.raises(OSError):
+        storage.save_entity("users", {"id": "x", "email": "x@example.com"})
+    with pytest.raises(OSError):
+        storage.save_entity("users", {"id": "u1", "email": "otro@example.com"})
+    save_data.side_effect = None
+    mocker.stopall()
+
+    assert storage.get_by_id("users", "x") is None
+    assert storage.find_by_attribute("users", "email", "x@example.com") == []
+    assert storage.get_by_id("users", "u1")["email"] == "ana@example.com"
+    storage.save_entity("users", {"id": "u2", "email": "x@example.com"}) # El índice único quedó libre
+
+    reopened = JSONStorage(data_file=data_file)
+    assert sorted(u["id"] for u in reopened.get_all("users")) == ["u1", "u2"]
+    assert reopened.get_by_id("users", "u1")["email"] == "ana@example.com"
@@ -0,0 +1,17 @@
+from backend.repositories.lru_cache import LRUCache
+
+def test_lru_cache_evicts_least_recently_used_and_expired_entries(mocker):
+    """Verifica el descarte por tamaño (el menos usado) y por antigüedad."""
+    clock = mocker.patch("backend.repositories.lru_cache.time.monotonic", return_value=100.0)
+    cache = LRUCache(max_size=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    clock.return_value = 111.0
+    assert cache.get("a") is None
+    assert cache.get_stats() == {"size": 1, "hits": 3, "misses": 2}
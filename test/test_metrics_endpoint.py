@@ -0,0 +1,19 @@
+from app import create_app
+from config import Config
+
+
+def test_metrics_endpoint_is_disabled_by_default(client):
+    assert client.get('/api/metrics').status_code == 404
+
+def test_metrics_endpoint_reports_catalog_connection_and_hashing_metrics(monkeypatch):
+    """Con METRICS_ENDPOINT_ENABLED, /api/metrics expone las métricas de catálogo, API externa y hashing."""
+    monkeypatch.setattr(Config, 'METRICS_ENDPOINT_ENABLED', True)
+    app = create_app()
+
+    response = app.test_client().get('/api/metrics')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert {"refreshes", "refresh_failures", "last_refresh_duration_s", "age_seconds"} <= set(data["catalog"])
+    assert {"requests", "connections_opened", "reused"} <= set(data["external_api"])
+    assert "completed" in data["password_hashing"]
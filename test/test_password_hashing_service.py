@@ -0,0 +1,57 @@
+import threading
+import pytest
+from backend.services.password_hashing_service import PasswordHashingService, PasswordHashingOverloadedError
+
+def test_hash_and_check_password():
+    """Verifica que el hash generado en el pool se valida correctamente."""
+    hasher = PasswordHashingService(max_workers=2, max_queue_depth=2)
+    hashed = hasher.hash_password("secreto123")
+
+    assert hashed.startswith("$2b$")
+    assert hasher.check_password("secreto123", hashed) is True
+    assert hasher.check_password("otra", hashed) is False
+    assert hasher.get_metrics()["completed"] == 3
+
+def test_rejects_when_queue_is_full():
+    """Verifica que se falla rápido cuando no queda lugar en la cola."""
+    hasher = PasswordHashingService(max_workers=1, max_queue_depth=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_operation():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=hasher._run, args=(slow_operation,))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(PasswordHashingOverloadedError):
+            hasher.hash_password("secreto123")
+    finally:
+        release.set()
+        worker.join()
+
+    metrics = hasher.get_metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["in_flight"] == 0
+
+def test_hash_passwords_runs_in_parallel_without_overflowing_the_queue(mocker):
+    """Verifica que los hashes de una carga masiva se calculan en paralelo sin exceder los hilos ni rechazar."""
+    hasher = PasswordHashingService(max_workers=3, max_queue_depth=0)
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def slow_hash(password):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        threading.Event().wait(0.05)
+        with lock:
+            active[0] -= 1
+        return f"$2b$hash-{password}"
+    mocker.patch.object(PasswordHashingService, '_hash', side_effect=slow_hash)
+
+    futures = hasher.hash_passwords([f"clave{i}" for i in range(9)])
+
+    assert [future.result() for future in futures] == [f"$2b$hash-clave{i}" for i in range(9)]
+    assert peak[0] == 3
+    assert hasher.get_metrics()["rejected"] == 0
@@ -165,3 +165,192 @@ def test_product_cache_with_different_keys(product_repo, external_product_servic
     assert products_all_1 is products_all_2 
     assert products_electronics_1 is products_electronics_2 
     assert products_all_1 is not products_electronics_1 
+
+def test_get_all_products_async_uses_async_service_and_shares_cache():
+    """Verifica que la versión async carga el caché con el servicio async y filtra igual que la síncrona."""
+    import asyncio
+    from unittest.mock import AsyncMock
+
+    sync_service = MagicMock()
+    async_service = MagicMock()
+    async_service.get_all_products = AsyncMock(return_value=(MOCK_PRODUCTS_DATA_FROM_API, 3))
+    repo = ProductRepository(sync_service, async_product_service=async_service)
+
+    products, total = asyncio.run(repo.get_all_products_async(category="electronics", page=1, limit=1))
+
+    assert total == 2 and [p.name for p in products] == ["Smartphone X"]
+    assert repo.get_all_products(query="ring")[1] == 1 # El caché cargado en async lo usa la versión síncrona
+    async_service.get_all_products.assert_awaited_once()
+    sync_service.get_all_products.assert_not_called()
+
+def test_concurrent_cold_loads_share_one_upstream_fetch():
+    """Verifica que varias peticiones simultáneas con el caché vacío provocan una sola carga del catálogo."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    release = threading.Event()
+    service = MagicMock()
+
+    def slow_fetch(**kwargs):
+        release.wait(5)
+        return MOCK_PRODUCTS_DATA_FROM_API, 3
+    service.get_all_products.side_effect = slow_fetch
+    repo = ProductRepository(service)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(repo.get_all_products) for _ in range(8)]
+        deadline = time.monotonic() + 5
+        while repo._single_flight.get_stats()["coalesced"] < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert service.get_all_products.call_count == 1
+    assert all(total == 3 for _, total in results)
+
+def test_stale_catalog_is_served_while_refreshing_in_background(mocker):
+    """Verifica stale-while-revalidate: tras el TTL se sirve el catálogo anterior y el nuevo se publica al terminar."""
+    clock = mocker.patch("backend.repositories.product_repository.time.monotonic", return_value=1000.0)
+    service = MagicMock()
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API, 3)
+    repo = ProductRepository(service, catalog_ttl_seconds=60)
+    assert repo.get_all_products()[1] == 3
+
+    clock.return_value = 1061.0
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API[:1], 1)
+    assert repo.get_all_products()[1] == 3 # Se responde con el catálogo vencido, sin esperar
+    repo._refresh_thread.join(5)
+
+    assert repo.get_all_products()[1] == 1
+    stats = repo.get_catalog_stats()
+    assert (stats["refreshes"], stats["refresh_failures"], stats["stale"], stats["age_seconds"]) == (2, 0, False, 0)
+    assert service.get_all_products.call_count == 2
+
+def test_catalog_snapshot_file_warms_new_repository(tmp_path):
+    """Verifica que el catálogo cargado se guarda en disco y un repositorio nuevo arranca desde ahí."""
+    snapshot_file = str(tmp_path / "product_catalog.json")
+    service = MagicMock()
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API, 3)
+    ProductRepository(service, snapshot_file=snapshot_file).get_all_products()
+
+    warm_service = MagicMock()
+    warm_repo = ProductRepository(warm_service, snapshot_file=snapshot_file)
+    products, total = warm_repo.get_all_products(query="laptop")
+
+    assert total == 1 and products[0].name == "Laptop Pro"
+    warm_service.get_all_products.assert_not_called()
+    assert warm_repo.get_catalog_stats()["stale"] is False
+
+    expired_repo = ProductRepository(MagicMock(), snapshot_file=snapshot_file, snapshot_max_age_seconds=-1)
+    assert expired_repo.get_catalog_stats()["loaded"] is False
+
+def test_concurrent_product_detail_misses_share_one_upstream_call():
+    """Verifica que el detalle de producto pasa por el repositorio: varias peticiones de un ID fuera del catálogo hacen una sola llamada."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.controllers.product_controller import ProductController
+
+    release = threading.Event()
+    service = MagicMock()
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API, 3)
+
+    def slow_detail(product_id):
+        release.wait(5)
+        return {**MOCK_PRODUCTS_DATA_FROM_API[0], "id": 42, "title": "Tablet"}
+    service.get_product_by_id.side_effect = slow_detail
+    controller = ProductController(service)
+    controller.get_product_details(1) # Carga el catálogo
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(controller.get_product_details, 42) for _ in range(4)] # La ruta entrega un int
+        deadline = time.monotonic() + 5
+        while controller.product_repository._single_flight.get_stats()["coalesced"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert all(r["name"] == "Tablet" for r in results)
+    assert controller.get_product_details(42)["name"] == "Tablet" # Ya queda en el catálogo
+    service.get_product_by_id.assert_called_once_with("42")
+
+def test_truncated_refresh_keeps_current_catalog_and_retries_later(mocker):
+    """Verifica que un refresco con menos productos de los informados por la API se trata como fallido."""
+    clock = mocker.patch("backend.repositories.product_repository.time.monotonic", return_value=1000.0)
+    service = MagicMock()
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API, 3)
+    repo = ProductRepository(service, catalog_ttl_seconds=60)
+    repo.get_all_products()
+
+    clock.return_value = 1061.0
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API[:1], 3) # Una página falló a mitad de la carga
+    repo.get_all_products()
+    repo._refresh_thread.join(5)
+
+    assert repo.get_all_products()[1] == 3
+    stats = repo.get_catalog_stats()
+    assert (stats["refreshes"], stats["refresh_failures"], stats["stale"]) == (1, 1, True)
+    assert service.get_all_products.call_count == 2 # No se reintenta antes de REFRESH_RETRY_SECONDS
+
+def test_truncated_catalog_is_not_persisted_or_loaded(tmp_path):
+    """Verifica que un catálogo con menos productos de los informados no se guarda ni se carga desde disco."""
+    import json
+
+    snapshot_file = tmp_path / "product_catalog.json"
+    service = MagicMock()
+    service.get_all_products.return_value = (MOCK_PRODUCTS_DATA_FROM_API[:2], 3)
+    repo = ProductRepository(service, snapshot_file=str(snapshot_file))
+
+    assert len(repo.get_all_products(limit=10)[0]) == 2 # Se sirve en memoria
+    assert not snapshot_file.exists()
+
+    snapshot_file.write_text(json.dumps({"fetched_at": 0, "total_from_api": 3, "products": MOCK_PRODUCTS_DATA_FROM_API[:2]}))
+    cold_repo = ProductRepository(MagicMock(), snapshot_file=str(snapshot_file), snapshot_max_age_seconds=float("inf"))
+    assert cold_repo.get_catalog_stats()["loaded"] is False
+
+def test_async_single_flight_waiters_do_not_hold_executor_threads():
+    """Verifica que las esperas async no ocupan hilos: el líder puede usar to_thread aunque haya más esperas que hilos."""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.repositories.single_flight import SingleFlight
+
+    single_flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05) # Que todas las esperas lleguen antes de pedir un hilo
+        return await asyncio.to_thread(lambda: "catálogo")
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        calls = [single_flight.do_async(("catalog",), load) for _ in range(10)]
+        return await asyncio.wait_for(asyncio.gather(*calls), timeout=5)
+
+    assert asyncio.run(main()) == ["catálogo"] * 10
+    assert single_flight.get_stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+
+def test_async_single_flight_waits_for_a_load_started_by_a_thread():
+    """Verifica que una corrutina puede esperar la carga iniciada por un hilo y recibe su resultado."""
+    import asyncio
+    import threading
+    from backend.repositories.single_flight import SingleFlight
+
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        return 42
+    leader = threading.Thread(target=lambda: single_flight.do(("catalog",), load))
+    leader.start()
+    started.wait(5)
+
+    async def wait_then_release():
+        waiter = asyncio.ensure_future(single_flight.do_async(("catalog",), None))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.wait_for(waiter, timeout=5)
+
+    assert asyncio.run(wait_then_release()) == 42
+    leader.join(5)
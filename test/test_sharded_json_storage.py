@@ -0,0 +1,61 @@
+import json
+from backend.repositories.json_storage import JSONStorage
+from backend.repositories.sharded_json_storage import ShardedJSONStorage
+
+def test_each_entity_type_gets_its_own_file(tmp_path):
+    """Verifica que cada tipo de entidad se guarda en un archivo separado."""
+    storage = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+    storage.save_entity("users", {"id": "u1", "name": "Ana"})
+    storage.save_entity("importers", {"id": "i1", "name": "Importadora"})
+
+    with open(tmp_path / "data.users.json", encoding='utf-8') as f:
+        assert json.load(f) == {"users": [{"id": "u1", "name": "Ana"}]}
+    with open(tmp_path / "data.importers.json", encoding='utf-8') as f:
+        assert json.load(f) == {"importers": [{"id": "i1", "name": "Importadora"}]}
+    assert not (tmp_path / "data.json").exists()
+
+def test_types_are_opened_lazily_and_seeded_from_combined_file(tmp_path):
+    """Verifica que solo se abren los tipos usados y que se migran desde el archivo combinado."""
+    legacy = JSONStorage(data_file=str(tmp_path / "data.json"))
+    legacy.save_entity("users", {"id": "u1", "name": "Ana"})
+    legacy.save_entity("importers", {"id": "i1", "name": "Importadora"})
+
+    storage = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+    assert storage.get_by_id("users", "u1")["name"] == "Ana"
+
+    assert list(storage._shards) == ["users"]
+    assert not (tmp_path / "data.importers.json").exists()
+
+def test_indexes_registered_before_first_use_are_applied(tmp_path):
+    """Verifica que un índice registrado antes de abrir el archivo del tipo se aplica igual."""
+    storage = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+    storage.register_index("importers", "country_of_origin", case_insensitive=True)
+    storage.save_entity("importers", {"id": "i1", "country_of_origin": "China"})
+
+    assert [i["id"] for i in storage.find_by_attribute("importers", "country_of_origin", "CHINA")] == ["i1"]
+
+def test_subscriptions_reach_types_opened_later(tmp_path):
+    """Verifica que una suscripción previa también recibe los cambios de archivos abiertos después."""
+    storage = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+    events = []
+    storage.subscribe(lambda *event: events.append(event))
+
+    storage.save_entity("users", {"id": "u1"})
+    storage.save_entity("importers", {"id": "i1"})
+
+    assert events == [("users", 1, ["u1"]), ("importers", 1, ["i1"])]
+    assert storage.get_version("users") == 1
+
+def test_late_seeding_does_not_replace_a_shard_another_worker_already_uses(tmp_path):
+    """Verifica que un worker que siembra tarde (tras ver que faltaba el archivo) no pisa el archivo ya creado por otro."""
+    legacy = JSONStorage(data_file=str(tmp_path / "data.json"))
+    legacy.save_entity("users", {"id": "u1", "name": "Ana"})
+    worker_a = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+    worker_b = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+
+    worker_a.save_entity("users", {"id": "u2", "name": "Beto"})
+    worker_b._seed_from_legacy("users", str(tmp_path / "data.users.json")) # B comprobó antes de que A creara el archivo
+
+    reopened = ShardedJSONStorage(data_file=str(tmp_path / "data.json"))
+    assert sorted(u["id"] for u in reopened.get_all("users")) == ["u1", "u2"]
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,95 @@
+import pytest
+from backend.repositories.json_storage import JSONStorage
+from backend.repositories.sqlite_storage import SQLiteStorage
+from backend.repositories.storage_factory import import_json_into
+
+@pytest.fixture
+def storage(tmp_path):
+    """SQLiteStorage sobre un archivo temporal."""
+    return SQLiteStorage(data_file=str(tmp_path / "test.sqlite3"))
+
+def test_save_get_and_delete(storage):
+    """Verifica el ciclo básico de guardado, actualización, lectura y borrado."""
+    saved = storage.save_entity("users", {"name": "Ana"})
+    storage.save_entity("users", {"id": "u2", "name": "Beto"})
+    storage.save_entity("users", {"id": saved["id"], "name": "Ana María"})
+
+    assert storage.get_by_id("users", saved["id"])["name"] == "Ana María"
+    assert [u["name"] for u in storage.get_all("users")] == ["Ana María", "Beto"]
+    assert storage.delete_entity("users", "u2") is True
+    assert storage.delete_entity("users", "u2") is False
+    assert storage.get_by_id("users", "u2") is None
+
+def test_journal_mode_is_wal(storage):
+    """Verifica que la base de datos usa el journal WAL."""
+    assert storage._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_find_by_attribute_with_indexes(storage):
+    """Verifica las búsquedas indexadas (insensibles a mayúsculas) y la búsqueda de None."""
+    storage.register_index("importers", "country_of_origin", case_insensitive=True)
+    storage.save_entity("importers", {"id": "i1", "country_of_origin": "China"})
+    storage.save_entity("importers", {"id": "i2", "country_of_origin": "Chile"})
+    storage.save_entity("importers", {"id": "i3"})
+
+    assert [i["id"] for i in storage.find_by_attribute("importers", "country_of_origin", "CHINA")] == ["i1"]
+    assert [i["id"] for i in storage.find_by_attribute("importers", "country_of_origin", None)] == ["i3"]
+    plan = storage._connection().execute(
+        "EXPLAIN QUERY PLAN SELECT data FROM entities WHERE entity_type = 'importers' "
+        "AND lower(json_extract(data, '$.country_of_origin')) = ?", ("china",)
+    ).fetchall()
+    assert "idx_importers_country_of_origin" in str(plan)
+
+def test_unique_index_rejects_duplicates(storage):
+    """Verifica que un índice único impide que dos entidades compartan valor."""
+    storage.register_index("users", "google_id", unique=True)
+    storage.save_entity("users", {"id": "u1", "google_id": "g1"})
+    storage.save_entity("users", {"id": "u2", "google_id": None})
+    storage.save_entity("users", {"id": "u3", "google_id": None})
+
+    with pytest.raises(ValueError):
+        storage.save_entity("users", {"id": "u4", "google_id": "g1"})
+    assert storage.get_by_id("users", "u4") is None
+
+def test_import_from_json_storage(storage, tmp_path):
+    """Verifica que la migración copia todas las entidades de un data.json existente."""
+    source = JSONStorage(data_file=str(tmp_path / "data.json"))
+    source.save_entity("users", {"id": "u1", "name": "Ana"})
+    source.save_entity("importers", {"id": "i1", "name": "Importadora"})
+
+    assert import_json_into(storage, source) == {"users": 1, "importers": 1}
+    assert import_json_into(storage, source) == {"users": 1, "importers": 1}
+    assert storage.get_all("users") == [{"id": "u1", "name": "Ana"}]
+    assert storage.get_by_id("importers", "i1")["name"] == "Importadora"
+
+def test_get_page_walks_collection_by_id_cursor(storage):
+    """Verifica la paginación por cursor sobre la clave primaria."""
+    storage.save_entities("users", [{"id": f"u{i}", "name": f"Usuario {i}"} for i in (3, 1, 2)])
+
+    page, cursor = storage.get_page("users", limit=2, fields=[])
+    assert page == [{"id": "u1"}, {"id": "u2"}]
+    page, cursor = storage.get_page("users", after_id=cursor, limit=2)
+    assert [u["id"] for u in page] == ["u3"] and cursor is None
+    assert [u["name"] for u in storage.iter_entities("users", batch_size=1)] == ["Usuario 1", "Usuario 2", "Usuario 3"]
+
+def test_subscribers_are_notified_of_local_writes(storage):
+    """Verifica que SQLiteStorage avisa de las escrituras hechas por este proceso."""
+    events = []
+    storage.subscribe(lambda *event: events.append(event), entity_type="users")
+
+    storage.save_entity("users", {"id": "u1"})
+    storage.save_entities("users", [{"id": "u2"}])
+    storage.delete_entities("users", ["u1", "nadie"])
+
+    assert events == [("users", 1, ["u1"]), ("users", 2, ["u2"]), ("users", 3, ["u1"])]
+
+def test_compare_and_set_only_changes_matching_values(storage):
+    """Verifica que compare_and_set cambia solo el atributo indicado y solo si conserva el valor esperado."""
+    storage.save_entity("users", {"id": "u1", "email": "viejo-1", "is_premium": True})
+    storage.save_entity("users", {"id": "u2", "email": "cambiado"})
+
+    results = storage.compare_and_set("users", "email", [("u1", "viejo-1", "nuevo-1"), ("u2", "viejo-2", "nuevo-2"),
+                                                          ("u3", "viejo-3", "nuevo-3")])
+
+    assert results == [True, False, False]
+    assert storage.get_by_id("users", "u1") == {"id": "u1", "email": "nuevo-1", "is_premium": True}
+    assert storage.get_by_id("users", "u2")["email"] == "cambiado"
@@ -0,0 +1,182 @@
+import threading
+import pytest
+from cryptography.fernet import Fernet
+from backend.repositories.json_storage import JSONStorage
+from backend.repositories.user_repository import UserRepository
+from backend.models.user import User
+
+@pytest.fixture
+def storage(tmp_path):
+    """JSONStorage real sobre un archivo temporal."""
+    return JSONStorage(data_file=str(tmp_path / "users_db.json"))
+
+@pytest.fixture
+def make_user_repo(storage, mocker):
+    """Fábrica de UserRepository con claves de prueba (sin tocar backend/*.key)."""
+    fernet = Fernet(Fernet.generate_key())
+    mocker.patch.object(UserRepository, '_load_fernet_keys_from_file', return_value=[fernet])
+    mocker.patch.object(UserRepository, '_load_email_index_key_from_file', return_value=b'clave-de-prueba')
+    return lambda: UserRepository(storage=storage)
+
+def test_add_user_stores_blind_index_and_finds_by_email(make_user_repo, storage):
+    """Verifica que el email se guarda cifrado junto a su índice ciego y se encuentra por él."""
+    user_repo = make_user_repo()
+    saved = user_repo.add_user(User(email="ana@example.com", password="secreto123", name="Ana"))
+
+    stored = storage.get_by_id("users", saved.id)
+    assert stored["email"] != "ana@example.com"
+    assert stored["email_hash"] == user_repo._email_blind_index("ana@example.com")
+
+    found = user_repo.find_user_by_email("Ana@Example.com ")
+    assert found.id == saved.id
+    assert found.email == "ana@example.com"
+
+def test_find_user_by_email_decrypts_only_the_match(make_user_repo, mocker):
+    """Verifica que la búsqueda por email no desencripta a todos los usuarios."""
+    user_repo = make_user_repo()
+    for i in range(3):
+        user_repo.add_user(User(email=f"user{i}@example.com", password=None, name=f"User {i}"))
+
+    decrypt_spy = mocker.spy(user_repo, "_decrypt_email")
+    assert user_repo.find_user_by_email("user2@example.com") is not None
+    assert decrypt_spy.call_count == 1
+    assert user_repo.find_user_by_email("nadie@example.com") is None
+    assert decrypt_spy.call_count == 1
+
+def test_backfill_email_index_migrates_legacy_users(make_user_repo, storage):
+    """Verifica que la migración calcula el índice ciego de usuarios antiguos."""
+    user_repo = make_user_repo()
+    storage.save_entity("users", {"id": "legacy", "email": user_repo._encrypt_email("vieja@example.com"), "name": "Vieja"})
+
+    user_repo = make_user_repo()
+    assert user_repo._legacy_email_scan is True
+    assert user_repo.find_user_by_email("vieja@example.com").id == "legacy"
+
+    assert user_repo.backfill_email_index() == 1
+    assert user_repo._legacy_email_scan is False
+    assert storage.get_by_id("users", "legacy")["email_hash"] == user_repo._email_blind_index("vieja@example.com")
+    assert user_repo.find_user_by_email("vieja@example.com").id == "legacy"
+
+def test_update_user_refreshes_blind_index(make_user_repo):
+    """Verifica que cambiar el email actualiza su índice ciego."""
+    user_repo = make_user_repo()
+    saved = user_repo.add_user(User(email="antes@example.com", password=None, name="Ana"))
+
+    user_repo.update_user(saved.id, {"email": "despues@example.com"})
+
+    assert user_repo.find_user_by_email("antes@example.com") is None
+    assert user_repo.find_user_by_email("despues@example.com").id == saved.id
+
+def test_add_users_skips_existing_and_duplicated_emails(make_user_repo, storage, mocker):
+    """Verifica que la carga masiva de usuarios devuelve un resultado por usuario y escribe una sola vez."""
+    user_repo = make_user_repo()
+    user_repo.add_user(User(email="ana@example.com", password=None, name="Ana"))
+    save_spy = mocker.spy(storage, "_save_data")
+
+    results = user_repo.add_users([
+        User(email="beto@example.com", password="secreto123", name="Beto"),
+        User(email="ana@example.com", password=None, name="Otra Ana"),
+        User(email="BETO@example.com", password=None, name="Otro Beto"),
+    ])
+
+    assert results[0].email == "beto@example.com"
+    assert results[0].password.startswith("$2b$")
+    assert results[1] is None and results[2] is None
+    assert save_spy.call_count == 1
+    assert len(user_repo.get_all_users()) == 2
+
+def test_add_users_hashes_passwords_concurrently(make_user_repo, storage, mocker):
+    """Verifica que la carga masiva encola todos los hashes en el pool antes de esperar el primero."""
+    from backend.services.password_hashing_service import PasswordHashingService
+    user_repo = make_user_repo()
+    user_repo.password_hasher = PasswordHashingService(max_workers=4, max_queue_depth=0)
+    barrier = threading.Barrier(4, timeout=5) # Solo se abre si los cuatro hashes corren a la vez
+    mocker.patch.object(PasswordHashingService, '_hash', side_effect=lambda p: (barrier.wait(), f"$2b$hash-{p}")[1])
+
+    results = user_repo.add_users([User(email=f"user{i}@example.com", password=f"clave{i}") for i in range(4)])
+
+    assert [user.password for user in results] == [f"$2b$hash-clave{i}" for i in range(4)]
+
+def test_get_user_by_id_is_cached_and_invalidated_on_changes(make_user_repo, storage, mocker):
+    """Verifica que la caché evita descifrar en cada lectura y se invalida con cualquier cambio del usuario."""
+    user_repo = make_user_repo()
+    saved = user_repo.add_user(User(email="ana@example.com", password=None, name="Ana"))
+    decrypt_spy = mocker.spy(user_repo, "_decrypt_email")
+
+    first = user_repo.get_user_by_id(saved.id)
+    first.name = "Modificada por el llamador"
+    assert user_repo.get_user_by_id(saved.id).name == "Ana"
+    assert decrypt_spy.call_count == 1
+
+    user_repo.update_user(saved.id, {"name": "Ana María"})
+    assert user_repo.get_user_by_id(saved.id).name == "Ana María"
+
+    stored = storage.get_by_id("users", saved.id)
+    storage.save_entity("users", dict(stored, is_premium=True)) # Cambio hecho sin pasar por el repositorio
+    assert user_repo.get_user_by_id(saved.id).is_premium is True
+
+    user_repo.delete_user(saved.id)
+    assert user_repo.get_user_by_id(saved.id) is None
+
+def test_reencrypt_emails_rotates_to_primary_key_in_batches(storage, mocker):
+    """Verifica la rotación: re-cifra por lotes con la clave nueva y, al repetirla, omite lo ya rotado."""
+    old_key, new_key = Fernet(Fernet.generate_key()), Fernet(Fernet.generate_key())
+    mocker.patch.object(UserRepository, '_load_email_index_key_from_file', return_value=b'clave-de-prueba')
+    load_keys = mocker.patch.object(UserRepository, '_load_fernet_keys_from_file', return_value=[old_key])
+    old_repo = UserRepository(storage=storage)
+    old_repo.add_users([User(email=f"user{i}@example.com", password=None) for i in range(5)])
+
+    load_keys.return_value = [new_key, old_key]
+    user_repo = UserRepository(storage=storage)
+    assert user_repo.find_user_by_email("user3@example.com") is not None # Sigue descifrando con la clave anterior
+    swap_spy = mocker.spy(storage, "compare_and_set")
+    reports = []
+
+    progress = user_repo.reencrypt_emails(batch_size=2, progress_callback=reports.append)
+
+    assert (progress["reencrypted"], progress["failed"]) == (5, 0)
+    assert swap_spy.call_count == 3 and len(reports) == 3
+    assert all(new_key.decrypt(u["email"].encode()) for u in storage.get_all("users"))
+    assert user_repo.reencrypt_emails(batch_size=2)["skipped"] == 5
+
+def test_reencrypt_emails_does_not_revert_concurrent_writes(storage, mocker):
+    """Verifica que la rotación solo cambia el email y respeta lo escrito entre la lectura y la escritura del lote."""
+    old_key, new_key = Fernet(Fernet.generate_key()), Fernet(Fernet.generate_key())
+    mocker.patch.object(UserRepository, '_load_email_index_key_from_file', return_value=b'clave-de-prueba')
+    load_keys = mocker.patch.object(UserRepository, '_load_fernet_keys_from_file', return_value=[old_key])
+    ana, beto = UserRepository(storage=storage).add_users([User(email="ana@example.com", password=None),
+                                                           User(email="beto@example.com", password=None)])
+    load_keys.return_value = [new_key, old_key]
+    user_repo = UserRepository(storage=storage)
+    new_beto_email = new_key.encrypt(b"beto.nuevo@example.com").decode()
+
+    rotate_batch = user_repo._rotate_batch
+    def rotate_then_concurrent_writes(batch, progress):
+        swaps = rotate_batch(batch, progress)
+        user_repo.set_premium(ana.id, True) # Otra petición, mientras se re-cifraba el lote
+        storage.save_entity("users", dict(storage.get_by_id("users", beto.id), email=new_beto_email))
+        return swaps
+    mocker.patch.object(user_repo, '_rotate_batch', side_effect=rotate_then_concurrent_writes)
+
+    progress = user_repo.reencrypt_emails(batch_size=10)
+
+    assert (progress["reencrypted"], progress["skipped"]) == (1, 1)
+    stored_ana, stored_beto = storage.get_by_id("users", ana.id), storage.get_by_id("users", beto.id)
+    assert stored_ana["is_premium"] is True
+    assert new_key.decrypt(stored_ana["email"].encode()) == b"ana@example.com"
+    assert stored_beto["email"] == new_beto_email
+
+def test_cached_user_sees_writes_from_other_processes(tmp_path, mocker):
+    """Verifica que con almacenamiento multiproceso la caché no sirve un usuario modificado por otro worker."""
+    mocker.patch.object(UserRepository, '_load_fernet_keys_from_file', return_value=[Fernet(Fernet.generate_key())])
+    mocker.patch.object(UserRepository, '_load_email_index_key_from_file', return_value=b'clave-de-prueba')
+    data_file = str(tmp_path / "shared_users.json")
+    worker_a = UserRepository(storage=JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True))
+    worker_b = UserRepository(storage=JSONStorage(data_file=data_file, wal_enabled=True, process_shared=True))
+
+    saved = worker_a.add_user(User(email="ana@example.com", password=None, name="Ana"))
+    assert worker_a.get_user_by_id(saved.id).name == "Ana" # Queda en la caché de worker_a
+
+    worker_b.update_user(saved.id, {"name": "Ana María"})
+
+    assert worker_a.get_user_by_id(saved.id).name == "Ana María"